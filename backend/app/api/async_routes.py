@@ -0,0 +1,130 @@
+"""
+Async variant of the routes in routes.py, used when API_MODE=async. Same
+paths, statements (app.api.queries) and response cache, executed on an
+AsyncSession so handlers never occupy a threadpool worker while waiting on
+the database.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import List, Literal, Optional
+from app.api import queries
+from app.api.cache import Payload, response_cache
+from app.api.serialization import fetch_columns_async, to_records
+from app.core.config import settings
+from app.core.streaming import ModelNotFound, stream_scorer
+from app.db.database import create_async_db_engine
+from app.schemas.schemas import DistrictUpdate
+
+router = APIRouter()
+
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+@router.get("/national/summary")
+async def get_national_summary(request: Request, month: Optional[str] = None, state: Optional[str] = None,
+                               db: AsyncSession = Depends(get_async_db)):
+    """Returns aggregated national statistics, optionally for one month or one state."""
+    async def build():
+        columns = await fetch_columns_async(db, queries.materialized_summary(month, state))
+        if not columns['total_enrolments']:  # scope not materialized
+            columns = await fetch_columns_async(db, queries.live_summary(month, state))
+        return queries.summary_payload(columns)
+
+    return await response_cache.respond_async(request, db, build)
+
+@router.get("/map")
+async def get_map_data(request: Request, month: Optional[str] = None, state: Optional[str] = None,
+                       risk_level: Optional[str] = None, min_risk: Optional[float] = None, max_risk: Optional[float] = None,
+                       fields: Optional[str] = None, cursor: Optional[str] = None,
+                       limit: int = Query(settings.API_PAGE_SIZE, ge=1, le=settings.API_MAX_PAGE_SIZE),
+                       view: Optional[Literal["current", "history"]] = None,
+                       format: Literal["records", "columns"] = "records", db: AsyncSession = Depends(get_async_db)):
+    """Returns data for geospatial visualization, paged like the sync route."""
+    try:
+        page = queries.map_page(fields, limit, cursor, month=month, state=state,
+                                current=(view or ("history" if month else "current")) == "current")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    async def build():
+        statement = page.statement(month=month, state=state, risk_level=risk_level,
+                                   min_risk=min_risk, max_risk=max_risk)
+        columns, next_cursor = page.split(await fetch_columns_async(db, statement, queries.MAP_ROUNDING))
+        return Payload(queries.map_payload(columns, format), queries.page_headers(request, next_cursor))
+
+    return await response_cache.respond_async(request, db, build)
+
+@router.get("/district/{district_id}")
+async def get_district_details(request: Request, district_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Get latest metrics for a specific district."""
+    async def build():
+        metric = to_records(await fetch_columns_async(db, queries.district_latest(district_id)))
+
+        if not metric:
+            raise HTTPException(status_code=404, detail="District not found")
+
+        return metric[0]
+
+    return await response_cache.respond_async(request, db, build)
+
+@router.get("/district/{district_id}/trends")
+async def get_district_trends(request: Request, district_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Get historical metrics for trend analysis."""
+    async def build():
+        return to_records(await fetch_columns_async(db, queries.district_trends(district_id)))
+
+    return await response_cache.respond_async(request, db, build)
+
+@router.get("/risk/top")
+async def get_top_risk_districts(request: Request, month: Optional[str] = None, state: Optional[str] = None,
+                                 risk_level: Optional[str] = None, min_risk: Optional[float] = None,
+                                 max_risk: Optional[float] = None, fields: Optional[str] = None,
+                                 cursor: Optional[str] = None, limit: int = Query(10, ge=1, le=settings.API_MAX_PAGE_SIZE),
+                                 db: AsyncSession = Depends(get_async_db)):
+    """Returns the highest risk districts, paged like the sync route."""
+    try:
+        page = queries.top_risk_page(fields, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    async def build():
+        statement = page.statement(month=month, state=state, risk_level=risk_level,
+                                   min_risk=min_risk, max_risk=max_risk)
+        columns, next_cursor = page.split(await fetch_columns_async(db, statement))
+        return Payload(to_records(columns), queries.page_headers(request, next_cursor))
+
+    return await response_cache.respond_async(request, db, build)
+
+@router.get("/rollup/states")
+async def get_state_rollup(request: Request, month: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    """Per-state aggregates for one month, or all-time without a month."""
+    async def build():
+        return to_records(await fetch_columns_async(db, queries.rollup_states(month), queries.ROLLUP_ROUNDING))
+
+    return await response_cache.respond_async(request, db, build)
+
+@router.get("/rollup/months")
+async def get_monthly_rollup(request: Request, state: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    """Monthly aggregates for a state, or nationally without one."""
+    async def build():
+        return to_records(await fetch_columns_async(db, queries.rollup_months(state), queries.ROLLUP_ROUNDING))
+
+    return await response_cache.respond_async(request, db, build)
+
+@router.post("/stream/updates")
+async def post_stream_updates(updates: List[DistrictUpdate], db: AsyncSession = Depends(get_async_db)):
+    """Applies district update records; the scorer runs on the session's sync connection."""
+    records = [update.model_dump() for update in updates]
+    try:
+        result = await db.run_sync(lambda session: stream_scorer.apply(session.connection(), records))
+    except ModelNotFound as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    await db.commit()
+    response_cache.invalidate()
+    return result
@@ -0,0 +1,172 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.api.serialization import dumps
+from app.core.config import settings
+from app.db.models import DataVersion
+
+
+class Payload(NamedTuple):
+    """A `build` result that also sets response headers (e.g. the next page cursor), cached with the body."""
+    content: Any
+    headers: Dict[str, str]
+
+
+class ResponseCache:
+    """
+    Bounded LRU of serialized JSON responses for the read endpoints.
+
+    Entries are keyed by path + query string and hold the response body as
+    bytes, ready to send. They are only valid for the data_version they were
+    built under: the pipeline bumps that counter in the transaction that
+    changes district_metrics, and the first request to observe a new version
+    drops every entry. The version itself is re-read at most once every
+    `version_ttl` seconds, so a warm poll never touches SQLite.
+
+    Every response carries an ETag (a hash of the body); a matching
+    If-None-Match gets a 304. Headers of a Payload are stored and replayed
+    with the body.
+    """
+
+    VERSION_QUERY = select(DataVersion.version).where(DataVersion.id == 1)
+
+    def __init__(self, max_entries: int, max_bytes: int, version_ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version_ttl = version_ttl
+        self.version: Optional[int] = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, Tuple[int, bytes, str, Dict[str, str]]]" = OrderedDict()
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def data_version(self, db: Session) -> int:
+        """The current data_version, re-read from the database once the TTL expires."""
+        if self._version_fresh():
+            return self.version
+        return self._observe_version(db.execute(self.VERSION_QUERY).scalar() or 0)
+
+    async def data_version_async(self, db: AsyncSession) -> int:
+        """data_version for an AsyncSession."""
+        if self._version_fresh():
+            return self.version
+        return self._observe_version((await db.execute(self.VERSION_QUERY)).scalar() or 0)
+
+    def _version_fresh(self) -> bool:
+        return self.version is not None and time.monotonic() - self._checked_at < self.version_ttl
+
+    def _observe_version(self, version: int) -> int:
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.size = 0
+                self.version = version
+            self._checked_at = time.monotonic()
+        return version
+
+    def get(self, key: Tuple, version: int) -> Optional[Tuple[bytes, str, Dict[str, str]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1:]
+
+    def put(self, key: Tuple, version: int, body: bytes, etag: str, headers: Optional[Dict[str, str]] = None):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if version != self.version:
+                # Built from data older than what the cache now holds
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self._entries[key] = (version, body, etag, headers or {})
+            self.size += len(body)
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted, _, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def invalidate(self):
+        """Drops every entry and forces the next request to re-read the version."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.version = None
+
+    def respond(self, request: Request, db: Session, build: Callable[[], Any]) -> Response:
+        """
+        Serves the cached body for this request, calling `build` (which runs
+        the endpoint's queries) and caching its serialized result on a miss.
+        `build` may return ready-encoded JSON bytes, or a Payload of either.
+        """
+        if self.max_entries <= 0:
+            body, headers = self.encode(build())
+            return self.make_response(request, body, self.etag(body), headers)
+
+        key, version = self.key(request), self.data_version(db)
+        cached = self.get(key, version)
+        if cached is None:
+            cached = self.store(key, version, *self.encode(build()))
+        return self.make_response(request, *cached)
+
+    async def respond_async(self, request: Request, db: AsyncSession,
+                            build: Callable[[], Awaitable[Any]]) -> Response:
+        """respond() for async handlers: `build` is a coroutine function."""
+        if self.max_entries <= 0:
+            body, headers = self.encode(await build())
+            return self.make_response(request, body, self.etag(body), headers)
+
+        key, version = self.key(request), await self.data_version_async(db)
+        cached = self.get(key, version)
+        if cached is None:
+            cached = self.store(key, version, *self.encode(await build()))
+        return self.make_response(request, *cached)
+
+    def store(self, key: Tuple, version: int, body: bytes, headers: Dict[str, str]) -> Tuple[bytes, str, Dict[str, str]]:
+        etag = self.etag(body)
+        self.put(key, version, body, etag, headers)
+        return body, etag, headers
+
+    @staticmethod
+    def encode(result: Any) -> Tuple[bytes, Dict[str, str]]:
+        if isinstance(result, Payload):
+            return dumps(result.content), result.headers
+        return dumps(result), {}
+
+    @staticmethod
+    def key(request: Request) -> Tuple:
+        return request.url.path, tuple(sorted(request.query_params.multi_items()))
+
+    @staticmethod
+    def etag(body: bytes) -> str:
+        # Content hash only, so a body a pipeline run left unchanged still revalidates as 304
+        return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+    @staticmethod
+    def make_response(request: Request, body: bytes, etag: str, extra_headers: Optional[Dict[str, str]] = None) -> Response:
+        headers = {"ETag": etag, "Cache-Control": "no-cache", **(extra_headers or {})}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if etag in tags or "*" in tags:
+                return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+    version_ttl=settings.RESPONSE_CACHE_VERSION_TTL,
+)
@@ -0,0 +1,69 @@
+"""
+Prometheus text exposition at /metrics: per-route request latency
+histograms, response cache counters, and the pipeline run history
+(pipeline_runs) with the latest run's per-stage breakdown.
+"""
+import json
+import time
+from datetime import timezone
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.api.cache import response_cache
+from app.api.routes import get_db
+from app.core.instrumentation import Histogram, metric_lines
+from app.db.models import PipelineRun
+
+router = APIRouter()
+
+request_latency = Histogram(
+    "aari_http_request_duration_seconds", "API request latency by route template.", ["method", "route", "status"]
+)
+STAGE_FIELDS = [
+    ("wall_seconds", "Wall time"),
+    ("cpu_seconds", "CPU time (including pool workers)"),
+    ("rows_in", "Rows in"),
+    ("rows_out", "Rows out"),
+    ("peak_rss_bytes", "Peak RSS of the pipeline process"),
+]
+
+
+async def record_latency(request: Request, call_next):
+    """HTTP middleware feeding request_latency; labelled by route template so path parameters do not explode series."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    request_latency.observe(time.perf_counter() - start, request.method,
+                            getattr(route, "path", "unmatched"), str(response.status_code))
+    return response
+
+
+@router.get("/metrics")
+def get_metrics(db: Session = Depends(get_db)):
+    lines = request_latency.render()
+    lines += metric_lines("aari_response_cache_hits_total", "counter", "Response cache hits.",
+                          [({}, response_cache.hits)])
+    lines += metric_lines("aari_response_cache_misses_total", "counter", "Response cache misses.",
+                          [({}, response_cache.misses)])
+    lines += metric_lines("aari_response_cache_bytes", "gauge", "Bytes held by the response cache.",
+                          [({}, response_cache.size)])
+
+    runs = db.execute(select(PipelineRun.status, func.count()).group_by(PipelineRun.status)).all()
+    lines += metric_lines("aari_pipeline_runs_total", "counter", "Recorded pipeline runs by outcome.",
+                          [({"status": status}, count) for status, count in runs])
+    last = db.execute(select(PipelineRun).order_by(PipelineRun.id.desc()).limit(1)).scalar()
+    if last is not None:
+        labels = {"mode": last.mode, "status": last.status}
+        lines += metric_lines("aari_pipeline_last_run_timestamp_seconds", "gauge", "Start of the latest pipeline run.",
+                              [(labels, last.started_at.replace(tzinfo=timezone.utc).timestamp())])
+        for field, description in (("wall_seconds", "Wall time"), ("cpu_seconds", "CPU time"),
+                                   ("peak_rss_bytes", "Peak RSS"), ("rows", "District-month rows written")):
+            lines += metric_lines(f"aari_pipeline_last_run_{field}", "gauge", f"{description} of the latest pipeline run.",
+                                  [(labels, getattr(last, field))])
+        stages = json.loads(last.stages or "[]")
+        for field, description in STAGE_FIELDS:
+            lines += metric_lines(f"aari_pipeline_stage_{field}", "gauge",
+                                  f"{description} per stage of the latest pipeline run.",
+                                  [({"stage": stage["stage"]}, stage.get(field)) for stage in stages])
+
+    return Response("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
@@ -0,0 +1,237 @@
+"""
+Statements and payload shaping shared by the sync (routes.py) and async
+(async_routes.py) API. Handlers only differ in how they execute these.
+"""
+import base64
+from typing import Dict, List, Optional, Tuple
+import orjson
+from sqlalchemy import case, desc, func, select, tuple_
+from app.api.serialization import dumps, to_records
+from app.db.models import DistrictCurrent, DistrictMetric, MetricSummary
+
+# Map payload columns and their rounding; NULL derived metrics are sent as 0
+MAP_COLUMNS = [
+    DistrictMetric.district,
+    DistrictMetric.state,
+    DistrictMetric.risk_score,
+    DistrictMetric.risk_level,
+    DistrictMetric.asr,
+    DistrictMetric.uii,
+    DistrictMetric.tds,
+    DistrictMetric.aepg,
+    DistrictMetric.cbcg,
+]
+MAP_ROUNDING = {
+    'risk_score': (1, None),
+    'asr': (1, None),
+    'uii': (3, 0),
+    'tds': (2, 0),
+    'aepg': (1, 0),
+    'cbcg': (1, 0),
+}
+# Every stored column, selected explicitly instead of loading ORM objects
+METRIC_COLUMNS = list(DistrictMetric.__table__.c)
+CURRENT_COLUMNS = list(DistrictCurrent.__table__.c)
+HIGH_RISK_LEVELS = ('High', 'Priority')
+# Columns a `fields=` projection may pick from, by response key
+MAP_FIELDS = {column.key: column for column in MAP_COLUMNS + [DistrictMetric.month]}
+CURRENT_MAP_FIELDS = {name: getattr(DistrictCurrent, name) for name in MAP_FIELDS}
+METRIC_FIELDS = {column.name: column for column in METRIC_COLUMNS}
+
+
+class Page:
+    """
+    One keyset page of a `model` query (district_metrics or
+    district_current), selecting from `available`. Rows are ordered by `keys`
+    (all ascending, or all descending) and the cursor holds the last row's
+    key values, so the next page seeks past it through the index instead of
+    skipping an OFFSET. Key columns the caller did not ask for are selected
+    anyway and dropped by split().
+    """
+
+    def __init__(self, model, available: Dict, fields: List[str], keys: List, limit: int,
+                 cursor: Optional[str] = None, descending: bool = False):
+        self.model = model
+        self.available = available
+        self.fields = fields
+        self.keys = keys
+        self.limit = limit
+        self.descending = descending
+        self.after = decode_cursor(cursor, len(keys)) if cursor else None
+
+    def statement(self, **filters):
+        """The page's query, with metric_filters(**filters) applied."""
+        hidden = [key for key in self.keys if key.key not in self.fields]
+        query = select(*(self.available[name] for name in self.fields), *hidden).where(
+            *metric_filters(self.model, **filters)
+        )
+        if self.after is not None:
+            position = tuple_(*self.keys)
+            query = query.where(position < tuple_(*self.after) if self.descending else position > tuple_(*self.after))
+        order = [desc(key) for key in self.keys] if self.descending else self.keys
+        # One extra row tells whether there is a next page
+        return query.order_by(*order).limit(self.limit + 1)
+
+    def split(self, columns: Dict[str, list]) -> Tuple[Dict[str, list], Optional[str]]:
+        """The requested fields of the first `limit` rows, and the cursor of the next page (None on the last)."""
+        more = len(next(iter(columns.values()), [])) > self.limit
+        cursor = encode_cursor([columns[key.key][self.limit - 1] for key in self.keys]) if more else None
+        return {name: columns[name][:self.limit] for name in self.fields}, cursor
+
+
+def encode_cursor(values: List) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(values)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List:
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, orjson.JSONDecodeError):
+        raise ValueError(f"Malformed cursor {cursor!r}")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Malformed cursor {cursor!r}")
+    return values
+
+
+def projection(fields: Optional[str], available: Dict, default: List[str]) -> List[str]:
+    """Field names from a comma-separated `fields=` value, in request order."""
+    if not fields:
+        return default
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise ValueError(f"Unknown fields {', '.join(unknown)}; expected any of {', '.join(available)}")
+    return names
+
+
+def metric_filters(model, month: Optional[str] = None, state: Optional[str] = None,
+                   risk_level: Optional[str] = None, min_risk: Optional[float] = None,
+                   max_risk: Optional[float] = None) -> List:
+    filters = []
+    if month:
+        filters.append(model.month == month)
+    if state:
+        filters.append(model.state == state)
+    if risk_level:
+        filters.append(model.risk_level == risk_level)
+    if min_risk is not None:
+        filters.append(model.risk_score >= min_risk)
+    if max_risk is not None:
+        filters.append(model.risk_score <= max_risk)
+    return filters
+
+
+def page_headers(request, cursor: Optional[str]) -> Dict[str, str]:
+    """X-Next-Cursor and an RFC 8288 next link, when there is a next page."""
+    if cursor is None:
+        return {}
+    return {"X-Next-Cursor": cursor, "Link": f'<{request.url.include_query_params(cursor=cursor)}>; rel="next"'}
+
+
+def materialized_summary(month: Optional[str], state: Optional[str]):
+    """The metric_summaries row for a scope ('' = all)."""
+    return select(
+        MetricSummary.total_enrolments,
+        MetricSummary.average_saturation,
+        MetricSummary.national_risk_index,
+        MetricSummary.high_risk_districts,
+    ).where(MetricSummary.state == (state or ''), MetricSummary.month == (month or ''))
+
+
+# Rollup cube measures (metric_summaries) and their rounding
+ROLLUP_MEASURES = [
+    MetricSummary.total_enrolments,
+    MetricSummary.average_saturation,
+    MetricSummary.average_uii,
+    MetricSummary.national_risk_index,
+    MetricSummary.high_risk_districts,
+]
+ROLLUP_ROUNDING = {
+    'average_saturation': (2, None),
+    'average_uii': (4, None),
+    'national_risk_index': (2, None),
+}
+
+
+def rollup_states(month: Optional[str]):
+    """Every state's cube row for a month (all-time without one), on the (month, state) index."""
+    return select(MetricSummary.state, *ROLLUP_MEASURES).where(
+        MetricSummary.month == (month or ''), MetricSummary.state != ''
+    ).order_by(MetricSummary.state)
+
+
+def rollup_months(state: Optional[str]):
+    """A state's (national without one) cube row for every month, on the unique key."""
+    return select(MetricSummary.month, *ROLLUP_MEASURES).where(
+        MetricSummary.state == (state or ''), MetricSummary.month != ''
+    ).order_by(MetricSummary.month)
+
+
+def live_summary(month: Optional[str], state: Optional[str]):
+    """The same figures aggregated from district_metrics, for scopes not materialized."""
+    query = select(
+        func.sum(DistrictMetric.total_enrolments).label('total_enrolments'),
+        func.avg(DistrictMetric.asr).label('average_saturation'),
+        func.avg(DistrictMetric.risk_score).label('national_risk_index'),
+        func.sum(case((DistrictMetric.risk_level.in_(HIGH_RISK_LEVELS), 1), else_=0)).label('high_risk_districts'),
+    )
+    if month:
+        query = query.where(DistrictMetric.month == month)
+    if state:
+        query = query.where(DistrictMetric.state == state)
+    return query
+
+
+def summary_payload(columns: Dict[str, list]) -> Dict:
+    """Response body from the single row of either summary statement."""
+    row = to_records(columns)[0]
+    return {
+        "total_enrolments": row['total_enrolments'] or 0,
+        "average_saturation": round(row['average_saturation'] or 0, 2),
+        "national_risk_index": round(row['national_risk_index'] or 0, 2),
+        "high_risk_districts": row['high_risk_districts'] or 0,
+    }
+
+
+def map_page(fields: Optional[str], limit: int, cursor: Optional[str], month: Optional[str] = None,
+             state: Optional[str] = None, current: bool = False) -> Page:
+    """
+    Map rows in (state, district, month) order, from district_metrics or with
+    `current` one row per district from district_current. Columns pinned by an
+    equality filter are left out of the key, so the seek runs on the index
+    behind the filter: (month, state, district) for a month, the unique key
+    for a state.
+    """
+    model = DistrictCurrent if current else DistrictMetric
+    available = CURRENT_MAP_FIELDS if current else MAP_FIELDS
+    pinned = {'state': state} if current else {'month': month, 'state': state}
+    order = ('state', 'district') if current else ('state', 'district', 'month')
+    keys = [getattr(model, name) for name in order if not pinned.get(name)]
+    return Page(model, available, projection(fields, available, [column.key for column in MAP_COLUMNS]), keys,
+                limit, cursor)
+
+
+def map_payload(columns: Dict[str, list], format: str) -> bytes:
+    return dumps(columns if format == "columns" else to_records(columns))
+
+
+def district_latest(district_id: str):
+    """The district's district_current row (the latest month if the name exists in several states)."""
+    return select(*CURRENT_COLUMNS).where(DistrictCurrent.district == district_id).order_by(
+        desc(DistrictCurrent.month)
+    ).limit(1)
+
+
+def district_trends(district_id: str):
+    return select(
+        DistrictMetric.month,
+        DistrictMetric.uii,
+        DistrictMetric.asr,
+        DistrictMetric.risk_score
+    ).where(DistrictMetric.district == district_id).order_by(DistrictMetric.month)
+
+
+def top_risk_page(fields: Optional[str], limit: int, cursor: Optional[str]) -> Page:
+    """Highest risk first, walking the risk_score index; id breaks ties so the cursor is exact."""
+    return Page(DistrictMetric, METRIC_FIELDS, projection(fields, METRIC_FIELDS, list(METRIC_FIELDS)),
+                [DistrictMetric.risk_score, DistrictMetric.id], limit, cursor, descending=True)
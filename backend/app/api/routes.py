@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional
+from app.api import queries
+from app.api.cache import Payload, response_cache
+from app.api.serialization import fetch_columns, to_records
+from app.core.config import settings
+from app.core.streaming import ModelNotFound, stream_scorer
 from app.db.database import SessionLocal
-from app.db.models import DistrictMetric
-from app.schemas.schemas import NationalSummary, DistrictResponse, RiskDistrict, TrendResponse # We need to create these schemas
-from sqlalchemy import func, desc
+from app.schemas.schemas import NationalSummary, DistrictResponse, DistrictUpdate, RiskDistrict, TrendResponse # We need to create these schemas
 
 router = APIRouter()
 
@@ -16,86 +19,126 @@ def get_db():
         db.close()
 
 @router.get("/national/summary")
-def get_national_summary(db: Session = Depends(get_db)):
-    """Returns aggregated national statistics."""
-    # Aggregation query
-    total_enrolments = db.query(func.sum(DistrictMetric.total_enrolments)).scalar() or 0
-    avg_saturation = db.query(func.avg(DistrictMetric.asr)).scalar() or 0
-    avg_risk = db.query(func.avg(DistrictMetric.risk_score)).scalar() or 0
-    
-    high_risk_count = db.query(DistrictMetric).filter(
-        (DistrictMetric.risk_level == 'High') | (DistrictMetric.risk_level == 'Priority')
-    ).count()
-
-    return {
-        "total_enrolments": total_enrolments,
-        "average_saturation": round(avg_saturation, 2),
-        "national_risk_index": round(avg_risk, 2),
-        "high_risk_districts": high_risk_count
-    }
+def get_national_summary(request: Request, month: Optional[str] = None, state: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Returns aggregated national statistics, optionally for one month or one state.
+    Served from the pipeline's metric_summaries row; falls back to aggregating
+    district_metrics when nothing is materialized for the requested scope.
+    """
+    def build():
+        columns = fetch_columns(db, queries.materialized_summary(month, state))
+        if not columns['total_enrolments']:  # scope not materialized
+            columns = fetch_columns(db, queries.live_summary(month, state))
+        return queries.summary_payload(columns)
+
+    return response_cache.respond(request, db, build)
 
 @router.get("/map")
-def get_map_data(month: Optional[str] = None, db: Session = Depends(get_db)):
-    """Returns data for geospatial visualization."""
-    query = db.query(
-        DistrictMetric.district, 
-        DistrictMetric.state, 
-        DistrictMetric.risk_score, 
-        DistrictMetric.risk_level, 
-        DistrictMetric.asr,
-        DistrictMetric.uii,
-        DistrictMetric.tds,
-        DistrictMetric.aepg,
-        DistrictMetric.cbcg
-    )
-    if month:
-        query = query.filter(DistrictMetric.month == month)
-    
-    results = query.all()
-    return [
-        {
-            "district": r.district,
-            "state": r.state,
-            "risk_score": round(r.risk_score, 1),
-            "risk_level": r.risk_level,
-            "asr": round(r.asr, 1),
-            "uii": round(r.uii, 3) if r.uii is not None else 0,
-            "tds": round(r.tds, 2) if r.tds is not None else 0,
-            "aepg": round(r.aepg, 1) if r.aepg is not None else 0,
-            "cbcg": round(r.cbcg, 1) if r.cbcg is not None else 0,
-        }
-        for r in results
-    ]
+def get_map_data(request: Request, month: Optional[str] = None, state: Optional[str] = None,
+                 risk_level: Optional[str] = None, min_risk: Optional[float] = None, max_risk: Optional[float] = None,
+                 fields: Optional[str] = None, cursor: Optional[str] = None,
+                 limit: int = Query(settings.API_PAGE_SIZE, ge=1, le=settings.API_MAX_PAGE_SIZE),
+                 view: Optional[Literal["current", "history"]] = None,
+                 format: Literal["records", "columns"] = "records", db: Session = Depends(get_db)):
+    """
+    Returns data for geospatial visualization: one object per district-month,
+    or with format=columns a single object of column arrays. Without a month
+    (or with view=current) each district's latest month is served from the
+    district_current snapshot; view=history pages through every month.
+    Pages of `limit` rows in (state, district, month) order; the next page's
+    cursor is sent in X-Next-Cursor / Link. `fields` picks the columns to return.
+    """
+    try:
+        page = queries.map_page(fields, limit, cursor, month=month, state=state,
+                                current=(view or ("history" if month else "current")) == "current")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    def build():
+        statement = page.statement(month=month, state=state, risk_level=risk_level,
+                                   min_risk=min_risk, max_risk=max_risk)
+        columns, next_cursor = page.split(fetch_columns(db, statement, queries.MAP_ROUNDING))
+        return Payload(queries.map_payload(columns, format), queries.page_headers(request, next_cursor))
+
+    return response_cache.respond(request, db, build)
 
 @router.get("/district/{district_id}")
-def get_district_details(district_id: str, db: Session = Depends(get_db)):
-    """Get latest metrics for a specific district."""
+def get_district_details(request: Request, district_id: str, db: Session = Depends(get_db)):
+    """Get latest metrics for a specific district, from the district_current snapshot."""
     # Assuming district_id is the name for now, or we should map ID. 
     # In real system we'd use int ID. Here we use name matching.
-    metric = db.query(DistrictMetric).filter(DistrictMetric.district == district_id).order_by(desc(DistrictMetric.month)).first()
-    
-    if not metric:
-        raise HTTPException(status_code=404, detail="District not found")
-    
-    return metric
+    def build():
+        metric = to_records(fetch_columns(db, queries.district_latest(district_id)))
+
+        if not metric:
+            raise HTTPException(status_code=404, detail="District not found")
+
+        return metric[0]
+
+    return response_cache.respond(request, db, build)
 
 @router.get("/district/{district_id}/trends")
-def get_district_trends(district_id: str, db: Session = Depends(get_db)):
+def get_district_trends(request: Request, district_id: str, db: Session = Depends(get_db)):
     """Get historical metrics for trend analysis."""
-    metrics = db.query(DistrictMetric).filter(DistrictMetric.district == district_id).order_by(DistrictMetric.month).all()
-    
-    return [
-        {
-            "month": m.month,
-            "uii": m.uii,
-            "asr": m.asr,
-            "risk_score": m.risk_score
-        }
-        for m in metrics
-    ]
+    def build():
+        return to_records(fetch_columns(db, queries.district_trends(district_id)))
+
+    return response_cache.respond(request, db, build)
 
 @router.get("/risk/top")
-def get_top_risk_districts(limit: int = 10, db: Session = Depends(get_db)):
-    """Returns top N highest risk districts."""
-    results = db.query(DistrictMetric).order_by(desc(DistrictMetric.risk_score)).limit(limit).all()
-    return results
+def get_top_risk_districts(request: Request, month: Optional[str] = None, state: Optional[str] = None,
+                           risk_level: Optional[str] = None, min_risk: Optional[float] = None,
+                           max_risk: Optional[float] = None, fields: Optional[str] = None, cursor: Optional[str] = None,
+                           limit: int = Query(10, ge=1, le=settings.API_MAX_PAGE_SIZE), db: Session = Depends(get_db)):
+    """
+    Returns the highest risk districts, `limit` per page, optionally filtered.
+    Paged and projected like /map.
+    """
+    try:
+        page = queries.top_risk_page(fields, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    def build():
+        statement = page.statement(month=month, state=state, risk_level=risk_level,
+                                   min_risk=min_risk, max_risk=max_risk)
+        columns, next_cursor = page.split(fetch_columns(db, statement))
+        return Payload(to_records(columns), queries.page_headers(request, next_cursor))
+
+    return response_cache.respond(request, db, build)
+
+@router.get("/rollup/states")
+def get_state_rollup(request: Request, month: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Per-state aggregates for one month, or all-time without a month, from the
+    pipeline's rollup cube (metric_summaries): one indexed row per state.
+    """
+    def build():
+        return to_records(fetch_columns(db, queries.rollup_states(month), queries.ROLLUP_ROUNDING))
+
+    return response_cache.respond(request, db, build)
+
+@router.get("/rollup/months")
+def get_monthly_rollup(request: Request, state: Optional[str] = None, db: Session = Depends(get_db)):
+    """Monthly aggregates for a state, or nationally without one, from the rollup cube."""
+    def build():
+        return to_records(fetch_columns(db, queries.rollup_months(state), queries.ROLLUP_ROUNDING))
+
+    return response_cache.respond(request, db, build)
+
+@router.post("/stream/updates")
+def post_stream_updates(updates: List[DistrictUpdate], db: Session = Depends(get_db)):
+    """
+    Applies district-month/day update records without a pipeline run: the
+    touched districts are recomputed and scored with the persisted model,
+    and show up in /map on the next request.
+    """
+    try:
+        result = stream_scorer.apply(db.connection(), [update.model_dump() for update in updates])
+    except ModelNotFound as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    db.commit()
+    response_cache.invalidate()
+    return result
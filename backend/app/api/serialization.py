@@ -0,0 +1,57 @@
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+# {column: (decimals, value used for NULL)}; a None fill keeps NULL as null
+Rounding = Dict[str, Tuple[int, Optional[float]]]
+
+
+def fetch_columns(db: Session, statement, rounding: Optional[Rounding] = None) -> Dict[str, list]:
+    """
+    Runs `statement` and returns {column name: list of values} in select order.
+    Columns named in `rounding` are converted to float arrays once and
+    rounded / null-filled as a whole instead of value by value. The statement
+    runs on the session's Core connection, skipping ORM result processing.
+    """
+    return result_columns(db.connection().execute(statement), rounding)
+
+
+async def fetch_columns_async(db: AsyncSession, statement, rounding: Optional[Rounding] = None) -> Dict[str, list]:
+    """fetch_columns for an AsyncSession."""
+    conn = await db.connection()
+    return result_columns(await conn.execute(statement), rounding)
+
+
+def result_columns(result, rounding: Optional[Rounding] = None) -> Dict[str, list]:
+    names = list(result.keys())
+    rows = result.all()
+    values = list(zip(*rows)) if rows else [()] * len(names)
+
+    columns = {}
+    for name, column in zip(names, values):
+        if rounding and name in rounding:
+            decimals, fill = rounding[name]
+            array = np.round(np.array(column, dtype='float64'), decimals)
+            if fill is not None:
+                array[np.isnan(array)] = fill
+            # NaN left in place is encoded as null
+            columns[name] = array.tolist()
+        else:
+            columns[name] = list(column)
+    return columns
+
+
+def to_records(columns: Dict[str, list]) -> List[Dict[str, Any]]:
+    """Row-oriented view of fetch_columns output (one dict per row)."""
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def dumps(content: Any) -> bytes:
+    """Encodes to JSON bytes with orjson, falling back to jsonable_encoder for unknown types."""
+    if isinstance(content, bytes):
+        return content
+    return orjson.dumps(content, default=jsonable_encoder)
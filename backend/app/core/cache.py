@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class ShardCache:
+    """
+    Columnar (Parquet) cache of parsed, normalized CSV shards.
+
+    Each shard is fingerprinted by path, size, mtime and SHA-256 of its content.
+    A small per-path sidecar remembers the last fingerprint, so an untouched
+    file is recognised from size + mtime without re-hashing. Cached data is
+    stored under the content hash, so touching a file without changing it
+    (new mtime, same hash) still hits the cache. The key also carries a digest
+    of `variant`, a description of how the chunks were parsed (parser version,
+    date formats), so entries written by another parser simply miss.
+    """
+
+    def __init__(self, cache_dir: str, variant: str = ""):
+        self.cache_dir = cache_dir
+        self.variant_key = hashlib.sha1(variant.encode()).hexdigest()[:12]
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def file_hash(path: str, block_size: int = 1 << 20) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _sidecar_path(self, path: str) -> str:
+        key = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _data_path(self, sha256: str) -> str:
+        return os.path.join(self.cache_dir, f"{sha256}-{self.variant_key}.parquet")
+
+    def fingerprint(self, path: str) -> Dict:
+        """Returns {path, size, mtime_ns, sha256}, hashing only when size or mtime changed."""
+        stat = os.stat(path)
+        fp = {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+        sidecar = self._sidecar_path(path)
+        if os.path.exists(sidecar):
+            with open(sidecar) as f:
+                known = json.load(f)
+            if known.get("size") == fp["size"] and known.get("mtime_ns") == fp["mtime_ns"]:
+                fp["sha256"] = known["sha256"]
+                return fp
+
+        fp["sha256"] = self.file_hash(path)
+        with open(sidecar, "w") as f:
+            json.dump(fp, f)
+        return fp
+
+    def read_chunks(self, path: str, chunksize: Optional[int],
+                    parse: Callable[[str, Optional[int]], Iterator[pd.DataFrame]],
+                    stats: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+        """
+        Yields the shard's normalized chunks, from the Parquet copy when the
+        fingerprint is known, otherwise via `parse` while writing the Parquet
+        copy alongside. `stats` (if given) receives source ('cache'/'csv'),
+        rows and the seconds spent producing the chunks.
+        """
+        stats = stats if stats is not None else {}
+        start = time.perf_counter()
+        fp = self.fingerprint(path)
+        data_path = self._data_path(fp["sha256"])
+        stats.update(file=path, sha256=fp["sha256"], rows=0, seconds=0.0)
+
+        if os.path.exists(data_path):
+            stats["source"] = "cache"
+            batches = pq.ParquetFile(data_path).iter_batches(batch_size=chunksize or 1_000_000)
+            chunks = (batch.to_pandas() for batch in batches)
+        else:
+            stats["source"] = "csv"
+            chunks = self._parse_and_store(path, chunksize, parse, data_path)
+
+        stats["seconds"] += time.perf_counter() - start
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            stats["seconds"] += time.perf_counter() - start
+            if chunk is None:
+                return
+            stats["rows"] += len(chunk)
+            yield chunk
+
+    @staticmethod
+    def _parse_and_store(path: str, chunksize: Optional[int],
+                         parse: Callable[[str, Optional[int]], Iterator[pd.DataFrame]],
+                         data_path: str) -> Iterator[pd.DataFrame]:
+        # Write to a temp file and rename so a crashed run never leaves a partial entry
+        tmp_path = f"{data_path}.{os.getpid()}.tmp"
+        writer = None
+        try:
+            for chunk in parse(path, chunksize):
+                # Categoricals are stored as plain (dictionary-encoded) strings so
+                # chunks with different category sets share one file schema. astype(object)
+                # keeps missing keys null; astype(str) would store them as 'nan' on pandas 2.x
+                categorical = set(chunk.select_dtypes('category').columns)
+                table = pa.Table.from_pandas(chunk.astype({col: object for col in categorical}), preserve_index=False)
+                table = table.cast(pa.schema([
+                    pa.field(field.name, pa.string()) if field.name in categorical else field
+                    for field in table.schema
+                ]))
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+                yield chunk
+            if writer is not None:
+                writer.close()
+                writer = None
+                os.replace(tmp_path, data_path)
+        finally:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def summarize(stats: List[Dict]) -> Dict:
+        """Cold (parsed from CSV) vs warm (served from cache) shard counts and timings."""
+        summary = {"cold_shards": 0, "cold_seconds": 0.0, "warm_shards": 0, "warm_seconds": 0.0}
+        for entry in stats:
+            prefix = "warm" if entry.get("source") == "cache" else "cold"
+            summary[f"{prefix}_shards"] += 1
+            summary[f"{prefix}_seconds"] += entry.get("seconds", 0.0)
+        return summary
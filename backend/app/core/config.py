@@ -1,4 +1,5 @@
 import os
+from typing import List, Union
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,6 +8,72 @@ class Settings(BaseSettings):
     # Use SQLite for local development
     DATABASE_URL: str = "sqlite:///./aari.db"
 
+    # "sync" serves the API from threadpool handlers, "async" from async handlers on an async driver
+    API_MODE: str = "sync"
+    # Async driver URL for API_MODE=async; empty derives it from DATABASE_URL (sqlite -> sqlite+aiosqlite)
+    ASYNC_DATABASE_URL: str = ""
+
+    # Database engine profile
+    # Connections kept open per process, plus the overflow allowed under load
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Seconds to wait for a free pooled connection
+    DB_POOL_TIMEOUT: float = 30.0
+    # WAL lets readers keep the last committed snapshot while the pipeline writes
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    # NORMAL is durable across application crashes in WAL mode (FULL also survives power loss)
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    # Bytes of the database file memory-mapped for reads; 0 disables
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    # Page cache per connection, in KiB
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    # Milliseconds a connection waits on a locked database before failing
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+
+    # Pipeline
+    # Rows per executemany batch when bulk loading district_metrics
+    PIPELINE_BATCH_SIZE: int = 5000
+    # Rows per CSV chunk when streaming source files; 0 loads whole files at once
+    LOAD_CHUNK_SIZE: int = 100_000
+    # Worker processes used to parse CSV shards in parallel; 1 keeps loading in-process
+    LOAD_WORKERS: int = 1
+    # Directory for the Parquet cache of parsed CSV shards; empty disables caching
+    SHARD_CACHE_DIR: str = ""
+    # Explicit formats tried (in order) when rolling source dates up to YYYY-MM
+    SOURCE_DATE_FORMATS: List[str] = ["%d-%m-%Y", "%Y-%m-%d", "%Y-%m"]
+
+    # Anomaly model
+    # Path of the persisted IsolationForest; empty refits a fresh model on every run
+    MODEL_PATH: str = ""
+    # Trees in the forest, and rows subsampled per tree ("auto" = min(256, rows))
+    MODEL_N_ESTIMATORS: int = 100
+    MODEL_MAX_SAMPLES: Union[int, float, str] = "auto"
+    # Age in days after which the persisted model is refitted; 0 refits every run
+    MODEL_RETRAIN_DAYS: float = 7.0
+    # Refit when more than this share of newly scored rows falls outside the training score range
+    MODEL_DRIFT_TOLERANCE: float = 0.1
+    # "" fits one global model; "state" / "month" fit one model per partition,
+    # MODEL_WORKERS partitions at a time in separate processes
+    MODEL_PARTITION: str = ""
+    MODEL_WORKERS: int = 1
+
+    # "batch" min-max normalizes risk over each run's table; "calibrated" reuses the
+    # model's stored training range, so untouched rows keep their scores
+    RISK_SCORING: str = "batch"
+
+    # API pagination
+    # Rows per /api/map page when no limit is given, and the largest limit /api/map and /api/risk/top accept
+    API_PAGE_SIZE: int = 1000
+    API_MAX_PAGE_SIZE: int = 5000
+
+    # API response cache
+    # Maximum cached responses; 0 disables the cache
+    RESPONSE_CACHE_MAX_ENTRIES: int = 256
+    # Upper bound on the total size of cached response bodies
+    RESPONSE_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    # Seconds between data_version checks; 0 checks on every request
+    RESPONSE_CACHE_VERSION_TTL: float = 1.0
+
     class Config:
         case_sensitive = True
 
@@ -0,0 +1,159 @@
+"""
+Run and request instrumentation: per-stage wall/CPU time, row counts and
+peak RSS for pipeline runs (stored in pipeline_runs), and the latency
+histograms behind the Prometheus /metrics endpoint (app/api/metrics.py).
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def cpu_seconds() -> float:
+    """User + system CPU of this process and of its reaped children (e.g. loader / model pool workers)."""
+    if resource is None:
+        return time.process_time()
+    own, children = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def reset_peak_rss():
+    """Restarts the kernel's RSS high-water mark (Linux), so each stage reports its own peak."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss() -> Optional[int]:
+    """Peak resident set size in bytes since the last reset_peak_rss (else since process start)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if os.uname().sysname == "Darwin" else maxrss * 1024
+
+
+class RunStats:
+    """
+    Collects the stages of one pipeline run. Each stage records wall and
+    CPU seconds, rows in/out and the process' peak RSS while it ran.
+    """
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.status = "ok"
+        self.rows: Optional[int] = None
+        self.started_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        self.stages: List[Dict] = []
+        self._wall = time.perf_counter()
+        self._cpu = cpu_seconds()
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None) -> Iterator[Dict]:
+        """Times the block; set `rows_out` on the yielded record."""
+        record = {"stage": name, "rows_in": rows_in, "rows_out": None}
+        reset_peak_rss()
+        wall, cpu = time.perf_counter(), cpu_seconds()
+        try:
+            yield record
+        finally:
+            record.update(
+                wall_seconds=time.perf_counter() - wall,
+                cpu_seconds=cpu_seconds() - cpu,
+                peak_rss_bytes=peak_rss(),
+            )
+            self.stages.append(record)
+            rss = record["peak_rss_bytes"]
+            print(f"  [{name}] {record['wall_seconds']:.2f}s wall, {record['cpu_seconds']:.2f}s CPU"
+                  + (f", peak RSS {rss / 2**20:.0f} MiB" if rss is not None else ""))
+
+    def row(self) -> Dict:
+        """Column values for the pipeline_runs row."""
+        peaks = [s["peak_rss_bytes"] for s in self.stages if s["peak_rss_bytes"] is not None]
+        return dict(
+            mode=self.mode,
+            status=self.status,
+            started_at=self.started_at,
+            wall_seconds=time.perf_counter() - self._wall,
+            cpu_seconds=cpu_seconds() - self._cpu,
+            peak_rss_bytes=max(peaks) if peaks else None,
+            rows=self.rows,
+            stages=json.dumps(self.stages),
+        )
+
+
+class Histogram:
+    """Thread-safe cumulative histogram per label set, in the Prometheus exposition model."""
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, +Inf count, sum)
+        self._series: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            series = self._series.setdefault(label_values, [[0] * len(self.buckets), 0, 0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(key, list(counts), total, value_sum) for key, (counts, total, value_sum) in self._series.items()]
+        for key, counts, total, value_sum in sorted(snapshot):
+            base = [f"{label}={quote(value)}" for label, value in zip(self.labels, key)]
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{label_set(base + ['le=' + quote(f'{bound:g}')])} {count}")
+            lines.append(f"{self.name}_bucket{label_set(base + ['le=' + quote('+Inf')])} {total}")
+            lines.append(f"{self.name}_sum{label_set(base)} {value_sum}")
+            lines.append(f"{self.name}_count{label_set(base)} {total}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def label_set(pairs: List[str]) -> str:
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def quote(value) -> str:
+    """A label value, quoted and escaped for the Prometheus text format."""
+    escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return '"' + escaped + '"'
+
+
+def metric_lines(name: str, kind: str, help: str, samples: List[Tuple[Dict[str, str], float]]) -> List[str]:
+    """Exposition lines of a gauge or counter: one sample per label dict."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        if value is not None:
+            lines.append(f"{name}{label_set([f'{k}={quote(v)}' for k, v in labels.items()])} {value}")
+    return lines
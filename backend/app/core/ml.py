@@ -1,48 +1,161 @@
+import os
+import time
+import joblib
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
+from datetime import datetime, timezone
 from sklearn.ensemble import IsolationForest
-from typing import Tuple
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
 
 class AnomalyDetector:
-    def __init__(self, contamination=0.05):
+    def __init__(self, contamination=0.05, n_estimators: Optional[int] = None, max_samples=None, n_jobs=-1):
         """
         Initialize Isolation Forest.
-        contamination: The proportion of outliers in the data set. 
+        contamination: The proportion of outliers in the data set.
+        n_estimators / max_samples: forest size and per-tree subsample
+        (defaults: MODEL_N_ESTIMATORS / MODEL_MAX_SAMPLES). A bounded
+        max_samples keeps fit cost flat as the history grows.
         """
-        self.model = IsolationForest(contamination=contamination, random_state=42, n_jobs=-1)
+        self.model = IsolationForest(
+            **self.forest_params(contamination, n_estimators, max_samples),
+            random_state=42,
+            n_jobs=n_jobs
+        )
+        self.init_state()
+
+    @staticmethod
+    def forest_params(contamination=0.05, n_estimators: Optional[int] = None, max_samples=None) -> Dict:
+        """IsolationForest parameters with the settings defaults filled in."""
+        return {
+            'contamination': contamination,
+            'n_estimators': n_estimators or settings.MODEL_N_ESTIMATORS,
+            'max_samples': settings.MODEL_MAX_SAMPLES if max_samples is None else max_samples,
+        }
+
+    def init_state(self):
+        """Fit state shared by the global and partitioned detectors."""
         self.features = ['asr', 'uii', 'tds', 'cbcg', 'aepg']
+        # Feature -> value filled into its missing entries, for the features the forest was
+        # fitted on: ones with no value in the training rows (ASR / AEPG when the source
+        # layout carries no population) are left out, other gaps take the training median
+        self.imputed: Optional[Dict[str, float]] = None
+        # (min, max) of decision_function over the training rows
+        self.bounds: Optional[Tuple[float, float]] = None
+        self.trained_at: Optional[datetime] = None
+        self.n_train = 0
+        self.timings: Dict[str, float] = {}
+        # Set when anything was fitted since load(), i.e. the detector needs saving
+        self.updated = False
 
     def train_and_predict(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
         """
         Trains the model on the provided metrics and returns risk scores and levels.
         """
-        # Select features for the model
-        # Handle nan/inf just in case, though processing should have caught them
-        X = df[self.features].fillna(0)
-        
-        # Fit and Predict
-        # Isolation Forest returns -1 for outliers and 1 for inliers
-        # decision_function returns anomaly score (lower is more anomalous)
-        self.model.fit(X)
-        self.raw_scores = self.model.decision_function(X)
-        
-        # Normalize scores to 0-100 scale where 100 is HIGHEST RISK
-        # Raw scores are usually centered around 0, with negative being anomalies
-        # We invert this: Lower raw score = Higher Risk
-        
-        # Min-max normalization helper
-        min_score = self.raw_scores.min()
-        max_score = self.raw_scores.max()
-        
-        # Invert: (max - x) / (max - min) * 100
-        # If range is 0, default to 0
-        if max_score == min_score:
-            risk_scores = np.zeros(len(self.raw_scores))
-        else:
-            risk_scores = ((max_score - self.raw_scores) / (max_score - min_score)) * 100
-            
+        self.raw_scores = self.fit(df)
+        risk_scores = self.normalize(self.raw_scores, self.raw_scores.min(), self.raw_scores.max())
         return risk_scores, self.categorize_risk(risk_scores)
 
+    def fit(self, df: pd.DataFrame) -> np.ndarray:
+        """Fits the forest on df and returns its raw scores for df."""
+        start = time.perf_counter()
+        features = df[self.features]
+        self.imputed = {col: float(features[col].median()) for col in self.features if features[col].notna().any()}
+        self.model.fit(self.matrix(df))
+        self.timings['fit_seconds'] = time.perf_counter() - start
+        self.trained_at = datetime.now(timezone.utc)
+        self.n_train = len(df)
+        self.updated = True
+
+        raw_scores = self.decision_scores(df)
+        self.bounds = (float(raw_scores.min()), float(raw_scores.max()))
+        return raw_scores
+
+    def decision_scores(self, df: pd.DataFrame, fit_unseen: bool = True) -> np.ndarray:
+        """
+        Raw anomaly scores from the fitted model.
+        Isolation Forest's decision_function is centered around 0, lower
+        (negative) being more anomalous. `fit_unseen` only matters for
+        partitioned detectors.
+        """
+        start = time.perf_counter()
+        raw_scores = self.model.decision_function(self.matrix(df)) if len(df) else np.empty(0)
+        self.timings['score_seconds'] = time.perf_counter() - start
+        self.timings['scored_rows'] = len(df)
+        return raw_scores
+
+    def matrix(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Select features for the model, with their missing entries imputed
+        # (models saved before `imputed` existed were fitted on every feature, NaN -> 0)
+        imputed = getattr(self, 'imputed', None)
+        if imputed is None:
+            return df[self.features].fillna(0)
+        return df[list(imputed)].fillna(imputed)
+
+    @staticmethod
+    def normalize(raw_scores: np.ndarray, min_score: float, max_score: float) -> np.ndarray:
+        """
+        Normalize scores to 0-100 scale where 100 is HIGHEST RISK.
+        We invert this: Lower raw score = Higher Risk
+        (max - x) / (max - min) * 100, clipped to the range; 0 if the range is empty.
+        """
+        if max_score == min_score:
+            return np.zeros(len(raw_scores))
+        risk_scores = ((max_score - raw_scores) / (max_score - min_score)) * 100
+        return np.clip(risk_scores, 0, 100)
+
+    def risk_scores(self, df: pd.DataFrame, raw_scores: np.ndarray, calibrated: bool) -> np.ndarray:
+        """
+        0-100 risk for df's raw scores: normalized with the training range
+        when calibrated, else with the min/max of raw_scores themselves.
+        """
+        low, high = self.bounds if calibrated else (raw_scores.min(), raw_scores.max())
+        return self.normalize(raw_scores, low, high)
+
+    def config(self) -> Dict:
+        """What a persisted model must match to be reused."""
+        params = self.model.get_params()
+        return {
+            'features': list(self.features),
+            **{key: params[key] for key in ('contamination', 'n_estimators', 'max_samples')},
+        }
+
+    def is_stale(self, max_age_days: float) -> bool:
+        """True when the model is unfitted or was trained more than max_age_days ago."""
+        if self.trained_at is None:
+            return True
+        age = datetime.now(timezone.utc) - self.trained_at
+        return age.total_seconds() > max_age_days * 86400
+
+    def drift(self, raw_scores: np.ndarray, df: Optional[pd.DataFrame] = None) -> float:
+        """Share of raw scores outside the training range: how unlike the training data a batch is."""
+        if self.bounds is None or len(raw_scores) == 0:
+            return 0.0
+        low, high = self.bounds
+        return float(np.mean((raw_scores < low) | (raw_scores > high)))
+
+    def save(self, path: str):
+        """Persists the fitted detector (model, bounds, training metadata) with joblib."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(self, tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path: str) -> Optional["AnomalyDetector"]:
+        """The detector saved at `path`, or None if there is none (or it cannot be read)."""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            detector = joblib.load(path)
+        except Exception as e:
+            print(f"Could not load anomaly model {path}: {e}")
+            return None
+        detector.timings = {}
+        detector.updated = False
+        return detector
+
     def categorize_risk(self, scores: np.ndarray) -> np.ndarray:
         """
         Maps 0-100 scores to Low, Medium, High, Priority
@@ -55,6 +168,127 @@ class AnomalyDetector:
             (scores > 80)
         ]
         choices = ['Low', 'Medium', 'High', 'Priority']
-        
+
         # specifically handle numpy array logic
         return np.select(conditions, choices, default='Low')
+
+
+class PartitionedAnomalyDetector(AnomalyDetector):
+    """
+    One AnomalyDetector per partition (`state` or `month`), so fit cost and
+    memory follow the partition size rather than the whole history.
+    Partitions are fitted on a process pool when workers > 1. Scores are
+    normalized within each partition. Partitions first seen at scoring time
+    (e.g. a new month) are fitted on the spot without touching the others,
+    unless the caller scores with fit_unseen=False (see detector_for).
+    """
+
+    def __init__(self, partition: str, workers: int = 1, **params):
+        if partition not in ('state', 'month'):
+            raise ValueError(f"Unknown MODEL_PARTITION {partition!r}; expected 'state' or 'month'")
+        # No whole-table forest: each partition's detector holds its own
+        self.init_state()
+        self.partition = partition
+        self.workers = workers
+        self.params = params
+        # Forests inside pool workers run single-threaded to avoid oversubscription
+        self.n_jobs = 1 if workers > 1 else -1
+        self.detectors: Dict[str, AnomalyDetector] = {}
+
+    def config(self) -> Dict:
+        return {'features': list(self.features), **self.forest_params(**self.params), 'partition': self.partition}
+
+    def fit(self, df: pd.DataFrame) -> np.ndarray:
+        start = time.perf_counter()
+        self.detectors = {}
+        raw_scores = self._fit_partitions(df)
+        self.timings['fit_seconds'] = time.perf_counter() - start
+        self.timings['score_seconds'] = 0.0
+        self.timings['scored_rows'] = len(df)
+        self.trained_at = datetime.now(timezone.utc)
+        self.n_train = len(df)
+        self.updated = True
+        return raw_scores
+
+    def decision_scores(self, df: pd.DataFrame, fit_unseen: bool = True) -> np.ndarray:
+        start = time.perf_counter()
+        raw_scores = np.empty(len(df))
+        positions = self._positions(df)
+        unseen = [key for key in positions if key not in self.detectors] if fit_unseen else []
+        if unseen:
+            rows = np.concatenate([positions[key] for key in unseen])
+            raw_scores[rows] = self._fit_partitions(df.iloc[rows])
+            self.updated = True
+        for key, rows in positions.items():
+            if key not in unseen:
+                raw_scores[rows] = self.detector_for(key).decision_scores(df.iloc[rows])
+        self.timings['score_seconds'] = time.perf_counter() - start
+        self.timings['scored_rows'] = len(df)
+        return raw_scores
+
+    def risk_scores(self, df: pd.DataFrame, raw_scores: np.ndarray, calibrated: bool) -> np.ndarray:
+        scores = np.zeros(len(df))
+        for key, rows in self._positions(df).items():
+            scores[rows] = self.detector_for(key).risk_scores(df.iloc[rows], raw_scores[rows], calibrated)
+        return scores
+
+    def drift(self, raw_scores: np.ndarray, df: Optional[pd.DataFrame] = None) -> float:
+        if df is None or len(raw_scores) == 0:
+            return 0.0
+        outside = np.zeros(len(raw_scores), dtype=bool)
+        for key, rows in self._positions(df).items():
+            low, high = self.detector_for(key).bounds
+            outside[rows] = (raw_scores[rows] < low) | (raw_scores[rows] > high)
+        return float(outside.mean())
+
+    def detector_for(self, key: str) -> AnomalyDetector:
+        """
+        The partition's detector. A month without one borrows the latest
+        fitted month before it (the earliest if there is none), so a few
+        streamed rows are scored and calibrated against a full partition
+        instead of a forest fitted on them alone. Unseen states have no
+        natural stand-in and are rejected.
+        """
+        if key in self.detectors:
+            return self.detectors[key]
+        if self.partition == 'month' and self.detectors:
+            seen = sorted(self.detectors)
+            earlier = [month for month in seen if month <= key]
+            return self.detectors[earlier[-1] if earlier else seen[0]]
+        raise ValueError(f"No {self.partition} model for {key!r}; run the pipeline to fit one")
+
+    def _positions(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Row positions of df per partition value."""
+        keys = df[self.partition].astype(str).to_numpy()
+        return {key: np.flatnonzero(keys == key) for key in pd.unique(keys)}
+
+    def _fit_partitions(self, df: pd.DataFrame) -> np.ndarray:
+        """Fits one detector per partition of df, adds them to self.detectors and returns df's raw scores."""
+        positions = self._positions(df)
+        pooled = self.workers > 1 and len(positions) > 1
+        # Forests inside pool workers run single-threaded; in-process ones use the detector's own n_jobs
+        n_jobs = 1 if pooled else getattr(self, 'n_jobs', -1)  # detectors saved before n_jobs was kept
+        jobs = [(key, df.iloc[rows][self.features], self.params, n_jobs) for key, rows in positions.items()]
+        if pooled:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(fit_partition, jobs))
+        else:
+            results = [fit_partition(job) for job in jobs]
+
+        raw_scores = np.empty(len(df))
+        for key, detector, partition_scores in results:
+            self.detectors[key] = detector
+            raw_scores[positions[key]] = partition_scores
+        return raw_scores
+
+
+def fit_partition(job) -> Tuple[str, AnomalyDetector, np.ndarray]:
+    """Fits a detector on one partition's feature rows (run in a pool worker, or in-process)."""
+    key, features, params, n_jobs = job
+    detector = AnomalyDetector(**params, n_jobs=n_jobs)
+    return key, detector, detector.fit(features)
+
+
+def make_detector(partition: str = "", workers: int = 1):
+    """A global AnomalyDetector, or a PartitionedAnomalyDetector when `partition` is set."""
+    return PartitionedAnomalyDetector(partition, workers) if partition else AnomalyDetector()
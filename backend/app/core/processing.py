@@ -1,12 +1,32 @@
 import pandas as pd
 import numpy as np
 import glob
+import json
 import os
-from typing import List, Dict
-from app.db.database import SessionLocal, engine, Base
-from app.db.models import DistrictMetric
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from sqlalchemy import Index, MetaData, Table, bindparam, delete, insert, inspect, select, text, tuple_, update
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.core.instrumentation import RunStats
+from app.core.schema import SchemaAdapter
+from app.db.database import engine
+from app.db.migrations import init_db
+from app.db.models import (
+    DataVersion, DistrictCurrent, DistrictMetric, IngestedShard, MetricSummary, PipelineRun, ShardPartial
+)
 
 class DataLoader:
+    # Columns kept as categoricals from parse time on
+    KEY_COLUMNS = ['state', 'district', 'month', 'date']
+    # Non-count columns that must keep NaN (averaged rather than summed)
+    FLOAT_COLUMNS = {'population_estimate'}
+    # Version of the parse_chunks output stored in the shard cache; bump it whenever that output changes
+    # (2: SchemaAdapter canonical columns instead of the raw source columns)
+    PARSE_VERSION = 2
+
     @staticmethod
     def load_dataset(folder_path: str) -> pd.DataFrame:
         """Loads all CSVs in a directory and concatenates them."""
@@ -35,61 +55,299 @@ class DataLoader:
         df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_').str.replace('-', '_')
         return df
 
+    @staticmethod
+    def parse_chunks(filename: str, chunksize: Optional[int]) -> Iterator[pd.DataFrame]:
+        """
+        Parses one CSV into normalized chunks of at most `chunksize` rows
+        (whole file if falsy). Keys are parsed straight to categoricals, every
+        chunk goes through compact_dtypes, and SchemaAdapter maps the source
+        layout (UIDAI or legacy) onto the canonical metric inputs with
+        `month` rolled up from `date`, so all chunks share one schema.
+        """
+        header = pd.read_csv(filename, nrows=0).columns
+        normalized = DataLoader.normalize_columns(pd.DataFrame(columns=header)).columns
+        dtypes = {raw: 'category' for raw, col in zip(header, normalized) if col in DataLoader.KEY_COLUMNS}
+
+        reader = pd.read_csv(filename, chunksize=chunksize, dtype=dtypes) if chunksize \
+            else [pd.read_csv(filename, dtype=dtypes)]
+        for chunk in reader:
+            chunk = DataLoader.compact_dtypes(DataLoader.normalize_columns(chunk))
+            yield SchemaAdapter.adapt(chunk)
+
+    @staticmethod
+    def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fixes the in-memory schema of a normalized chunk: key and date columns
+        as categoricals, FLOAT_COLUMNS as float64 (NaN kept so means skip it)
+        and every other column as an int32 count (NaN -> 0, same as for a sum).
+        """
+        for col in df.columns:
+            if col in DataLoader.KEY_COLUMNS:
+                if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                    df[col] = df[col].astype('category')
+            elif col in DataLoader.FLOAT_COLUMNS:
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+            else:
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('int32')
+        return df
+
+    @staticmethod
+    def read_chunks(filename: str, chunksize: Optional[int], cache_dir: Optional[str] = None,
+                    stats: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+        """Yields normalized chunks of one CSV, through the Parquet shard cache when cache_dir is set."""
+        if cache_dir:
+            from app.core.cache import ShardCache
+            chunks = ShardCache(cache_dir, DataLoader.cache_variant()).read_chunks(
+                filename, chunksize, DataLoader.parse_chunks, stats
+            )
+            return (DataLoader.compact_dtypes(chunk) for chunk in chunks)
+        if stats is not None:
+            stats.update(file=filename, source='csv')
+        return DataLoader.parse_chunks(filename, chunksize)
+
+    @staticmethod
+    def cache_variant() -> str:
+        """Everything besides the file content that shapes parse_chunks output, for the shard cache key."""
+        return json.dumps([DataLoader.PARSE_VERSION, list(settings.SOURCE_DATE_FORMATS)])
+
+    @staticmethod
+    def aggregate_shard(filename: str, agg_spec: Dict[str, str], chunksize: Optional[int],
+                        cache_dir: Optional[str] = None) -> Tuple[Optional[pd.DataFrame], Dict]:
+        """
+        Streams one CSV shard and returns its merged district-month partials
+        (None on error) along with load stats (source, rows, seconds).
+        """
+        stats = {}
+        start = time.perf_counter()
+        merged = None
+        try:
+            for chunk in DataLoader.read_chunks(filename, chunksize, cache_dir, stats):
+                partial = DataLoader.partial_aggregate(chunk, agg_spec)
+                merged = partial if merged is None else DataLoader.merge_partials([merged, partial])
+        except Exception as e:
+            print(f"Error reading {filename}: {e}")
+            merged = None
+        stats['total_seconds'] = time.perf_counter() - start
+        return merged, stats
+
+    @staticmethod
+    def load_aggregated(folder_path: str, agg_spec: Dict[str, str], chunksize: Optional[int],
+                        cache_dir: Optional[str] = None) -> pd.DataFrame:
+        """
+        Streams every CSV in a directory in chunks and pre-aggregates each chunk
+        to district-month level, merging the partial aggregates as it goes.
+        Peak memory is bounded by chunksize plus the number of district-months,
+        independent of the number of raw rows.
+        agg_spec maps column -> 'sum' | 'mean' (same form as MetricEngine.*_AGG).
+        """
+        return DataLoader.load_many({folder_path: (folder_path, agg_spec)}, chunksize,
+                                    cache_dir=cache_dir)[folder_path]
+
+    @staticmethod
+    def list_shards(folder_path: str) -> List[str]:
+        """Returns the CSV shards of a dataset folder in a stable (sorted) order."""
+        files = sorted(os.path.abspath(f) for f in glob.glob(os.path.join(folder_path, "*.csv")))
+        if not files:
+            print(f"Warning: No valid CSV files found in {folder_path}")
+        return files
+
+    @staticmethod
+    def load_many(datasets: Dict[str, Tuple[str, Dict[str, str]]], chunksize: Optional[int],
+                  workers: int = 1, cache_dir: Optional[str] = None,
+                  stats: Optional[List[Dict]] = None,
+                  partials: Optional[Dict[str, Tuple[str, pd.DataFrame]]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Aggregates several dataset folders ({name: (folder_path, agg_spec)}).
+        See aggregate_shards for the parallel, stats and partials options.
+        """
+        shards = {
+            name: (DataLoader.list_shards(folder_path), spec)
+            for name, (folder_path, spec) in datasets.items()
+        }
+        return DataLoader.aggregate_shards(shards, chunksize, workers, cache_dir, stats, partials)
+
+    @staticmethod
+    def aggregate_shards(shards: Dict[str, Tuple[List[str], Dict[str, str]]], chunksize: Optional[int],
+                         workers: int = 1, cache_dir: Optional[str] = None,
+                         stats: Optional[List[Dict]] = None,
+                         partials: Optional[Dict[str, Tuple[str, pd.DataFrame]]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Aggregates explicit shard lists ({name: (files, agg_spec)}).
+        With workers > 1 every shard of every dataset is parsed on a shared
+        process pool; partials are merged in the given file order either way,
+        so the result is identical to the serial path. Per-shard load stats
+        are appended to `stats`, and each shard's own partial is recorded in
+        `partials` as {path: (name, partial)} when given.
+        """
+        stats = stats if stats is not None else []
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    name: [pool.submit(DataLoader.aggregate_shard, f, spec, chunksize, cache_dir) for f in files]
+                    for name, (files, spec) in shards.items()
+                }
+                return {
+                    name: DataLoader.fold_partials(name, (future.result() for future in pending),
+                                                   shards[name][1], stats, partials)
+                    for name, pending in futures.items()
+                }
+
+        return {
+            name: DataLoader.fold_partials(
+                name, (DataLoader.aggregate_shard(f, spec, chunksize, cache_dir) for f in files),
+                spec, stats, partials
+            )
+            for name, (files, spec) in shards.items()
+        }
+
+    @staticmethod
+    def fold_partials(name: str, results: Iterator[Tuple[Optional[pd.DataFrame], Dict]], agg_spec: Dict[str, str],
+                      stats: List[Dict], partials: Optional[Dict[str, Tuple[str, pd.DataFrame]]] = None) -> pd.DataFrame:
+        """Merges shard partials one at a time, in order, so memory stays at one district-month set."""
+        merged = []
+        for partial, shard_stats in results:
+            stats.append(shard_stats)
+            if partial is not None:
+                if partials is not None:
+                    partials[shard_stats['file']] = (name, partial)
+                merged = [DataLoader.merge_partials(merged + [partial])]
+        return DataLoader.finalize_partials(merged, agg_spec)
+
+    @staticmethod
+    def partial_aggregate(df: pd.DataFrame, agg_spec: Dict[str, str]) -> pd.DataFrame:
+        """
+        Reduces raw rows to one partial row per (state, district, month).
+        Sums stay sums; means are carried as <col>__sum / <col>__count so that
+        partials from different chunks can be merged exactly.
+        """
+        grouped = df.groupby(MetricEngine.KEYS, observed=True)
+        parts = {}
+        for col, how in agg_spec.items():
+            if how == 'mean':
+                parts[f'{col}__sum'] = grouped[col].sum()
+                parts[f'{col}__count'] = grouped[col].count()
+            else:
+                parts[col] = grouped[col].sum()
+        return pd.DataFrame(parts).reset_index()
+
+    @staticmethod
+    def merge_partials(partials: List[pd.DataFrame]) -> pd.DataFrame:
+        """Combines partial aggregates; every partial column is additive."""
+        combined = pd.concat(MetricEngine.encode_keys(partials), ignore_index=True)
+        return combined.groupby(MetricEngine.KEYS, observed=True).sum().reset_index()
+
+    @staticmethod
+    def finalize_partials(partials: List[pd.DataFrame], agg_spec: Dict[str, str]) -> pd.DataFrame:
+        """Turns merged partials into the aggregated frame MetricEngine expects."""
+        if not partials:
+            empty = {key: pd.Series(dtype=object) for key in MetricEngine.KEYS}
+            empty.update({col: pd.Series(dtype='float64') for col in agg_spec})
+            return pd.DataFrame(empty)
+        merged = partials[0].copy() if len(partials) == 1 else DataLoader.merge_partials(partials)
+        for col, how in agg_spec.items():
+            if how == 'mean':
+                merged[col] = merged.pop(f'{col}__sum') / merged.pop(f'{col}__count')
+        return merged[MetricEngine.KEYS + list(agg_spec)]
+
+    @staticmethod
+    def partials_to_long(partials: Dict[str, Tuple[str, pd.DataFrame]]) -> pd.DataFrame:
+        """Flattens {path: (dataset, partial)} into shard_partials rows."""
+        frames = []
+        for path, (dataset, partial) in partials.items():
+            long = partial.melt(id_vars=MetricEngine.KEYS, var_name='field', value_name='value')
+            long['shard_path'] = path
+            long['dataset'] = dataset
+            frames.append(long)
+        if not frames:
+            return pd.DataFrame(columns=['shard_path', 'dataset'] + MetricEngine.KEYS + ['field', 'value'])
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def partials_from_long(long_df: pd.DataFrame, dataset: str, agg_spec: Dict[str, str]) -> pd.DataFrame:
+        """Sums one dataset's shard_partials rows back into the aggregated loader output."""
+        partial = DataLoader.partial_from_long(long_df, dataset)
+        return DataLoader.finalize_partials([] if partial is None else [partial], agg_spec)
+
+    @staticmethod
+    def partial_from_long(long_df: pd.DataFrame, dataset: str) -> Optional[pd.DataFrame]:
+        """One dataset's shard_partials rows summed into a single wide partial (None without rows)."""
+        rows = long_df[long_df['dataset'] == dataset]
+        if rows.empty:
+            return None
+        wide = rows.groupby(MetricEngine.KEYS + ['field'], observed=True)['value'].sum().unstack('field', fill_value=0)
+        wide.columns.name = None
+        return wide.reset_index()
+
 class MetricEngine:
+    KEYS = ['state', 'district', 'month']
+    # Months in the trailing window used for the Temporal Deviation Score
+    TDS_WINDOW = 3
+    # Additive measures behind each metric_summaries row (averages are sum / non-null count)
+    SUMMARY_SUMS = ['total_enrolments', 'asr_sum', 'saturation_count', 'uii_sum', 'uii_count',
+                    'risk_sum', 'risk_count', 'high_risk_districts', 'district_months']
+
+    # District-month aggregation of the canonical inputs (see SchemaAdapter)
+    ENROL_AGG = {
+        'total_enrolments': 'sum',
+        'population_estimate': 'mean', # Pop shouldn't sum across chunks if it's snapshot
+        'age_0_5': 'sum',
+        'age_5_18': 'sum'
+    }
+    DEMO_AGG = {
+        'total_demo_updates': 'sum'
+    }
+    BIO_AGG = {
+        'total_bio_updates': 'sum',
+        'child_biometric_updates': 'sum'
+    }
+
     @staticmethod
     def calculate_metrics(enrol_df: pd.DataFrame, demo_df: pd.DataFrame, bio_df: pd.DataFrame) -> pd.DataFrame:
         """
         Merge datasets and compute core risk metrics.
         Assumes common keys: district, state, month (or date normalized to mo).
         """
-        # 1. Normalize Date/Month to YYYY-MM
-        # Enrolment has 'date', others have 'month'. Standardize to 'month'
-        if 'date' in enrol_df.columns:
-            enrol_df['month'] = enrol_df['date']
+        # 1. Map source layouts (UIDAI pincode-day or legacy) to canonical inputs
+        # with 'month' as YYYY-MM. Already-aggregated inputs pass through.
+        enrol_df = SchemaAdapter.adapt(enrol_df, 'enrolment')
+        demo_df = SchemaAdapter.adapt(demo_df, 'demographic_update')
+        bio_df = SchemaAdapter.adapt(bio_df, 'biometric_update')
+
+        # Integer-coded keys shared by all three inputs: groupby/merge hash codes, not strings
+        enrol_df, demo_df, bio_df = MetricEngine.encode_keys([enrol_df, demo_df, bio_df])
         
         # 2. Aggregation to District-Month level
         # Enrolment is likely already snapshot-based, but we ensure uniqueness
-        base_df = enrol_df.groupby(['state', 'district', 'month']).agg({
-           'total_enrolments': 'sum',
-           'population_estimate': 'mean', # Pop shouldn't sum across chunks if it's snapshot
-           'age_0_5': 'sum',
-           'age_5_18': 'sum'
-        }).reset_index()
+        base_df = enrol_df.groupby(MetricEngine.KEYS, observed=True).agg(MetricEngine.ENROL_AGG).reset_index()
 
         # Demographic Updates Aggregation
-        demo_agg = demo_df.groupby(['state', 'district', 'month']).agg({
-            'update_name': 'sum',
-            'update_address': 'sum', 
-            'update_dob': 'sum',
-            'update_gender': 'sum',
-            'update_mobile': 'sum'
-        }).reset_index()
-        demo_agg['total_demo_updates'] = (
-            demo_agg['update_name'] + demo_agg['update_address'] + 
-            demo_agg['update_dob'] + demo_agg['update_gender'] + 
-            demo_agg['update_mobile']
-        )
+        demo_agg = demo_df.groupby(MetricEngine.KEYS, observed=True).agg(MetricEngine.DEMO_AGG).reset_index()
 
         # Biometric Updates Aggregation
-        bio_agg = bio_df.groupby(['state', 'district', 'month']).agg({
-             'update_fingerprint': 'sum',
-             'update_iris': 'sum', 
-             'update_face': 'sum',
-             'child_biometric_updates': 'sum'
-        }).reset_index()
-        bio_agg['total_bio_updates'] = (
-            bio_agg['update_fingerprint'] + bio_agg['update_iris'] + bio_agg['update_face']
-        )
+        bio_agg = bio_df.groupby(MetricEngine.KEYS, observed=True).agg(MetricEngine.BIO_AGG).reset_index()
         
         # 3. Operations Merge
-        merged = pd.merge(base_df, demo_agg, on=['state', 'district', 'month'], how='left').fillna(0)
-        merged = pd.merge(merged, bio_agg, on=['state', 'district', 'month'], how='left').fillna(0)
+        # A district-month without updates has zero of them; population stays NULL when unknown
+        merged = pd.merge(base_df, demo_agg, on=MetricEngine.KEYS, how='left')
+        merged = pd.merge(merged, bio_agg, on=MetricEngine.KEYS, how='left')
+        updates = list(MetricEngine.DEMO_AGG) + list(MetricEngine.BIO_AGG)
+        merged[updates] = merged[updates].fillna(0)
 
         # 4. Metric Computation
-        
+        return MetricEngine.derive_metrics(merged)
+
+    @staticmethod
+    def derive_metrics(merged: pd.DataFrame) -> pd.DataFrame:
+        """
+        ASR, UII, CBCG, AEPG and TDS from district-month aggregates of the
+        ENROL_AGG / DEMO_AGG / BIO_AGG inputs. TDS needs every month of a
+        district in the frame. Returns the frame sorted by KEYS.
+        """
         # ASR: Aadhaar Saturation Ratio
         # ASR = total_enrolments / population_estimate * 100
-        merged['asr'] = (merged['total_enrolments'] / merged['population_estimate'] * 100).replace([np.inf, -np.inf], 0).fillna(0)
+        # NULL when the population is unknown (UIDAI extracts carry none) or zero
+        population = merged['population_estimate'].where(merged['population_estimate'] > 0)
+        merged['asr'] = merged['total_enrolments'] / population * 100
         
         # UII: Update Intensity Index 
         # UII = (demographic_updates + biometric_updates) / active_aadhaar_base (total_enrolments)
@@ -106,87 +364,771 @@ class MetricEngine:
 
         # AEPG: Aadhaar Equity Penetration Gap
         # Proxy: Difference between saturation and an ideal 100%, possibly weighted by sub-groups if we had them.
-        # For now, simplistic: 100 - ASR (The gap itself)
+        # For now, simplistic: 100 - ASR (The gap itself); NULL with ASR
         merged['aepg'] = (100 - merged['asr']).clip(0, 100)
 
         # TDS: Temporal Deviation Score
-        # We calculate this later or per-group row operation
-        # For efficiency, we can do a rolling calc per district
-        merged = merged.sort_values(by=['district', 'month'])
-        merged['rolling_mean_uii'] = merged.groupby('district')['uii'].transform(lambda x: x.rolling(3, min_periods=1).mean())
-        merged['rolling_std_uii'] = merged.groupby('district')['uii'].transform(lambda x: x.rolling(3, min_periods=1).std())
+        # Rolling UII stats per (state, district) over the last TDS_WINDOW months,
+        # computed in one vectorized pass (district names repeat across states)
+        merged = merged.sort_values(by=MetricEngine.KEYS).reset_index(drop=True)
+        group_ids = merged.groupby(['state', 'district'], sort=False, observed=True).ngroup().to_numpy()
+        merged['rolling_mean_uii'], merged['rolling_std_uii'] = MetricEngine.rolling_stats(
+            merged['uii'].to_numpy(dtype='float64'), group_ids, MetricEngine.TDS_WINDOW
+        )
         
         # TDS based on UII spikes
         merged['tds'] = ((merged['uii'] - merged['rolling_mean_uii']) / merged['rolling_std_uii']).fillna(0)
         
         return merged
 
+    @staticmethod
+    def summarize(metrics_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Rows for the metric_summaries rollup cube: (state, month) cells plus
+        national-per-month ('', month), per-state all-time (state, '') and
+        national all-time ('', '') rows. One groupby over the metrics yields
+        additive sums and non-null counts per cell; the coarser levels are
+        sums of those cells, so averages stay exact (AVG semantics, NULLs
+        skipped) without another pass over the district rows. Same
+        definitions as the live /national/summary aggregates.
+        """
+        return MetricEngine.summary_rows(MetricEngine.rollup(MetricEngine.summary_cells(metrics_df)))
+
+    @staticmethod
+    def summary_cells(metrics_df: pd.DataFrame) -> pd.DataFrame:
+        """Additive measures (SUMMARY_SUMS) per (state, month) cell of a metrics frame."""
+        df = pd.DataFrame({
+            'state': metrics_df['state'],
+            'month': metrics_df['month'],
+            'total_enrolments': metrics_df['total_enrolments'],
+            'asr': metrics_df['asr'],
+            'uii': metrics_df['uii'],
+            'risk_score': metrics_df['risk_score'],
+            'high_risk': metrics_df['risk_level'].astype(str).isin(['High', 'Priority']),
+        })
+        cells = df.groupby(['state', 'month'], observed=True).agg(
+            total_enrolments=('total_enrolments', 'sum'),
+            asr_sum=('asr', 'sum'), saturation_count=('asr', 'count'),
+            uii_sum=('uii', 'sum'), uii_count=('uii', 'count'),
+            risk_sum=('risk_score', 'sum'), risk_count=('risk_score', 'count'),
+            high_risk_districts=('high_risk', 'sum'),
+            district_months=('month', 'size'),
+        ).reset_index()
+        cells['state'] = cells['state'].astype(str)
+        cells['month'] = cells['month'].astype(str)
+        return cells[['state', 'month'] + MetricEngine.SUMMARY_SUMS]
+
+    @staticmethod
+    def rollup(cells: pd.DataFrame, with_cells: bool = True) -> pd.DataFrame:
+        """The ('', ''), ('', month) and (state, '') sums of (state, month) cells (and the cells themselves)."""
+        def level(**fixed):
+            return cells.assign(**fixed).groupby(['state', 'month'], as_index=False).sum()
+
+        levels = [level(state='', month=''), level(state=''), level(month='')]
+        return pd.concat(levels + ([cells] if with_cells else []), ignore_index=True)
+
+    @staticmethod
+    def summary_rows(sums: pd.DataFrame) -> pd.DataFrame:
+        """metric_summaries rows from summed measures; an average over no values is NULL."""
+        return pd.DataFrame({
+            'state': sums['state'],
+            'month': sums['month'],
+            'total_enrolments': sums['total_enrolments'].astype('int64'),
+            'average_saturation': sums['asr_sum'] / sums['saturation_count'].replace(0, np.nan),
+            'average_uii': sums['uii_sum'] / sums['uii_count'].replace(0, np.nan),
+            'national_risk_index': sums['risk_sum'] / sums['risk_count'].replace(0, np.nan),
+            'high_risk_districts': sums['high_risk_districts'].astype('int64'),
+            'district_months': sums['district_months'].astype('int64'),
+            'saturation_count': sums['saturation_count'].astype('int64'),
+            'uii_count': sums['uii_count'].astype('int64'),
+            'risk_count': sums['risk_count'].astype('int64'),
+        })
+
+    @staticmethod
+    def summary_sums(rows: pd.DataFrame) -> pd.DataFrame:
+        """Inverse of summary_rows: the summed measures behind stored metric_summaries rows."""
+        sums = rows[['state', 'month', 'total_enrolments', 'high_risk_districts', 'district_months',
+                     'saturation_count', 'uii_count', 'risk_count']].copy()
+        for total, average, count in [('asr_sum', 'average_saturation', 'saturation_count'),
+                                      ('uii_sum', 'average_uii', 'uii_count'),
+                                      ('risk_sum', 'national_risk_index', 'risk_count')]:
+            sums[total] = (rows[average].astype('float64') * rows[count]).fillna(0)
+        return sums[['state', 'month'] + MetricEngine.SUMMARY_SUMS]
+
+    @staticmethod
+    def latest(metrics_df: pd.DataFrame) -> pd.DataFrame:
+        """Each (state, district)'s row for its most recent month, for district_current."""
+        return metrics_df.sort_values('month', kind='stable').drop_duplicates(['state', 'district'], keep='last')
+
+    @staticmethod
+    def encode_keys(frames: List[pd.DataFrame], keys: Optional[List[str]] = None) -> List[pd.DataFrame]:
+        """
+        Converts the key columns of every frame to one shared categorical
+        dtype with lexically sorted categories, so concat/merge keep the
+        integer codes and sorting by codes matches sorting by the strings.
+        Frames are modified in place and returned for convenience.
+        """
+        for key in keys or MetricEngine.KEYS:
+            columns = [f[key] if isinstance(f[key].dtype, pd.CategoricalDtype) else f[key].astype('category')
+                       for f in frames]
+            categories = set()
+            for column in columns:
+                categories.update(column.cat.categories)
+            dtype = pd.CategoricalDtype(sorted(categories))
+            for frame, column in zip(frames, columns):
+                frame[key] = column.astype(dtype)
+        return frames
+
+    @staticmethod
+    def decode_keys(df: pd.DataFrame) -> pd.DataFrame:
+        """Turns categorical keys back into plain strings (DB/API boundary)."""
+        for key in MetricEngine.KEYS:
+            if isinstance(df[key].dtype, pd.CategoricalDtype):
+                df[key] = df[key].astype(str)
+        return df
+
+    @staticmethod
+    def rolling_stats(values: np.ndarray, group_ids: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Trailing rolling mean and sample std (ddof=1) of `values` within
+        contiguous groups, equivalent to
+        groupby(...).rolling(window, min_periods=1).agg(['mean', 'std']).
+        Rows must be sorted so each group is contiguous and time-ordered.
+        Works with `window` shifted copies of the array instead of a Python
+        callback per group; NaNs are skipped like pandas does.
+        """
+        n = len(values)
+        # Position of each row inside its group
+        starts = np.r_[0, np.flatnonzero(np.diff(group_ids)) + 1]
+        position = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+
+        lags = []
+        for lag in range(window):
+            shifted = np.full(n, np.nan)
+            shifted[lag:] = values[:n - lag]
+            shifted[position < lag] = np.nan
+            lags.append(shifted)
+        stacked = np.vstack(lags)
+        present = ~np.isnan(stacked)
+
+        counts = present.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(present, stacked, 0).sum(axis=0) / counts
+            # Two-pass variance keeps constant windows at exactly 0
+            squares = np.where(present, (stacked - mean) ** 2, 0).sum(axis=0)
+            std = np.sqrt(squares / (counts - 1))
+        std[counts < 2] = np.nan
+        return mean, std
+
 class DataPipeline:
-    def __init__(self, base_dir="backend/data/datasets"):
+    # Columns persisted to district_metrics, in table order
+    DB_COLUMNS = [
+        'state', 'district', 'month', 'population_estimate', 'total_enrolments',
+        'asr', 'uii', 'tds', 'cbcg', 'aepg', 'anomaly_score', 'risk_score', 'risk_level'
+    ]
+    # shard_partials path prefix of streamed updates (see app/core/streaming.py), one pseudo-shard per
+    # dataset. They have no source file, so incremental runs never see them as stale or removed
+    STREAM_SHARD = "stream:"
+    # Full reloads are built here and renamed into place; the replaced table is kept for rollback()
+    STAGING_TABLE = "district_metrics_staging"
+    PREVIOUS_TABLE = "district_metrics_prev"
+    DATASETS = [
+        ("enrolment", MetricEngine.ENROL_AGG),
+        ("demographic_update", MetricEngine.DEMO_AGG),
+        ("biometric_update", MetricEngine.BIO_AGG),
+    ]
+
+    def __init__(self, base_dir="backend/data/datasets", bind: Optional[Engine] = None,
+                 batch_size: Optional[int] = None, chunksize: Optional[int] = None,
+                 workers: Optional[int] = None, cache_dir: Optional[str] = None,
+                 model_path: Optional[str] = None, retrain: bool = False, scoring: Optional[str] = None,
+                 partition: Optional[str] = None, model_workers: Optional[int] = None):
         self.base_dir = base_dir
+        self.engine = bind if bind is not None else engine
+        self.batch_size = batch_size or settings.PIPELINE_BATCH_SIZE
+        self.chunksize = settings.LOAD_CHUNK_SIZE if chunksize is None else chunksize
+        self.workers = workers or settings.LOAD_WORKERS
+        self.cache_dir = settings.SHARD_CACHE_DIR if cache_dir is None else cache_dir
+        self.model_path = settings.MODEL_PATH if model_path is None else model_path
+        self.retrain = retrain
+        self.scoring = scoring or settings.RISK_SCORING
+        if self.scoring not in ('batch', 'calibrated'):
+            raise ValueError(f"Unknown RISK_SCORING {self.scoring!r}; expected 'batch' or 'calibrated'")
+        self.partition = settings.MODEL_PARTITION if partition is None else partition
+        if self.partition not in ('', 'state', 'month'):
+            raise ValueError(f"Unknown MODEL_PARTITION {self.partition!r}; expected '', 'state' or 'month'")
+        self.model_workers = model_workers or settings.MODEL_WORKERS
+        self.model_stats: Dict = {}
+        self.run_stats = RunStats('full')
+        self.load_stats: List[Dict] = []
+        self.shard_partials: Dict[str, Tuple[str, pd.DataFrame]] = {}
+        self.fingerprints: Dict[str, Dict] = {}
         
-    def run(self):
+    def run(self, incremental: bool = False):
         print("Starting Data Pipeline...")
         
-        # Ensure Schema Exists
-        Base.metadata.create_all(bind=engine)
-        
+        # Ensure Schema Exists (and is migrated)
+        init_db(self.engine)
+
+        self.run_stats = RunStats('incremental' if incremental else 'full')
+        try:
+            if incremental:
+                self.run_incremental()
+            else:
+                self.run_full()
+        except Exception:
+            self.run_stats.status = 'failed'
+            raise
+        finally:
+            self.save_run()
+
+    def run_full(self):
         # 1. Load Data
-        print("Loading Enrolment Data...")
-        enrol_df = DataLoader.load_dataset(os.path.join(self.base_dir, "enrolment"))
-        
-        print("Loading Demographic Updates...")
-        demo_df = DataLoader.load_dataset(os.path.join(self.base_dir, "demographic_update"))
-        
-        print("Loading Biometric Updates...")
-        bio_df = DataLoader.load_dataset(os.path.join(self.base_dir, "biometric_update"))
+        print("Loading Enrolment, Demographic and Biometric Data...")
+        with self.run_stats.stage('load') as stage:
+            enrol_df, demo_df, bio_df = self.load()
+            stage['rows_out'] = len(enrol_df) + len(demo_df) + len(bio_df)
         
         if enrol_df.empty:
             print("CRITICAL: No enrolment data found. Aborting.")
+            self.run_stats.status = 'noop'
             return
 
         # 2. Compute Metrics
         print("Computing Metrics...")
-        metrics_df = MetricEngine.calculate_metrics(enrol_df, demo_df, bio_df)
+        with self.run_stats.stage('metrics', rows_in=stage['rows_out']) as stage:
+            metrics_df = MetricEngine.calculate_metrics(enrol_df, demo_df, bio_df)
+            stage['rows_out'] = len(metrics_df)
         
         # 3. Apply ML
         print("Running Anomaly Detection...")
-        from app.core.ml import AnomalyDetector
-        
-        detector = AnomalyDetector()
-        scores, levels = detector.train_and_predict(metrics_df)
-        
-        metrics_df['risk_score'] = scores
-        metrics_df['risk_level'] = levels
+        with self.run_stats.stage('score', rows_in=len(metrics_df)) as stage:
+            self.score(metrics_df)
+            stage['rows_out'] = self.model_stats['scored_rows']
 
         # 4. Save to DB
         print("Saving to Database...")
-        db = SessionLocal()
-        # Simple upsert or recreate logic
-        # For MVP, we wipe and load since it's a "Load all CSVs" task
-        db.query(DistrictMetric).delete() # Warning: Destructive
-        
-        for _, row in metrics_df.iterrows():
-            record = DistrictMetric(
-                state=row['state'],
-                district=row['district'],
-                month=row['month'],
-                population_estimate=row['population_estimate'],
-                total_enrolments=row['total_enrolments'],
-                asr=row['asr'],
-                uii=row['uii'],
-                tds=row['tds'],
-                cbcg=row['cbcg'],
-                aepg=row['aepg'],
-                risk_score=row['risk_score'],
-                risk_level=str(row['risk_level'])
-            )
-            db.add(record)
-        
-        db.commit()
-        db.close()
+        with self.run_stats.stage('save', rows_in=len(metrics_df)) as stage:
+            self.run_stats.rows = stage['rows_out'] = self.save_metrics(metrics_df)
         print("Pipeline Completed Successfully.")
 
+    def run_incremental(self):
+        """
+        Re-aggregates only new or changed shards and recomputes the
+        (state, district, month) keys they touch. Each affected district is
+        recomputed from its stored shard partials, so the rolling TDS window
+        sees the prior months, and every month from the first affected one
+        onwards is upserted (later months' windows include the changed one).
+
+        Only the recomputed rows are scored, against the persisted model's
+        training range whatever RISK_SCORING is (for the run that fitted the
+        model that range is exactly its batch min-max), and only the touched
+        summary cells and snapshot rows are rewritten, so the run costs the
+        affected districts rather than the table. When the model has to be
+        refit (no MODEL_PATH, stale, drifted) every score moves: the whole
+        table is then read, rescored and rewritten as a full run would.
+        """
+        with self.engine.connect() as conn:
+            known = {row.path: row for row in conn.execute(select(IngestedShard))}
+            stored_fields = set(conn.execute(select(ShardPartial.field).distinct()).scalars())
+        if not stored_fields <= self.partial_fields():
+            print("Stored shard partials predate the current input schema. Running a full reload.")
+            self.run_stats.mode = 'full'
+            self.run_full()
+            return
+
+        with self.run_stats.stage('scan') as stage:
+            self.load_stats, self.shard_partials, self.fingerprints = [], {}, {}
+            changed, touched, current = {}, [], set()
+            for name, spec in self.DATASETS:
+                for path in DataLoader.list_shards(os.path.join(self.base_dir, name)):
+                    current.add(path)
+                    fp = self.fingerprint(path, known.get(path))
+                    if path not in known or known[path].sha256 != fp['sha256']:
+                        changed.setdefault(name, ([], spec))[0].append(path)
+                        self.fingerprints[path] = dict(fp, dataset=name)
+                    elif known[path].mtime_ns != fp['mtime_ns']:
+                        touched.append(fp)
+            removed = [path for path in known if path not in current]
+            stale = [path for files, _ in changed.values() for path in files] + removed
+            stage['rows_out'] = len(stale)
+
+        if not stale:
+            if touched:
+                with self.engine.begin() as conn:
+                    self.update_shard_mtimes(conn, touched)
+            print("No new or changed shards. Nothing to do.")
+            self.run_stats.status = 'noop'
+            return
+
+        print(f"Incremental run: {len(stale) - len(removed)} new/changed, {len(removed)} removed shards")
+        with self.run_stats.stage('load', rows_in=len(stale)) as stage:
+            if changed:
+                DataLoader.aggregate_shards(changed, self.chunksize, self.workers, self.cache_dir,
+                                            self.load_stats, self.shard_partials)
+            new_long = DataLoader.partials_to_long(self.shard_partials)
+
+            # Keys whose totals move: everything the stale shards used to hold plus what they hold now
+            with self.engine.connect() as conn:
+                old_keys = self.read_frame(conn, select(
+                    ShardPartial.state, ShardPartial.district, ShardPartial.month
+                ).where(ShardPartial.shard_path.in_(stale)).distinct())
+            affected = pd.concat([old_keys, new_long[MetricEngine.KEYS]]).drop_duplicates()
+            first_month = affected.groupby(['state', 'district'], as_index=False)['month'].min()
+            districts = list(first_month[['state', 'district']].itertuples(index=False, name=None))
+
+            # Full history of the affected districts, minus the stale shards' old contribution
+            with self.engine.connect() as conn:
+                history = self.read_frame(conn, select(ShardPartial).where(
+                    tuple_(ShardPartial.state, ShardPartial.district).in_(districts),
+                    ShardPartial.shard_path.not_in(stale)
+                ))
+                existing = self.read_frame(conn, select(DistrictMetric).where(
+                    tuple_(DistrictMetric.state, DistrictMetric.district).in_(districts)
+                ))
+            history = pd.concat([
+                history[new_long.columns],
+                new_long.merge(first_month[['state', 'district']], on=['state', 'district'])
+            ], ignore_index=True)
+            stage['rows_out'] = len(history)
+
+        with self.run_stats.stage('metrics', rows_in=len(history)) as stage:
+            frames = [DataLoader.partials_from_long(history, name, spec) for name, spec in self.DATASETS]
+            print(f"Recomputing {len(districts)} districts...")
+            metrics_df = MetricEngine.decode_keys(MetricEngine.calculate_metrics(*frames))
+            metrics_df = metrics_df.merge(first_month, on=['state', 'district'], suffixes=('', '_first'))
+            metrics_df = metrics_df[metrics_df['month'] >= metrics_df.pop('month_first')]
+
+            # Rows being replaced: affected districts from their first affected month
+            replaced = existing.merge(first_month, on=['state', 'district'], suffixes=('', '_first'))
+            replaced = replaced[replaced['month'] >= replaced['month_first']]
+            replaced_ids = set(replaced['id'])
+            kept = existing[~existing['id'].isin(replaced_ids)]
+            stage['rows_out'] = len(metrics_df)
+
+        print("Running Anomaly Detection...")
+        with self.run_stats.stage('score', rows_in=len(metrics_df)) as stage:
+            refit = not self.score(metrics_df, scoring='calibrated', refit=False)
+            if refit:
+                print(f"Refitting the anomaly model ({self.model_stats['reason']}); rescoring the whole table.")
+                with self.engine.connect() as conn:
+                    others = self.read_frame(conn, select(DistrictMetric).where(
+                        tuple_(DistrictMetric.state, DistrictMetric.district).not_in(districts)
+                    ))
+                kept = pd.concat([kept, others], ignore_index=True)
+            combined = pd.concat([kept.assign(_new=False), metrics_df.assign(_new=True)], ignore_index=True)
+            combined = combined.sort_values(by=MetricEngine.KEYS).reset_index(drop=True)
+            if refit:
+                self.score(combined)
+            stage['rows_out'] = self.model_stats['scored_rows']
+
+        print("Saving to Database...")
+        new_rows = combined[combined['_new']]
+        rescored = combined[~combined['_new']] if refit else combined.iloc[:0]
+        with self.run_stats.stage('save', rows_in=len(new_rows) + len(rescored)) as stage:
+            with self.engine.begin() as conn:
+                table = DistrictMetric.__table__
+                if replaced_ids:
+                    conn.execute(delete(table).where(table.c.id == bindparam('row_id')),
+                                 [{'row_id': i} for i in replaced_ids])
+                self.insert_batches(conn, insert(table), new_rows, self.to_records)
+                self.insert_batches(conn, update(table).where(table.c.id == bindparam('row_id')).values(
+                    anomaly_score=bindparam('raw_score'), risk_score=bindparam('risk_score'),
+                    risk_level=bindparam('risk_level')
+                ), rescored, lambda df: [
+                    {'row_id': int(i), 'raw_score': float(raw), 'risk_score': float(score), 'risk_level': str(level)}
+                    for i, raw, score, level in zip(df['id'], df['anomaly_score'], df['risk_score'], df['risk_level'])
+                ])
+                if refit:
+                    self.save_summaries(conn, combined)
+                    self.save_current(conn, combined)
+                else:
+                    self.refresh_summary_cells(conn, set(zip(replaced['state'], replaced['month'])) |
+                                               set(zip(new_rows['state'], new_rows['month'])))
+                    self.save_current(conn, combined, districts)
+                self.bump_data_version(conn)
+                conn.execute(delete(ShardPartial).where(ShardPartial.shard_path.in_(stale)))
+                conn.execute(delete(IngestedShard).where(IngestedShard.path.in_(stale)))
+                self.save_manifest(conn, new_long)
+                self.update_shard_mtimes(conn, touched)
+            stage['rows_out'] = self.run_stats.rows = len(new_rows) + len(rescored)
+        print(f"Upserted {len(new_rows)} rows, rescored {len(rescored)}.")
+        print("Pipeline Completed Successfully.")
+
+    def load(self) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """
+        Loads the enrolment, demographic and biometric folders. Shards are
+        streamed and pre-aggregated when chunksize is set, spread over a
+        process pool when workers > 1 and served from the Parquet shard
+        cache when cache_dir is set. Per-shard stats land in self.load_stats
+        and per-shard partials in self.shard_partials.
+        """
+        datasets = {name: (os.path.join(self.base_dir, name), spec) for name, spec in self.DATASETS}
+        self.load_stats, self.shard_partials, self.fingerprints = [], {}, {}
+        with self.engine.connect() as conn:
+            streamed = self.streamed_partials(conn)
+        if self.chunksize or self.workers > 1 or self.cache_dir or streamed:
+            frames = DataLoader.load_many(datasets, self.chunksize, self.workers, self.cache_dir,
+                                          self.load_stats, self.shard_partials)
+            # Remember what was loaded so later incremental runs can skip it
+            self.fingerprints = {
+                path: dict(self.fingerprint(path), dataset=name)
+                for path, (name, _) in self.shard_partials.items()
+            }
+            if streamed:
+                # Updates streamed since the last run are kept: summed in with the shards, and
+                # saved again with their partials
+                print(f"Including streamed updates for {len(streamed)} datasets")
+                self.shard_partials.update(streamed)
+                long = DataLoader.partials_to_long(self.shard_partials)
+                frames = {name: DataLoader.partials_from_long(long, name, spec) for name, spec in self.DATASETS}
+            if self.cache_dir:
+                from app.core.cache import ShardCache
+                summary = ShardCache.summarize(self.load_stats)
+                print(f"Shard cache: {summary['warm_shards']} warm ({summary['warm_seconds']:.2f}s), "
+                      f"{summary['cold_shards']} cold ({summary['cold_seconds']:.2f}s)")
+        else:
+            frames = {name: DataLoader.load_dataset(folder) for name, (folder, _) in datasets.items()}
+        return frames["enrolment"], frames["demographic_update"], frames["biometric_update"]
+
+    @classmethod
+    def stream_path(cls, dataset: str) -> str:
+        return f"{cls.STREAM_SHARD}{dataset}"
+
+    @classmethod
+    def streamed_partials(cls, conn) -> Dict[str, Tuple[str, pd.DataFrame]]:
+        """The stored partials of streamed updates, as {path: (dataset, partial)} like shard_partials."""
+        long = cls.read_frame(conn, select(ShardPartial).where(
+            ShardPartial.shard_path.in_([cls.stream_path(name) for name, _ in cls.DATASETS])
+        ))
+        partials = {name: DataLoader.partial_from_long(long, name) for name, _ in cls.DATASETS}
+        return {cls.stream_path(name): (name, partial) for name, partial in partials.items() if partial is not None}
+
+    @classmethod
+    def partial_fields(cls) -> set:
+        """Field names DataLoader.partial_aggregate produces for the current specs."""
+        fields = set()
+        for _, spec in cls.DATASETS:
+            for col, how in spec.items():
+                fields.update([f'{col}__sum', f'{col}__count'] if how == 'mean' else [col])
+        return fields
+
+    def score(self, metrics_df: pd.DataFrame, scoring: Optional[str] = None, refit: bool = True) -> bool:
+        """
+        Adds anomaly_score (raw IsolationForest score) and risk_score /
+        risk_level. In 'batch' scoring raw scores are min-max normalized over
+        the whole table, so any change moves every score. In 'calibrated'
+        scoring they are normalized with the model's training range (stored
+        with the model) and clipped to 0-100, so a row's score only changes
+        when its data or the model does.
+
+        Without a model_path a fresh model is fitted on every run. With one,
+        the persisted model is reused and only rows without an anomaly_score
+        (new district-months) are scored. It is refitted on all rows, and
+        saved, when missing, built with other features or parameters, older
+        than MODEL_RETRAIN_DAYS, when `retrain` was requested, or when more
+        than MODEL_DRIFT_TOLERANCE of the newly scored rows fall outside its
+        training score range.
+
+        With `partition` ('state' or 'month', default MODEL_PARTITION) one
+        model is fitted per partition, on a pool of `model_workers` processes,
+        and risk is normalized within each partition. A partition the
+        persisted model has not seen yet gets its own model fitted on the spot.
+
+        `scoring` overrides self.scoring for this call. With refit=False a
+        persisted model that cannot be reused is not replaced: False is
+        returned and metrics_df is left without scores (model_stats['reason']
+        says why). Returns True once metrics_df is scored.
+        """
+        from app.core.ml import AnomalyDetector, make_detector
+
+        if 'anomaly_score' not in metrics_df:
+            metrics_df['anomaly_score'] = np.nan
+        pending = metrics_df['anomaly_score'].isna().to_numpy()
+        detector, reason = None, "no persisted model"
+        if self.model_path and not self.retrain:
+            detector = AnomalyDetector.load(self.model_path)
+        elif self.retrain:
+            reason = "retrain requested"
+
+        if detector is not None:
+            if detector.config() != make_detector(self.partition).config():
+                detector, reason = None, "model configuration changed"
+            elif detector.is_stale(settings.MODEL_RETRAIN_DAYS):
+                detector, reason = None, f"model older than {settings.MODEL_RETRAIN_DAYS:g} days"
+            else:
+                raw_scores = detector.decision_scores(metrics_df[pending])
+                drift = detector.drift(raw_scores, metrics_df[pending])
+                if drift > settings.MODEL_DRIFT_TOLERANCE:
+                    detector, reason = None, f"drift: {drift:.0%} of new rows outside the training range"
+                else:
+                    metrics_df.loc[pending, 'anomaly_score'] = raw_scores
+
+        if detector is None:
+            if not refit:
+                self.model_stats = dict(refit=False, reason=reason)
+                return False
+            detector = make_detector(self.partition, self.model_workers)
+            metrics_df['anomaly_score'] = detector.fit(metrics_df)
+            print(f"Fitted anomaly model on {detector.n_train} rows in {detector.timings['fit_seconds']:.2f}s ({reason})")
+        if self.model_path and detector.updated:
+            detector.save(self.model_path)
+        self.model_stats = dict(detector.timings, refit='fit_seconds' in detector.timings, reason=reason)
+
+        scored, seconds = detector.timings['scored_rows'], detector.timings['score_seconds']
+        rate = scored / seconds if seconds > 0 else float('inf')
+        print(f"Scored {scored} rows in {seconds:.3f}s ({rate:,.0f} rows/s)")
+
+        raw_scores = metrics_df['anomaly_score'].to_numpy(dtype='float64')
+        scores = detector.risk_scores(metrics_df, raw_scores, (scoring or self.scoring) == 'calibrated')
+        metrics_df['risk_score'] = scores
+        metrics_df['risk_level'] = detector.categorize_risk(scores)
+        return True
+
+    def fingerprint(self, path: str, known: Optional[IngestedShard] = None) -> Dict:
+        """Size/mtime/sha256 of a shard; the stored hash is reused while size and mtime match."""
+        from app.core.cache import ShardCache
+        stat = os.stat(path)
+        fp = {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        if known is not None and known.size == fp['size'] and known.mtime_ns == fp['mtime_ns']:
+            fp['sha256'] = known.sha256
+        else:
+            fp['sha256'] = ShardCache.file_hash(path)
+        return fp
+
+    def save_metrics(self, metrics_df: pd.DataFrame) -> int:
+        """
+        Replaces district_metrics with the contents of metrics_df.
+        Rows are bulk-loaded in executemany batches of `batch_size` into a
+        staging table no reader touches, and its indexes are built after the
+        load. One short transaction then swaps it in by renaming (live ->
+        district_metrics_prev, staging -> district_metrics) and rewrites the
+        summaries, shard manifest and data version with it. A failed run
+        leaves the live table as it was; rollback() restores the previous
+        generation.
+        """
+        start = time.perf_counter()
+        total = len(metrics_df)
+        with self.engine.begin() as conn:
+            generation = (conn.execute(select(DataVersion.version).where(DataVersion.id == 1)).scalar() or 0) + 1
+            staging, indexes = self.staging_table(generation)
+            staging.drop(conn, checkfirst=True)
+            staging.create(conn)
+            self.insert_batches(conn, insert(staging), metrics_df, self.to_records)
+            for index in indexes:
+                index.create(conn)
+        loaded = time.perf_counter()
+
+        with self.engine.begin() as conn:
+            self.swap_tables(conn, staging.name, DistrictMetric.__tablename__, self.PREVIOUS_TABLE)
+            self.save_summaries(conn, metrics_df)
+            self.save_current(conn, metrics_df)
+            self.bump_data_version(conn)
+            conn.execute(delete(ShardPartial))
+            conn.execute(delete(IngestedShard))
+            self.save_manifest(conn, DataLoader.partials_to_long(self.shard_partials))
+        elapsed = time.perf_counter() - start
+
+        rate = total / elapsed if elapsed > 0 else float('inf')
+        print(f"Wrote {total} rows in {elapsed:.2f}s ({rate:,.0f} rows/s; staging load {loaded - start:.2f}s)")
+        return total
+
+    def rollback(self) -> bool:
+        """
+        Swaps district_metrics_prev back in (the current table becomes the
+        previous generation, so a second rollback undoes the first) and
+        rematerializes the summaries from it. The shard manifest (streamed
+        updates included) described the replaced data, so it is cleared and
+        the next incremental run reloads everything. Returns False when there is no previous generation.
+        """
+        live = DistrictMetric.__tablename__
+        with self.engine.begin() as conn:
+            if not inspect(conn).has_table(self.PREVIOUS_TABLE):
+                print("No previous generation of district_metrics. Nothing to do.")
+                return False
+            conn.execute(text(f"DROP TABLE IF EXISTS {self.STAGING_TABLE}"))
+            conn.execute(text(f"ALTER TABLE {live} RENAME TO {self.STAGING_TABLE}"))
+            conn.execute(text(f"ALTER TABLE {self.PREVIOUS_TABLE} RENAME TO {live}"))
+            conn.execute(text(f"ALTER TABLE {self.STAGING_TABLE} RENAME TO {self.PREVIOUS_TABLE}"))
+
+            restored = self.read_frame(conn, select(DistrictMetric))
+            self.save_summaries(conn, restored)
+            self.save_current(conn, restored)
+            self.bump_data_version(conn)
+            conn.execute(delete(ShardPartial))
+            conn.execute(delete(IngestedShard))
+        print("Rolled district_metrics back to the previous generation.")
+        return True
+
+    @classmethod
+    def staging_table(cls, generation: int) -> Tuple[Table, List[Index]]:
+        """
+        An index-less copy of district_metrics named STAGING_TABLE, plus its
+        indexes to build after the load. SQLite index names are global and
+        survive a table rename, so each generation's are suffixed `_g<n>`.
+        """
+        live = DistrictMetric.__table__
+        staging = live.to_metadata(MetaData(), name=cls.STAGING_TABLE)
+        indexes = [
+            Index(f"{index.name}_g{generation}", *(staging.c[col.name] for col in index.columns), unique=index.unique)
+            for index in live.indexes
+        ]
+        # Index() attaches itself to the table; detach so create() makes only the table
+        staging.indexes.clear()
+        return staging, indexes
+
+    @staticmethod
+    def swap_tables(conn, source: str, target: str, previous: str):
+        """Renames target to `previous` (replacing it) and source to target."""
+        conn.execute(text(f"DROP TABLE IF EXISTS {previous}"))
+        conn.execute(text(f"ALTER TABLE {target} RENAME TO {previous}"))
+        conn.execute(text(f"ALTER TABLE {source} RENAME TO {target}"))
+
+    @staticmethod
+    def save_summaries(conn, metrics_df: pd.DataFrame):
+        """Rematerializes metric_summaries from the full metrics table."""
+        summaries = MetricEngine.summarize(metrics_df)
+        conn.execute(delete(MetricSummary))
+        if not summaries.empty:
+            conn.execute(insert(MetricSummary), summaries.to_dict('records'))
+
+    @classmethod
+    def save_current(cls, conn, metrics_df: pd.DataFrame, districts: Optional[List[Tuple[str, str]]] = None):
+        """
+        Rewrites district_current from the latest month of each district in
+        metrics_df. With `districts`, metrics_df holds just those districts'
+        recent rows and only their snapshot rows are replaced (a district
+        with no rows left is dropped).
+        """
+        current = MetricEngine.latest(metrics_df)
+        table = DistrictCurrent.__table__
+        if districts is None:
+            conn.execute(delete(table))
+        elif districts:
+            conn.execute(delete(table).where(table.c.state == bindparam('key_state'),
+                                             table.c.district == bindparam('key_district')),
+                         [{'key_state': str(state), 'key_district': str(district)} for state, district in districts])
+        if not current.empty:
+            conn.execute(insert(table), cls.to_records(current))
+
+    @classmethod
+    def refresh_summary_cells(cls, conn, cells: Iterable[Tuple[str, str]]):
+        """
+        Brings metric_summaries up to date after the district_metrics rows of
+        some (state, month) cells changed on `conn`. Those cells are
+        recomputed from their rows (an index range on (month, state)); the
+        wider scopes they roll up into are moved by the difference between
+        each cell's new and stored sums and counts, so the cost follows the
+        touched cells rather than the table.
+        """
+        cells = set(cells)
+        if not cells:
+            return
+        states, months = {state for state, _ in cells}, {month for _, month in cells}
+        table, summaries = DistrictMetric.__table__, MetricSummary.__table__
+        rows = cls.read_frame(conn, select(
+            table.c.state, table.c.month, table.c.total_enrolments, table.c.asr, table.c.uii,
+            table.c.risk_score, table.c.risk_level
+        ).where(table.c.month.in_(months), table.c.state.in_(states)))
+        stored = cls.read_frame(conn, select(summaries).where(
+            summaries.c.state.in_(states | {''}), summaries.c.month.in_(months | {''})
+        ))
+
+        def touched(frame):
+            return frame[[cell in cells for cell in zip(frame['state'], frame['month'])]].set_index(['state', 'month'])
+
+        new = touched(MetricEngine.summary_cells(rows))
+        old = touched(MetricEngine.summary_sums(stored))
+        delta = new.sub(old, fill_value=0).reset_index()
+        wider = MetricEngine.rollup(delta, with_cells=False).set_index(['state', 'month'])
+        stored_wider = MetricEngine.summary_sums(stored).set_index(['state', 'month'])
+        stored_wider = stored_wider[stored_wider.index.isin(wider.index)]
+        sums = pd.concat([new, stored_wider.add(wider, fill_value=0)]).reset_index()
+        # Scopes with no district-months left are dropped rather than kept as zeros
+        sums = sums[sums['district_months'] > 0]
+
+        scopes = [{'key_state': state, 'key_month': month} for state, month in cells | set(wider.index)]
+        conn.execute(delete(summaries).where(summaries.c.state == bindparam('key_state'),
+                                             summaries.c.month == bindparam('key_month')), scopes)
+        if not sums.empty:
+            conn.execute(insert(summaries), MetricEngine.summary_rows(sums).to_dict('records'))
+
+    def save_run(self):
+        """Appends self.run_stats to pipeline_runs; a failure to record never fails the run."""
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(PipelineRun).values(**self.run_stats.row()))
+        except Exception as e:
+            print(f"Could not record pipeline run: {e}")
+
+    @staticmethod
+    def bump_data_version(conn):
+        """Increments data_version so API response caches drop what they hold."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        bumped = conn.execute(update(DataVersion).where(DataVersion.id == 1).values(
+            version=DataVersion.version + 1, updated_at=now
+        )).rowcount
+        if not bumped:
+            conn.execute(insert(DataVersion).values(id=1, version=1, updated_at=now))
+
+    def save_manifest(self, conn, long_df: pd.DataFrame):
+        """Records the fingerprints and partials of the shards in self.shard_partials."""
+        self.insert_batches(conn, insert(ShardPartial), long_df, lambda df: df.to_dict('records'))
+        shard_rows = [
+            {key: fp[key] for key in ('dataset', 'path', 'size', 'mtime_ns', 'sha256')}
+            for path, fp in self.fingerprints.items() if path in self.shard_partials
+        ]
+        if shard_rows:
+            conn.execute(insert(IngestedShard), shard_rows)
+
+    @staticmethod
+    def update_shard_mtimes(conn, fingerprints: List[Dict]):
+        """Shards rewritten with identical content only need their mtime refreshed."""
+        if fingerprints:
+            table = IngestedShard.__table__
+            conn.execute(update(table).where(table.c.path == bindparam('shard_path')).values(
+                mtime_ns=bindparam('new_mtime_ns')
+            ), [{'shard_path': fp['path'], 'new_mtime_ns': fp['mtime_ns']} for fp in fingerprints])
+
+    def insert_batches(self, conn, statement, df: pd.DataFrame, to_params):
+        """Executes `statement` over df in executemany batches of `batch_size`."""
+        for offset in range(0, len(df), self.batch_size):
+            conn.execute(statement, to_params(df.iloc[offset:offset + self.batch_size]))
+
+    @staticmethod
+    def read_frame(conn, statement) -> pd.DataFrame:
+        result = conn.execute(statement)
+        return pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+    @classmethod
+    def to_records(cls, df: pd.DataFrame) -> List[Dict]:
+        """Converts a metrics frame to DB parameter dicts (NaN -> NULL, numpy -> python types)."""
+        columns = []
+        for col in cls.DB_COLUMNS:
+            series = df[col].astype(str) if col == 'risk_level' else df[col]
+            # tolist() yields native python scalars column-at-a-time
+            if series.hasnans:
+                series = series.astype(object).where(series.notna(), None)
+            columns.append(series.tolist())
+        return [dict(zip(cls.DB_COLUMNS, row)) for row in zip(*columns)]
+
 if __name__ == "__main__":
-    pipeline = DataPipeline()
-    pipeline.run()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load UIDAI CSV shards into district_metrics.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only recompute district-months touched by new or changed shards.")
+
+    parser.add_argument("--rollback", action="store_true",
+                        help="Swap the previous generation of district_metrics back in.")
+    parser.add_argument("--retrain", action="store_true",
+                        help="Refit the anomaly model even if the persisted one is still valid.")
+    parser.add_argument("--partition", choices=["", "state", "month"], default=None,
+                        help="Fit one anomaly model per state or per month (default: MODEL_PARTITION).")
+    args = parser.parse_args()
+
+    pipeline = DataPipeline(retrain=args.retrain, partition=args.partition)
+    if args.rollback:
+        pipeline.rollback()
+    else:
+        pipeline.run(incremental=args.incremental)
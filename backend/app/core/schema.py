@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+from app.core.config import settings
+
+KEYS = ['state', 'district', 'month']
+
+
+class SchemaAdapter:
+    """
+    Maps every supported source layout onto the canonical metric inputs.
+
+    Layouts are recognised by a marker column:
+    - UIDAI extracts: pincode-level daily rows with `date` (DD-MM-YYYY) and
+      age-band counts (age_0_5 / age_5_17 / age_18_greater, demo_age_*, bio_age_*).
+    - Legacy seed layout produced by seed_data.py (update_* columns).
+    - Canonical layout (already adapted), which passes through unchanged.
+
+    Each canonical column is the sum of its source columns; None means the
+    layout does not publish it (e.g. UIDAI extracts carry no population).
+    """
+
+    CANONICAL = {
+        'enrolment': ['total_enrolments', 'population_estimate', 'age_0_5', 'age_5_18'],
+        'demographic_update': ['total_demo_updates'],
+        'biometric_update': ['total_bio_updates', 'child_biometric_updates'],
+    }
+
+    # (dataset, marker column, {canonical column: source columns | None})
+    LAYOUTS = [
+        ('enrolment', 'age_18_greater', {
+            'total_enrolments': ['age_0_5', 'age_5_17', 'age_18_greater'],
+            'population_estimate': None,
+            'age_0_5': ['age_0_5'],
+            'age_5_18': ['age_5_17'],
+        }),
+        ('demographic_update', 'demo_age_5_17', {
+            'total_demo_updates': ['demo_age_5_17', 'demo_age_17_'],
+        }),
+        ('biometric_update', 'bio_age_5_17', {
+            'total_bio_updates': ['bio_age_5_17', 'bio_age_17_'],
+            'child_biometric_updates': ['bio_age_5_17'],
+        }),
+        ('demographic_update', 'update_name', {
+            'total_demo_updates': ['update_name', 'update_address', 'update_dob', 'update_gender', 'update_mobile'],
+        }),
+        ('biometric_update', 'update_fingerprint', {
+            'total_bio_updates': ['update_fingerprint', 'update_iris', 'update_face'],
+            'child_biometric_updates': ['child_biometric_updates'],
+        }),
+        # Canonical (and legacy enrolment, which already uses canonical names)
+        ('enrolment', 'total_enrolments', {col: [col] for col in CANONICAL['enrolment']}),
+        ('demographic_update', 'total_demo_updates', {col: [col] for col in CANONICAL['demographic_update']}),
+        ('biometric_update', 'total_bio_updates', {col: [col] for col in CANONICAL['biometric_update']}),
+    ]
+
+    @staticmethod
+    def adapt(df: pd.DataFrame, dataset: Optional[str] = None) -> pd.DataFrame:
+        """
+        Returns a frame with only KEYS + the canonical columns of the detected
+        layout, `month` rolled up from `date` when needed. `dataset`, when
+        given, is used to validate the detected layout and to shape an empty
+        input with no columns.
+        """
+        for layout_dataset, marker, mapping in SchemaAdapter.LAYOUTS:
+            if marker in df.columns:
+                break
+        else:
+            if dataset is not None and len(df.columns) == 0:
+                empty = {key: pd.Series(dtype=object) for key in KEYS}
+                empty.update({col: pd.Series(dtype='float64') for col in SchemaAdapter.CANONICAL[dataset]})
+                return pd.DataFrame(empty)
+            raise ValueError(f"Unrecognised source layout with columns {list(df.columns)}")
+        if dataset is not None and layout_dataset != dataset:
+            raise ValueError(f"Expected a {dataset} layout but found {layout_dataset} columns")
+
+        out = pd.DataFrame({
+            'state': df['state'],
+            'district': df['district'],
+            'month': SchemaAdapter.to_month(df['month'] if 'month' in df.columns else df['date']),
+        })
+        for col, sources in mapping.items():
+            if sources is None:
+                out[col] = np.nan
+            else:
+                out[col] = df[sources[0]] if len(sources) == 1 else sum(df[src] for src in sources)
+        return out
+
+    @staticmethod
+    def to_month(dates: pd.Series, formats: Optional[List[str]] = None) -> pd.Series:
+        """
+        Rolls a date column up to YYYY-MM. Only the distinct values are parsed,
+        each with an explicit format from SOURCE_DATE_FORMATS (first match
+        wins), then mapped back through the categorical codes, so the cost is
+        independent of the number of (pincode-day) rows. Unparseable dates
+        become NaN and drop out of the district-month groupby.
+        """
+        dates = dates if isinstance(dates.dtype, pd.CategoricalDtype) else dates.astype('category')
+        distinct = pd.Series(dates.cat.categories.astype(str))
+
+        parsed = pd.Series(pd.NaT, index=distinct.index, dtype='datetime64[ns]')
+        for fmt in formats or settings.SOURCE_DATE_FORMATS:
+            missing = parsed.isna()
+            if not missing.any():
+                break
+            parsed[missing] = pd.to_datetime(distinct[missing], format=fmt, errors='coerce')
+
+        month_of_category = parsed.dt.strftime('%Y-%m')
+        month_codes, months = pd.factorize(month_of_category, sort=True)
+        codes = dates.cat.codes.to_numpy()
+        codes = np.where(codes >= 0, month_codes[codes] if len(month_codes) else -1, -1)
+        return pd.Series(pd.Categorical.from_codes(codes, categories=months), index=dates.index)
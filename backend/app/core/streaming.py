@@ -0,0 +1,210 @@
+"""
+Online scoring of district update records, between pipeline runs.
+
+Records are additive district-month or district-day contributions in the
+canonical input fields (see MetricEngine.ENROL_AGG / DEMO_AGG / BIO_AGG).
+Each batch is stored as shard_partials rows of a per-dataset pseudo-shard
+(DataPipeline.STREAM_SHARD), so incremental and full pipeline runs keep
+the streamed data. StreamingScorer holds the shard_partials rows of every
+district it has seen in memory, loaded from the table the first time,
+recomputes the metrics of just the touched districts with
+MetricEngine.calculate_metrics (exactly as a pipeline run would), scores
+them with the persisted AnomalyDetector (calibrated against its training
+range, whatever RISK_SCORING is) and upserts the rows. Months after an
+updated one are rewritten too, as their TDS window may change.
+
+Served by POST /api/stream/updates, or as a local consumer of JSON lines:
+    python -m app.core.streaming updates.jsonl   (or - for stdin)
+"""
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+from sqlalchemy import insert, select, update
+from app.core.config import settings
+from app.core.ml import AnomalyDetector
+from app.core.processing import DataLoader, DataPipeline, MetricEngine
+from app.core.schema import SchemaAdapter
+from app.db.models import DataVersion, DistrictMetric, ShardPartial
+
+PARTIAL_COLUMNS = ['shard_path', 'dataset'] + MetricEngine.KEYS + ['field', 'value']
+
+
+class ModelNotFound(RuntimeError):
+    """No persisted anomaly model at MODEL_PATH to score updates with."""
+
+
+class StreamingScorer:
+    def __init__(self, model_path: Optional[str] = None):
+        self.model_path = settings.MODEL_PATH if model_path is None else model_path
+        # data_version the in-memory state matches; any other writer invalidates it
+        self.version: Optional[int] = None
+        # (state, district) -> its shard_partials rows
+        self.districts: Dict[Tuple[str, str], pd.DataFrame] = {}
+        self._detector: Optional[AnomalyDetector] = None
+        self._model_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def apply(self, conn, records: Iterable[Dict]) -> Dict:
+        """
+        Folds `records` into the running state and upserts the affected
+        district-months on `conn`, in the caller's transaction. Also stores
+        the records' partials, refreshes the touched district_current rows
+        and metric_summaries cells, and bumps data_version.
+        """
+        with self._lock:
+            try:
+                return self._apply(conn, list(records))
+            except Exception:
+                self.reset()
+                raise
+
+    def reset(self):
+        self.districts.clear()
+        self.version = None
+
+    def detector(self) -> AnomalyDetector:
+        """The persisted model, reloaded when the pipeline has saved a new one."""
+        mtime = os.path.getmtime(self.model_path) if self.model_path and os.path.exists(self.model_path) else None
+        if mtime is None:
+            raise ModelNotFound(f"No anomaly model at MODEL_PATH {self.model_path!r}; run the pipeline first")
+        if mtime != self._model_mtime:
+            self._detector, self._model_mtime = AnomalyDetector.load(self.model_path), mtime
+            if self._detector is None:
+                raise ModelNotFound(f"Could not load anomaly model {self.model_path!r}")
+        return self._detector
+
+    def _apply(self, conn, records: List[Dict]) -> Dict:
+        detector = self.detector()
+        records = [dict(record, month=month) for record, month in zip(records, months_of(records))]
+        version = conn.execute(select(DataVersion.version).where(DataVersion.id == 1)).scalar() or 0
+        if version != self.version:
+            self.districts.clear()
+
+        by_district: Dict[Tuple[str, str], List[Dict]] = {}
+        for record in records:
+            by_district.setdefault((record['state'], record['district']), []).append(record)
+
+        changed = []
+        for key, district_records in by_district.items():
+            if key not in self.districts:
+                self.districts[key] = self.seed(conn, *key)
+            changed.append(self.fold(key, district_records))
+        rows = pd.concat(changed, ignore_index=True)
+
+        # Never fit from a handful of streamed rows: unseen partitions borrow a fitted one (or are rejected)
+        raw_scores = detector.decision_scores(rows, fit_unseen=False)
+        rows['anomaly_score'] = raw_scores
+        rows['risk_score'] = detector.risk_scores(rows, raw_scores, calibrated=True)
+        rows['risk_level'] = detector.categorize_risk(rows['risk_score'].to_numpy())
+
+        conn.execute(insert(ShardPartial), self.partials(records).to_dict('records'))
+        for row in DataPipeline.to_records(rows):
+            self.upsert(conn, row)
+        # Each district's rows run through its latest month, so they also give its current snapshot
+        DataPipeline.save_current(conn, rows, list(by_district))
+        DataPipeline.refresh_summary_cells(conn, zip(rows['state'], rows['month']))
+        DataPipeline.bump_data_version(conn)
+        self.version = version + 1
+        return {'records': len(records), 'districts': len(by_district), 'rows': len(rows), 'version': self.version}
+
+    @staticmethod
+    def seed(conn, state: str, district: str) -> pd.DataFrame:
+        """
+        A district's shard_partials rows: the summed inputs of every source
+        shard and earlier streamed batch, as the pipeline would read them.
+        Districts loaded without shard partials (LOAD_CHUNK_SIZE=0 and no
+        workers or cache) start from nothing.
+        """
+        table = ShardPartial.__table__
+        return DataPipeline.read_frame(conn, select(*(table.c[col] for col in PARTIAL_COLUMNS)).where(
+            table.c.state == state, table.c.district == district
+        ))
+
+    def fold(self, key: Tuple[str, str], records: List[Dict]) -> pd.DataFrame:
+        """Adds records to a district's partials; returns its recomputed rows from the first changed month on."""
+        partials = pd.concat([self.districts[key], self.partials(records)], ignore_index=True)
+        self.districts[key] = partials
+        frames = [DataLoader.partials_from_long(partials, name, spec) for name, spec in DataPipeline.DATASETS]
+        metrics = MetricEngine.decode_keys(MetricEngine.calculate_metrics(*frames))
+
+        # Later months are returned too: their TDS window may include a changed month
+        first = metrics['month'].searchsorted(min(record['month'] for record in records))
+        return metrics.iloc[first:]
+
+    @staticmethod
+    def partials(records: List[Dict]) -> pd.DataFrame:
+        """
+        shard_partials rows (under DataPipeline.stream_path) for records: one
+        per record and input field it carries, population_estimate as the
+        __sum / __count pair ENROL_AGG's mean is merged with.
+        """
+        rows = []
+        for record in records:
+            keys = {'state': record['state'], 'district': record['district'], 'month': record['month']}
+            for dataset, spec in DataPipeline.DATASETS:
+                fields = {}
+                for col, how in spec.items():
+                    if record.get(col) is None:
+                        continue
+                    if how == 'mean':
+                        fields.update({f'{col}__sum': record[col], f'{col}__count': 1})
+                    else:
+                        fields[col] = record[col]
+                rows.extend(dict(keys, shard_path=DataPipeline.stream_path(dataset), dataset=dataset,
+                                 field=field, value=float(value)) for field, value in fields.items())
+        return pd.DataFrame(rows, columns=PARTIAL_COLUMNS)
+
+    @staticmethod
+    def upsert(conn, row: Dict):
+        table = DistrictMetric.__table__
+        key = (table.c.state == row['state'], table.c.district == row['district'], table.c.month == row['month'])
+        if not conn.execute(update(table).where(*key).values(**row)).rowcount:
+            conn.execute(insert(table).values(**row))
+
+
+def months_of(records: List[Dict]) -> List[str]:
+    """
+    YYYY-MM of each record's `month`, or of its `date` for district-day
+    records, parsed with the pipeline's explicit SOURCE_DATE_FORMATS (so a
+    UIDAI DD-MM-YYYY date never has its day and month swapped).
+    """
+    values = [record.get('month') or record.get('date') for record in records]
+    months = SchemaAdapter.to_month(pd.Series(values, dtype=object)).astype(object)
+    for record, value, month in zip(records, values, months):
+        if not value:
+            raise ValueError(f"Update record for {record.get('district')!r} has neither month nor date")
+        if pd.isna(month):
+            raise ValueError(f"Unparseable date {value!r} for {record.get('district')!r}; "
+                             f"expected one of the formats {settings.SOURCE_DATE_FORMATS}")
+    return list(months)
+
+
+stream_scorer = StreamingScorer()
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import sys
+    from app.db.database import engine
+    from app.db.migrations import init_db
+
+    parser = argparse.ArgumentParser(description="Apply JSON-lines district update records to district_metrics.")
+    parser.add_argument("path", help="JSON-lines file of update records, or - for stdin.")
+    parser.add_argument("--batch", type=int, default=500, help="Records applied per transaction.")
+    args = parser.parse_args()
+
+    init_db(engine)
+    source = sys.stdin if args.path == "-" else open(args.path)
+    batch = []
+    for line in source:
+        if line.strip():
+            batch.append(json.loads(line))
+        if len(batch) >= args.batch:
+            with engine.begin() as conn:
+                print(stream_scorer.apply(conn, batch))
+            batch = []
+    if batch:
+        with engine.begin() as conn:
+            print(stream_scorer.apply(conn, batch))
@@ -1,12 +1,99 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./aari.db"  # Development DB
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def create_db_engine(url: str = None) -> Engine:
+    """
+    Engine for `url` (default: settings.DATABASE_URL) with the tuning profile
+    from Settings. File-backed SQLite gets a sized connection pool and the
+    SQLITE_* pragmas on every new connection; in WAL mode readers keep
+    serving the last committed snapshot while the pipeline's reload
+    transaction is open instead of blocking on it.
+    """
+    url = url or settings.DATABASE_URL
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW,
+                             pool_timeout=settings.DB_POOL_TIMEOUT, pool_pre_ping=True)
+
+    in_memory = is_memory_url(url)
+    engine = create_engine(url, connect_args=sqlite_connect_args(), **sqlite_pool_args(in_memory))
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, in_memory)
+
+    return engine
+
+
+def create_async_db_engine(url: str = None) -> AsyncEngine:
+    """
+    Async counterpart of create_db_engine for the async API mode. `url`
+    defaults to ASYNC_DATABASE_URL, else DATABASE_URL with its async driver
+    (sqlite -> sqlite+aiosqlite, postgresql -> postgresql+asyncpg, ...).
+    """
+    url = async_url(url or settings.ASYNC_DATABASE_URL or settings.DATABASE_URL)
+    if not url.startswith("sqlite"):
+        return create_async_engine(url, pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW,
+                                   pool_timeout=settings.DB_POOL_TIMEOUT, pool_pre_ping=True)
+
+    in_memory = is_memory_url(url)
+    engine = create_async_engine(url, connect_args=sqlite_connect_args(), **sqlite_pool_args(in_memory))
+
+    # Pragmas go through the sync engine's connect event (the aiosqlite adapter runs them)
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, in_memory)
+
+    return engine
+
+
+def async_url(url: str) -> str:
+    """Swaps a sync driver for its async one; URLs that already name a driver are kept."""
+    backend, sep, rest = url.partition("://")
+    if "+" in backend:
+        return url
+    return f"{ASYNC_DRIVERS.get(backend, backend)}{sep}{rest}"
+
+
+def is_memory_url(url: str) -> bool:
+    return make_url(url).database in (None, "", ":memory:")
+
+
+def sqlite_connect_args() -> dict:
+    return {"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}
+
+
+def sqlite_pool_args(in_memory: bool) -> dict:
+    if in_memory:
+        return {}
+    return dict(pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT)
+
+
+def apply_sqlite_pragmas(dbapi_connection, in_memory: bool):
+    cursor = dbapi_connection.cursor()
+    if not in_memory:
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    # Negative cache_size is in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.close()
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
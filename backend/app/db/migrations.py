@@ -0,0 +1,125 @@
+"""
+Schema migrations for databases created before a model change.
+
+New databases get the whole schema from Base.metadata.create_all. The steps
+below bring existing databases (whose tables create_all leaves untouched) up
+to the same state, and are recorded in schema_migrations so each runs once.
+Every step (SQL string or callable taking the connection) is idempotent, so
+migrating a freshly created schema is a no-op. Full pipeline reloads rebuild
+district_metrics with generation-suffixed index names
+(DataPipeline.staging_table), so later index changes belong in the model.
+"""
+from datetime import datetime, timezone
+from typing import List
+from sqlalchemy import insert, inspect, select, text
+from sqlalchemy.engine import Engine
+from app.db.database import Base
+from app.db.models import SchemaMigration
+
+CURRENT_COLUMNS = ("state, district, month, population_estimate, total_enrolments, asr, uii, tds, cbcg, aepg, "
+                   "anomaly_score, risk_score, risk_level")
+
+# (version, name, statements), applied in version order
+MIGRATIONS = [
+    (1, "district_metrics access-pattern indexes", [
+        # Keep the latest row per key before enforcing uniqueness
+        "DELETE FROM district_metrics WHERE id NOT IN "
+        "(SELECT MAX(id) FROM district_metrics GROUP BY state, district, month)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_district_metrics_state_district_month "
+        "ON district_metrics (state, district, month)",
+        "CREATE INDEX IF NOT EXISTS ix_district_metrics_district_month ON district_metrics (district, month)",
+        "CREATE INDEX IF NOT EXISTS ix_district_metrics_risk_score ON district_metrics (risk_score)",
+        "CREATE INDEX IF NOT EXISTS ix_district_metrics_risk_level_month ON district_metrics (risk_level, month)",
+        # Prefixes of the composite indexes above
+        "DROP INDEX IF EXISTS ix_district_metrics_state",
+        "DROP INDEX IF EXISTS ix_district_metrics_district",
+    ]),
+    (2, "district_metrics.anomaly_score", [
+        lambda conn: add_column(conn, "district_metrics", "anomaly_score", "FLOAT"),
+    ]),
+    (3, "district_metrics (month, state, district) index for map pages", [
+        "CREATE INDEX IF NOT EXISTS ix_district_metrics_month_state_district "
+        "ON district_metrics (month, state, district)",
+        # The month-only index (whatever its generation suffix) is a prefix of the one above
+        lambda conn: drop_indexes(conn, "district_metrics", ["month"]),
+    ]),
+    (4, "district_current snapshot", [
+        # create_all made the table empty; fill it from the latest month of each district
+        "DELETE FROM district_current",
+        f"INSERT INTO district_current ({CURRENT_COLUMNS}) SELECT {CURRENT_COLUMNS} FROM district_metrics AS m "
+        "WHERE m.month = (SELECT MAX(month) FROM district_metrics "
+        "WHERE state = m.state AND district = m.district)",
+    ]),
+    (5, "metric_summaries rollup cube", [
+        lambda conn: add_column(conn, "metric_summaries", "average_uii", "FLOAT"),
+        "CREATE INDEX IF NOT EXISTS ix_metric_summaries_month_state ON metric_summaries (month, state)",
+        # Rebuild every level from district_metrics, as MetricEngine.summarize would
+        "DELETE FROM metric_summaries",
+    ] + [
+        "INSERT INTO metric_summaries (state, month, total_enrolments, average_saturation, average_uii, "
+        "national_risk_index, high_risk_districts) "
+        f"SELECT {state}, {month}, SUM(total_enrolments), AVG(asr), AVG(uii), AVG(risk_score), "
+        "SUM(CASE WHEN risk_level IN ('High', 'Priority') THEN 1 ELSE 0 END) "
+        f"FROM district_metrics GROUP BY {state}, {month} HAVING COUNT(*) > 0"
+        for state, month in [("''", "''"), ("''", "month"), ("state", "''"), ("state", "month")]
+    ]),
+    (6, "metric_summaries counts for incremental refreshes", [
+        lambda conn: add_column(conn, "metric_summaries", "district_months", "INTEGER"),
+        lambda conn: add_column(conn, "metric_summaries", "saturation_count", "INTEGER"),
+        lambda conn: add_column(conn, "metric_summaries", "uii_count", "INTEGER"),
+        lambda conn: add_column(conn, "metric_summaries", "risk_count", "INTEGER"),
+        # Rebuild every level with its counts
+        "DELETE FROM metric_summaries",
+    ] + [
+        "INSERT INTO metric_summaries (state, month, total_enrolments, average_saturation, average_uii, "
+        "national_risk_index, high_risk_districts, district_months, saturation_count, uii_count, risk_count) "
+        f"SELECT {state}, {month}, SUM(total_enrolments), AVG(asr), AVG(uii), AVG(risk_score), "
+        "SUM(CASE WHEN risk_level IN ('High', 'Priority') THEN 1 ELSE 0 END), "
+        "COUNT(*), COUNT(asr), COUNT(uii), COUNT(risk_score) "
+        f"FROM district_metrics GROUP BY {state}, {month} HAVING COUNT(*) > 0"
+        for state, month in [("''", "''"), ("''", "month"), ("state", "''"), ("state", "month")]
+    ]),
+]
+
+
+def add_column(conn, table: str, column: str, ddl_type: str):
+    """ALTER TABLE ... ADD COLUMN, skipped when the column already exists."""
+    if column not in {col["name"] for col in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def drop_indexes(conn, table: str, columns: List[str]):
+    """Drops every non-unique index on `table` over exactly `columns`."""
+    for index in inspect(conn).get_indexes(table):
+        if index["column_names"] == columns and not index["unique"]:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index['name']}"))
+
+
+def migrate(bind: Engine) -> List[int]:
+    """Applies pending migrations, each in its own transaction. Returns the versions applied."""
+    with bind.connect() as conn:
+        applied = set(conn.execute(select(SchemaMigration.version)).scalars())
+
+    done = []
+    for version, name, statements in MIGRATIONS:
+        if version in applied:
+            continue
+        with bind.begin() as conn:
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(text(statement))
+            conn.execute(insert(SchemaMigration).values(
+                version=version, name=name,
+                applied_at=datetime.now(timezone.utc).replace(tzinfo=None)
+            ))
+        print(f"Applied migration {version}: {name}")
+        done.append(version)
+    return done
+
+
+def init_db(bind: Engine) -> List[int]:
+    """Creates missing tables, then migrates what already existed."""
+    Base.metadata.create_all(bind=bind)
+    return migrate(bind)
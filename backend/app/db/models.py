@@ -1,13 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, Date
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Index, Text, UniqueConstraint
 from app.db.database import Base
 
 class DistrictMetric(Base):
     __tablename__ = "district_metrics"
 
     id = Column(Integer, primary_key=True, index=True)
-    state = Column(String, index=True)
-    district = Column(String, index=True)
-    month = Column(String, index=True) # Storing as YYYY-MM string for simplicity or Date
+    state = Column(String)
+    district = Column(String)
+    month = Column(String) # Storing as YYYY-MM string for simplicity or Date
     
     # Core Metrics
     population_estimate = Column(Integer)
@@ -21,5 +21,150 @@ class DistrictMetric(Base):
     aepg = Column(Float) # Aadhaar Equity Penetration Gap
     
     # ML Scoring
+    anomaly_score = Column(Float) # Raw IsolationForest decision_function (lower = more anomalous)
     risk_score = Column(Float) # Normalized 0-100
     risk_level = Column(String) # Low, Medium, High, Priority
+
+    # Indexes follow the API access patterns (see app/db/migrations.py):
+    # district lookups ordered by month, top-N by risk_score, and the
+    # High/Priority count optionally scoped to a month. The map pages through
+    # a month in (state, district) order, and through a state or everything
+    # on the unique key.
+    __table_args__ = (
+        Index('uq_district_metrics_state_district_month', 'state', 'district', 'month', unique=True),
+        Index('ix_district_metrics_month_state_district', 'month', 'state', 'district'),
+        Index('ix_district_metrics_district_month', 'district', 'month'),
+        Index('ix_district_metrics_risk_score', 'risk_score'),
+        Index('ix_district_metrics_risk_level_month', 'risk_level', 'month'),
+    )
+
+class DistrictCurrent(Base):
+    """
+    Each district's most recent district_metrics row, keyed by (state, district).
+    Rewritten by the pipeline in the transaction that changes district_metrics
+    (and per district by streaming updates), so district details and the
+    default map read one row per district however many months are stored.
+    """
+    __tablename__ = "district_current"
+
+    id = Column(Integer, primary_key=True, index=True)
+    state = Column(String)
+    district = Column(String)
+    month = Column(String) # the district's latest month
+
+    # Same metrics as DistrictMetric
+    population_estimate = Column(Integer)
+    total_enrolments = Column(Integer)
+    asr = Column(Float)
+    uii = Column(Float)
+    tds = Column(Float)
+    cbcg = Column(Float)
+    aepg = Column(Float)
+    anomaly_score = Column(Float)
+    risk_score = Column(Float)
+    risk_level = Column(String)
+
+    # Map pages walk the key; details look a district up by name (latest month first)
+    __table_args__ = (
+        Index('uq_district_current_state_district', 'state', 'district', unique=True),
+        Index('ix_district_current_district_month', 'district', 'month'),
+    )
+
+class IngestedShard(Base):
+    """Fingerprint of every source CSV shard the pipeline has loaded."""
+    __tablename__ = "ingested_shards"
+
+    id = Column(Integer, primary_key=True, index=True)
+    dataset = Column(String, index=True) # enrolment, demographic_update, biometric_update
+    path = Column(String, unique=True)
+    size = Column(Integer)
+    mtime_ns = Column(Integer)
+    sha256 = Column(String)
+
+class ShardPartial(Base):
+    """
+    District-month partial aggregates contributed by one shard, in long
+    (field, value) form. Summing them across shards reproduces the loader
+    output, so incremental runs never have to re-read unchanged shards.
+    """
+    __tablename__ = "shard_partials"
+
+    id = Column(Integer, primary_key=True, index=True)
+    shard_path = Column(String, index=True)
+    dataset = Column(String)
+    state = Column(String)
+    district = Column(String)
+    month = Column(String)
+    field = Column(String)
+    value = Column(Float)
+
+    __table_args__ = (
+        Index('ix_shard_partials_state_district', 'state', 'district'),
+    )
+
+class MetricSummary(Base):
+    """
+    Rollup cube materialized by the pipeline: national and per-state rows,
+    each all-time and per month. An empty string in state/month means "all",
+    so ('', '') is the national all-time row and lookups hit the unique key.
+    """
+    __tablename__ = "metric_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    state = Column(String, nullable=False, default='')
+    month = Column(String, nullable=False, default='')
+
+    total_enrolments = Column(Integer)
+    average_saturation = Column(Float)
+    average_uii = Column(Float)
+    national_risk_index = Column(Float)
+    high_risk_districts = Column(Integer) # High/Priority district-months
+    # District-months in the scope, and the non-null values behind each average,
+    # so a changed cell can move every wider scope without rereading its rows
+    district_months = Column(Integer)
+    saturation_count = Column(Integer)
+    uii_count = Column(Integer)
+    risk_count = Column(Integer)
+
+    # The unique key serves a state's (or the nation's) months; the second
+    # index serves every state's row for one month
+    __table_args__ = (
+        UniqueConstraint('state', 'month', name='uq_metric_summaries_state_month'),
+        Index('ix_metric_summaries_month_state', 'month', 'state'),
+    )
+
+class DataVersion(Base):
+    """
+    Single-row counter (id=1) bumped in every pipeline transaction that
+    changes district_metrics. Read-side caches are valid for one version.
+    """
+    __tablename__ = "data_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
+
+class SchemaMigration(Base):
+    """Migrations from app/db/migrations.py already applied to this database."""
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    applied_at = Column(DateTime)
+
+class PipelineRun(Base):
+    """
+    One DataPipeline.run: outcome, totals and the per-stage breakdown
+    (app/core/instrumentation.py), exposed on /metrics.
+    """
+    __tablename__ = "pipeline_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    mode = Column(String) # full, incremental
+    status = Column(String) # ok, noop (nothing to load), failed
+    started_at = Column(DateTime, index=True)
+    wall_seconds = Column(Float)
+    cpu_seconds = Column(Float) # includes reaped pool workers
+    peak_rss_bytes = Column(Integer) # highest stage peak of the pipeline process
+    rows = Column(Integer) # district-month rows written
+    stages = Column(Text) # JSON: [{stage, wall_seconds, cpu_seconds, rows_in, rows_out, peak_rss_bytes}]
@@ -1,26 +1,61 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import routes
-
-app = FastAPI(
-    title="AARI - Aadhaar Anomaly & Risk Intelligence",
-    description="Backend for AARI Dashboard. Provides district-level risk metrics and anomaly scores.",
-    version="1.0.0"
-)
-
-# CORS Middleware
-# Allowing all origins for development simplicity, strictly restrict in production
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include API Routes
-app.include_router(routes.router, prefix="/api")
-
-@app.get("/")
-def health_check():
-    return {"status": "AARI Backend System Operational", "version": "1.0.0"}
+from app.api import metrics
+from app.core.config import settings
+from app.db.database import engine
+from app.db.migrations import init_db
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create missing tables and migrate an existing database (e.g. new indexes)
+    # when the server starts, not when the module is imported
+    init_db(engine)
+    yield
+
+
+def create_app(api_mode: str = None) -> FastAPI:
+    """Builds the app with the sync or async routes (default: settings.API_MODE)."""
+    api_mode = api_mode or settings.API_MODE
+    if api_mode == "async":
+        from app.api import async_routes as routes
+    elif api_mode == "sync":
+        from app.api import routes
+    else:
+        raise ValueError(f"Unknown API_MODE {api_mode!r}; expected 'sync' or 'async'")
+
+    app = FastAPI(
+        title="AARI - Aadhaar Anomaly & Risk Intelligence",
+        description="Backend for AARI Dashboard. Provides district-level risk metrics and anomaly scores.",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+
+    # CORS Middleware
+    # Allowing all origins for development simplicity, strictly restrict in production
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        # Readable by the frontend: revalidation and the next page of /map, /risk/top
+        expose_headers=["ETag", "X-Next-Cursor", "Link"],
+    )
+
+    # Include API Routes
+    app.include_router(routes.router, prefix="/api")
+
+    # Prometheus metrics and the request latency histograms behind them
+    app.middleware("http")(metrics.record_latency)
+    app.include_router(metrics.router)
+
+    @app.get("/")
+    def health_check():
+        return {"status": "AARI Backend System Operational", "version": "1.0.0"}
+
+    return app
+
+
+app = create_app()
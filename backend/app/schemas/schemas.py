@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from typing import Optional
 
 class NationalSummary(BaseModel):
@@ -24,3 +24,22 @@ class TrendResponse(BaseModel):
     uii: float
     asr: float
     risk_score: float
+
+class DistrictUpdate(BaseModel):
+    """A district-month (month) or district-day (date) contribution for POST /stream/updates."""
+    state: str
+    district: str
+    month: Optional[str] = None
+    date: Optional[str] = None
+    total_enrolments: float = 0
+    population_estimate: Optional[float] = None
+    age_5_18: float = 0
+    total_demo_updates: float = 0
+    total_bio_updates: float = 0
+    child_biometric_updates: float = 0
+
+    @model_validator(mode="after")
+    def has_period(self):
+        if not (self.month or self.date):
+            raise ValueError("either month (YYYY-MM) or date (DD-MM-YYYY / YYYY-MM-DD) is required")
+        return self
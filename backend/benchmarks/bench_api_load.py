@@ -0,0 +1,152 @@
+"""
+Per-route API load test with latency budgets.
+
+Seeds a large synthetic district_metrics table (see bench_map) plus its
+materialized summaries, starts the app under uvicorn, and drives each route
+with concurrent clients. Requests rotate over districts, states and months
+so they are not all the same query. Reports throughput and p50/p95/p99
+latency per route, and exits with status 1 when a route's p95 exceeds its
+budget. The response cache is off unless --cache is given, so the numbers
+measure the database path.
+
+Usage (from backend/):
+    python -m benchmarks.bench_api_load --districts 2500 --months 120 --requests 400 --concurrency 16
+    python -m benchmarks.bench_api_load --budget map=800 trends=300 --output api_load.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Dict, List
+import httpx
+import numpy as np
+from sqlalchemy import select
+from app.core.processing import DataPipeline
+from app.db.models import DistrictMetric
+from benchmarks.bench_api_modes import free_port, start_server
+from benchmarks.bench_map import make_database
+
+# name -> (path template, default p95 budget in ms). Budgets are about 1.5x the
+# p95 measured at the default scale and concurrency on a single-CPU machine.
+ROUTES = {
+    "summary": ("/api/national/summary", 450),
+    "summary_scoped": ("/api/national/summary?state={state}&month={month}", 450),
+    "map": ("/api/map?month={month}", 1500),
+    "map_columns": ("/api/map?month={month}&format=columns", 1400),
+    "risk_top": ("/api/risk/top?limit=20", 600),
+    "district": ("/api/district/{district}", 600),
+    "trends": ("/api/district/{district}/trends", 600),
+}
+
+
+def route_paths(template: str, districts: int, months: int, count: int) -> List[str]:
+    """`count` concrete paths for a template, rotating over the seeded keys."""
+    rng = np.random.default_rng(7)
+    paths = []
+    for _ in range(count):
+        district, month = int(rng.integers(districts)), int(rng.integers(months))
+        paths.append(template.format(
+            district=f"District_{district}", state=f"State_{district % 36}",
+            month=f"{2021 + month // 12}-{month % 12 + 1:02d}",
+        ))
+    return paths
+
+
+async def drive(client: httpx.AsyncClient, paths: List[str], concurrency: int):
+    latencies = []
+    queue = asyncio.Queue()
+    for path in paths:
+        queue.put_nowait(path)
+
+    async def client_loop():
+        while not queue.empty():
+            path = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, (path, response.status_code)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return time.perf_counter() - start, np.array(latencies)
+
+
+async def run_routes(base_url: str, routes: Dict[str, str], args) -> List[Dict]:
+    results = []
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        for name, template in routes.items():
+            paths = route_paths(template, args.districts, args.months, args.requests + args.warmup)
+            for path in paths[:args.warmup]:
+                await client.get(path)
+            elapsed, latencies = await drive(client, paths[args.warmup:], args.concurrency)
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+            results.append({"route": name, "path": template, "requests": len(latencies),
+                            "rps": len(latencies) / elapsed, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99})
+    return results
+
+
+def parse_budgets(pairs: List[str]) -> Dict[str, float]:
+    budgets = {name: budget for name, (_, budget) in ROUTES.items()}
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        if name not in ROUTES:
+            raise SystemExit(f"Unknown route {name!r}; expected one of {', '.join(ROUTES)}")
+        budgets[name] = float(value)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--districts", type=int, default=2500)
+    parser.add_argument("--months", type=int, default=120)
+    parser.add_argument("--requests", type=int, default=400, help="Measured requests per route")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--routes", nargs="+", choices=list(ROUTES), default=list(ROUTES))
+    parser.add_argument("--budget", nargs="*", default=[], metavar="ROUTE=MS", help="Override a route's p95 budget")
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache on")
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+    budgets = parse_budgets(args.budget)
+
+    start = time.perf_counter()
+    engine = make_database(args.districts, args.months)
+    with engine.begin() as conn:
+        DataPipeline.save_summaries(conn, DataPipeline.read_frame(conn, select(DistrictMetric)))
+    print(f"Seeded {args.districts * args.months:,} district-month rows in {time.perf_counter() - start:.1f}s")
+
+    port = free_port()
+    server = start_server(args.mode, str(engine.url), port,
+                          **({"RESPONSE_CACHE_MAX_ENTRIES": "256"} if args.cache else {}))
+    try:
+        routes = {name: ROUTES[name][0] for name in args.routes}
+        results = asyncio.run(run_routes(f"http://127.0.0.1:{port}", routes, args))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"\n{args.mode} mode, {args.concurrency} concurrent clients, cache {'on' if args.cache else 'off'}")
+    print(f"{'route':<16}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'budget':>9}")
+    failures = []
+    for result in results:
+        result["budget_p95_ms"] = budgets[result["route"]]
+        over = result["p95_ms"] > result["budget_p95_ms"]
+        if over:
+            failures.append(result["route"])
+        print(f"{result['route']:<16}{result['rps']:>9.1f}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}"
+              f"{result['p99_ms']:>9.1f}{result['budget_p95_ms']:>9.0f}" + ("  OVER BUDGET" if over else ""))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"districts": args.districts, "months": args.months, "mode": args.mode,
+                       "concurrency": args.concurrency, "cache": args.cache, "results": results}, f, indent=2)
+    if failures:
+        print(f"\np95 latency budget exceeded: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
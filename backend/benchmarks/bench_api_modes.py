@@ -0,0 +1,106 @@
+"""
+Load test comparing the sync and async API modes.
+
+Builds a synthetic district_metrics database (see bench_map), then for each
+mode starts uvicorn with API_MODE set and the response cache disabled, so
+every request reaches the database, and fires a mix of dashboard requests
+from concurrent clients. Reports requests/sec and p50/p99 latency.
+
+Usage (from backend/):
+    python -m benchmarks.bench_api_modes --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import httpx
+import numpy as np
+from benchmarks.bench_map import make_database
+
+MIX = [
+    "/api/national/summary",
+    "/api/national/summary?month=2021-06",
+    "/api/map?month=2021-06",
+    "/api/district/District_7",
+    "/api/district/District_7/trends",
+    "/api/risk/top?limit=20",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode: str, database_url: str, port: int, **settings_env: str) -> subprocess.Popen:
+    """uvicorn on `port` with the response cache off unless settings_env says otherwise."""
+    env = dict(os.environ, API_MODE=mode, DATABASE_URL=database_url, RESPONSE_CACHE_MAX_ENTRIES="0", **settings_env)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+async def load(base_url: str, total: int, concurrency: int):
+    latencies = []
+    paths = [MIX[i % len(MIX)] for i in range(total)]
+    queue = asyncio.Queue()
+    for path in paths:
+        queue.put_nowait(path)
+
+    async def client_loop(client):
+        while not queue.empty():
+            path = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, (path, response.status_code)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(client.get(path) for path in MIX))  # warm up
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return elapsed, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--districts", type=int, default=750)
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"])
+    args = parser.parse_args()
+
+    database_url = str(make_database(args.districts, args.months).url)
+    print(f"{args.requests} requests, {args.concurrency} concurrent clients, "
+          f"{args.districts * args.months} district-month rows")
+    for mode in args.modes:
+        port = free_port()
+        server = start_server(mode, database_url, port)
+        try:
+            elapsed, latencies = asyncio.run(load(f"http://127.0.0.1:{port}", args.requests, args.concurrency))
+        finally:
+            server.terminate()
+            server.wait()
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(f"{mode:>5}: {len(latencies) / elapsed:8.1f} req/s   p50 {p50:7.1f} ms   p99 {p99:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
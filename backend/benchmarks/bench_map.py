@@ -0,0 +1,121 @@
+"""
+Benchmark for the /api/map payload builder.
+
+Compares the previous row-by-row builder (ORM row tuples, one dict per row
+with round() calls, jsonable_encoder + json.dumps) against the columnar
+fetch_columns + orjson path, in both response formats, on a synthetic
+district_metrics table in a temporary SQLite database.
+
+Usage (from backend/):
+    python -m benchmarks.bench_map --districts 750 --months 36
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from app.api.queries import MAP_COLUMNS, MAP_ROUNDING
+from app.api.serialization import dumps, fetch_columns, to_records
+from app.db.database import Base, create_db_engine
+from app.db.models import DistrictMetric
+
+
+def make_database(districts: int, months: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    n = districts * months
+    month_labels = [f"{2021 + m // 12}-{m % 12 + 1:02d}" for m in range(months)]
+    rows = {
+        "state": np.repeat([f"State_{i % 36}" for i in range(districts)], months).tolist(),
+        "district": np.repeat([f"District_{i}" for i in range(districts)], months).tolist(),
+        "month": month_labels * districts,
+        "total_enrolments": rng.integers(1_000, 100_000, n).tolist(),
+        "population_estimate": rng.integers(100_000, 200_000, n).tolist(),
+        "asr": rng.uniform(40, 100, n).tolist(),
+        "uii": rng.gamma(2.0, 0.01, n).tolist(),
+        "tds": np.where(rng.random(n) < 0.05, np.nan, rng.normal(0, 1, n)).tolist(),
+        "cbcg": rng.uniform(0, 1, n).tolist(),
+        "aepg": rng.uniform(0, 60, n).tolist(),
+        "risk_score": rng.uniform(0, 100, n).tolist(),
+        "risk_level": rng.choice(["Low", "Medium", "High", "Priority"], n).tolist(),
+    }
+    records = [dict(zip(rows, values)) for values in zip(*rows.values())]
+    for record in records:
+        if record["tds"] != record["tds"]:
+            record["tds"] = None
+    with engine.begin() as conn:
+        conn.execute(insert(DistrictMetric), records)
+    return engine
+
+
+def row_builder(db: Session) -> bytes:
+    results = db.execute(select(*MAP_COLUMNS)).all()
+    payload = [
+        {
+            "district": r.district,
+            "state": r.state,
+            "risk_score": round(r.risk_score, 1),
+            "risk_level": r.risk_level,
+            "asr": round(r.asr, 1),
+            "uii": round(r.uii, 3) if r.uii is not None else 0,
+            "tds": round(r.tds, 2) if r.tds is not None else 0,
+            "aepg": round(r.aepg, 1) if r.aepg is not None else 0,
+            "cbcg": round(r.cbcg, 1) if r.cbcg is not None else 0,
+        }
+        for r in results
+    ]
+    return json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode("utf-8")
+
+
+def columnar_records(db: Session) -> bytes:
+    return dumps(to_records(fetch_columns(db, select(*MAP_COLUMNS), MAP_ROUNDING)))
+
+
+def columnar_columns(db: Session) -> bytes:
+    return dumps(fetch_columns(db, select(*MAP_COLUMNS), MAP_ROUNDING))
+
+
+def best_of(fn, engine, repeat):
+    timings = []
+    for _ in range(repeat):
+        with Session(engine) as db:
+            start = time.perf_counter()
+            body = fn(db)
+            timings.append(time.perf_counter() - start)
+    return min(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--districts", type=int, default=750)
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = make_database(args.districts, args.months)
+    old_time, old_body = best_of(row_builder, engine, args.repeat)
+    records_time, records_body = best_of(columnar_records, engine, args.repeat)
+    columns_time, columns_body = best_of(columnar_columns, engine, args.repeat)
+
+    old, new = orjson.loads(old_body), orjson.loads(records_body)
+    assert len(old) == len(new) == len(orjson.loads(columns_body)["district"])
+    for name, (decimals, _) in MAP_ROUNDING.items():
+        # np.round and round() may differ by one unit in the last place
+        assert np.allclose([r[name] for r in old], [r[name] for r in new], atol=1.01 * 10 ** -decimals)
+
+    print(f"Rows: {len(old)} ({args.districts} districts x {args.months} months)")
+    print(f"row dicts + jsonable_encoder : {old_time * 1000:8.2f} ms ({len(old_body) / 1e6:.1f} MB)")
+    print(f"columnar, format=records     : {records_time * 1000:8.2f} ms ({len(records_body) / 1e6:.1f} MB)")
+    print(f"columnar, format=columns     : {columns_time * 1000:8.2f} ms ({len(columns_body) / 1e6:.1f} MB)")
+    print(f"Speedup (records)            : {old_time / records_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark for partitioned anomaly models (MODEL_PARTITION).
+
+Fits the single global IsolationForest and per-state / per-month models
+(PartitionedAnomalyDetector, on a process pool) on a synthetic metrics
+frame, and reports wall time plus how far the partitioned risk scores agree
+with the global ones: Spearman rank correlation, share of rows given the
+same risk_level, and overlap of the top 5% riskiest rows.
+
+Usage (from backend/):
+    python -m benchmarks.bench_partitioned --districts 700 --months 36 --workers 4
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from app.core.ml import make_detector
+
+
+def make_frame(districts: int, months: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = districts * months
+    month_labels = pd.period_range("2021-01", periods=months, freq="M").astype(str)
+    df = pd.DataFrame({
+        "state": np.repeat([f"State_{i % 36}" for i in range(districts)], months),
+        "district": np.repeat([f"District_{i}" for i in range(districts)], months),
+        "month": np.tile(month_labels, districts),
+        "asr": rng.normal(90, 8, rows),
+        "uii": rng.gamma(2.0, 0.01, rows),
+        "tds": rng.normal(0, 1, rows),
+        "cbcg": rng.normal(10, 4, rows),
+        "aepg": rng.normal(5, 3, rows),
+    })
+    # A few gross outliers every model should agree on
+    outliers = rng.choice(rows, max(1, rows // 200), replace=False)
+    df.loc[outliers, ["uii", "tds"]] *= 8
+    return df
+
+
+def fit_scores(df: pd.DataFrame, partition: str, workers: int):
+    start = time.perf_counter()
+    detector = make_detector(partition, workers)
+    raw_scores = detector.fit(df)
+    scores = detector.risk_scores(df, raw_scores, calibrated=False)
+    return time.perf_counter() - start, scores, detector.categorize_risk(scores)
+
+
+def top_overlap(a: np.ndarray, b: np.ndarray, share: float = 0.05) -> float:
+    k = max(1, int(len(a) * share))
+    top_a, top_b = set(np.argsort(-a)[:k]), set(np.argsort(-b)[:k])
+    return len(top_a & top_b) / k
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--districts", type=int, default=700)
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    df = make_frame(args.districts, args.months)
+    print(f"Rows: {len(df)} ({args.districts} districts x {args.months} months), workers: {args.workers}")
+
+    base_time, base_scores, base_levels = fit_scores(df, "", 1)
+    print(f"{'model':<22}{'wall s':>9}{'spearman':>10}{'same level':>12}{'top 5%':>9}")
+    print(f"{'global':<22}{base_time:>9.2f}{1:>10.3f}{1:>12.1%}{1:>9.1%}")
+    for partition in ("state", "month"):
+        for workers in sorted({1, args.workers}):
+            seconds, scores, levels = fit_scores(df, partition, workers)
+            spearman = pd.Series(scores).corr(pd.Series(base_scores), method="spearman")
+            label = f"per {partition} ({workers} proc)"
+            print(f"{label:<22}{seconds:>9.2f}{spearman:>10.3f}{np.mean(levels == base_levels):>12.1%}"
+                  f"{top_overlap(scores, base_scores):>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+End-to-end pipeline benchmark at several data scales.
+
+For each scale (districts x months x pincodes) a synthetic dataset is
+generated with seed_data.generate_synthetic_data and loaded by a full
+DataPipeline run into a temporary SQLite database. The run's stage
+instrumentation (load = DataLoader, metrics = MetricEngine.calculate_metrics,
+score = AnomalyDetector, save = DB write) is written to a JSON report with the
+commit, machine and settings, so reports from different commits can be
+compared with --compare.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pipeline --scales 50x12x5 200x24x10 750x36x20 --output report.json
+    python -m benchmarks.bench_pipeline --scales 50x12x5 --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.core.processing import DataPipeline
+from app.db.database import create_db_engine
+from seed_data import LAYOUTS, generate_synthetic_data
+
+STAGES = ["load", "metrics", "score", "save"]
+
+
+def parse_scale(text: str):
+    districts, months, pincodes = (int(part) for part in text.lower().split("x"))
+    return {"districts": districts, "months": months, "pincodes": pincodes}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_scale(scale, layout: str, shards: int, workers: int, chunksize: int, seed: int):
+    work_dir = tempfile.mkdtemp()
+    data_dir = os.path.join(work_dir, "datasets")
+    start = time.perf_counter()
+    source_rows = generate_synthetic_data(data_dir, shards=shards, layout=layout, seed=seed, **scale)
+    generate_seconds = time.perf_counter() - start
+
+    engine = create_db_engine(f"sqlite:///{os.path.join(work_dir, 'bench.db')}")
+    pipeline = DataPipeline(base_dir=data_dir, bind=engine, workers=workers, chunksize=chunksize,
+                            cache_dir="", model_path="")
+    try:
+        pipeline.run()
+    finally:
+        engine.dispose()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    run = pipeline.run_stats.row()
+    return {
+        "label": "x".join(str(scale[key]) for key in ("districts", "months", "pincodes")),
+        "scale": dict(scale, layout=layout, shards=shards),
+        "source_rows": source_rows,
+        "generate_seconds": generate_seconds,
+        "metric_rows": run["rows"],
+        "wall_seconds": run["wall_seconds"],
+        "cpu_seconds": run["cpu_seconds"],
+        "peak_rss_bytes": run["peak_rss_bytes"],
+        "stages": pipeline.run_stats.stages,
+    }
+
+
+def print_results(results, baseline=None):
+    previous = {r["label"]: r for r in (baseline or {}).get("results", [])}
+    header = f"{'scale':<16}{'rows in':>12}" + "".join(f"{stage + ' s':>11}" for stage in STAGES)
+    print(header + f"{'total s':>10}{'peak MiB':>10}")
+    for result in results:
+        stages = {s["stage"]: s for s in result["stages"]}
+        line = f"{result['label']:<16}{sum(result['source_rows'].values()):>12,}"
+        line += "".join(f"{stages[stage]['wall_seconds']:>11.2f}" if stage in stages else f"{'-':>11}"
+                        for stage in STAGES)
+        print(line + f"{result['wall_seconds']:>10.2f}{(result['peak_rss_bytes'] or 0) / 2**20:>10.0f}")
+        old = previous.get(result["label"])
+        if old is not None:
+            old_stages = {s["stage"]: s for s in old["stages"]}
+            ratios = [f"{stage} {stages[stage]['wall_seconds'] / old_stages[stage]['wall_seconds']:.2f}x"
+                      for stage in STAGES
+                      if stage in stages and old_stages.get(stage, {}).get("wall_seconds")]
+            print(f"{'':<16}vs {baseline['commit']}: " + ", ".join(ratios))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", default=["50x12x5", "200x24x10"],
+                        help="districts x months x pincodes per scale")
+    parser.add_argument("--layout", choices=LAYOUTS, default="uidai")
+    parser.add_argument("--shards", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=settings.LOAD_WORKERS)
+    parser.add_argument("--chunksize", type=int, default=settings.LOAD_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_pipeline.json", help="JSON report path")
+    parser.add_argument("--compare", help="Earlier JSON report to compare stage wall times against")
+    args = parser.parse_args()
+
+    # Pays one-off costs (imports, thread pools) outside the measured scales
+    run_scale(parse_scale("10x2x1"), args.layout, 1, args.workers, args.chunksize, args.seed)
+    results = [run_scale(parse_scale(scale), args.layout, args.shards, args.workers, args.chunksize, args.seed)
+               for scale in args.scales]
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"python": sys.version.split()[0], "platform": platform.platform(), "cpus": os.cpu_count()},
+        "settings": {"workers": args.workers, "chunksize": args.chunksize,
+                     "model_n_estimators": settings.MODEL_N_ESTIMATORS,
+                     "model_max_samples": settings.MODEL_MAX_SAMPLES, "batch_size": settings.PIPELINE_BATCH_SIZE},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print()
+    print_results(results, baseline)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
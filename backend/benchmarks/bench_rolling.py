@@ -0,0 +1,70 @@
+"""
+Benchmark for the TDS rolling window in MetricEngine.calculate_metrics.
+
+Compares the previous per-group lambda transform against
+MetricEngine.rolling_stats on a synthetic district-month frame.
+
+Usage (from backend/):
+    python -m benchmarks.bench_rolling --districts 700 --months 36
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from app.core.processing import MetricEngine
+
+
+def make_frame(districts: int, months: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    month_labels = pd.period_range("2021-01", periods=months, freq="M").astype(str)
+    return pd.DataFrame({
+        "state": np.repeat([f"State_{i % 36}" for i in range(districts)], months),
+        "district": np.repeat([f"District_{i}" for i in range(districts)], months),
+        "month": np.tile(month_labels, districts),
+        "uii": rng.gamma(2.0, 0.01, districts * months),
+    }).sort_values(MetricEngine.KEYS).reset_index(drop=True)
+
+
+def lambda_rolling(df: pd.DataFrame):
+    grouped = df.groupby(["state", "district"])["uii"]
+    mean = grouped.transform(lambda x: x.rolling(MetricEngine.TDS_WINDOW, min_periods=1).mean())
+    std = grouped.transform(lambda x: x.rolling(MetricEngine.TDS_WINDOW, min_periods=1).std())
+    return mean.to_numpy(), std.to_numpy()
+
+
+def vectorized_rolling(df: pd.DataFrame):
+    group_ids = df.groupby(["state", "district"], sort=False).ngroup().to_numpy()
+    return MetricEngine.rolling_stats(df["uii"].to_numpy(dtype="float64"), group_ids, MetricEngine.TDS_WINDOW)
+
+
+def best_of(fn, df, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--districts", type=int, default=700)
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = make_frame(args.districts, args.months)
+    old_time, (old_mean, old_std) = best_of(lambda_rolling, df, args.repeat)
+    new_time, (new_mean, new_std) = best_of(vectorized_rolling, df, args.repeat)
+
+    assert np.allclose(old_mean, new_mean, equal_nan=True)
+    assert np.allclose(old_std, new_std, equal_nan=True)
+
+    print(f"Rows: {len(df)} ({args.districts} districts x {args.months} months)")
+    print(f"groupby + lambda rolling : {old_time * 1000:8.2f} ms")
+    print(f"vectorized rolling_stats : {new_time * 1000:8.2f} ms")
+    print(f"Speedup                  : {old_time / new_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
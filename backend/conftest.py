@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# Point app.db.database.engine (built from settings.DATABASE_URL when app is first imported)
+# at a throwaway database so the test suite never reads or writes aari.db
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
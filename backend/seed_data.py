@@ -3,6 +3,7 @@ import numpy as np
 import os
 import shutil
 from datetime import date
+from typing import Dict
 from app.db.database import SessionLocal, engine, Base
 from app.db.models import DistrictMetric
 
@@ -68,10 +69,16 @@ REAL_DISTRICTS = [
     {"name": "Bhilai", "state": "Chhattisgarh"},
 ]
 
-def clean_data_dir():
-    if os.path.exists(BASE_DIR):
-        shutil.rmtree(BASE_DIR)
-    os.makedirs(BASE_DIR)
+STATES = sorted({d["state"] for d in REAL_DISTRICTS})
+REMOTE_DISTRICTS = ["Tawang", "Kiphire", "Churachandpur", "Leh"]
+# Shard file prefix per dataset folder
+SHARD_NAMES = {"enrolment": "enrolment", "demographic_update": "demographic", "biometric_update": "biometric"}
+LAYOUTS = ("legacy", "uidai")
+
+def clean_data_dir(base_dir=BASE_DIR):
+    if os.path.exists(base_dir):
+        shutil.rmtree(base_dir)
+    os.makedirs(base_dir)
 
 def generate_chunked_data():
     """Generates synthetic policy data split across folders and chunked CSVs."""
@@ -181,5 +188,130 @@ def generate_chunked_data():
     print(f"Data generation complete at {BASE_DIR}")
     return BASE_DIR
 
+def synthetic_districts(count: int):
+    """REAL_DISTRICTS first, then numbered districts spread over the same states."""
+    extra = [{"name": f"District {i + 1}", "state": STATES[i % len(STATES)]}
+             for i in range(len(REAL_DISTRICTS), count)]
+    return REAL_DISTRICTS[:count] + extra
+
+def generate_synthetic_data(base_dir=BASE_DIR, districts=750, months=36, pincodes=20, shards=12,
+                            layout="uidai", start_month="2021-01", anomaly_rate=0.02, seed=42) -> Dict[str, int]:
+    """
+    Generates a scalable synthetic dataset: `districts` x `months` x
+    `pincodes` rows per dataset, in the published UIDAI layout (pincode-day
+    rows, `date` as DD-MM-YYYY, age-band counts, no population) or the legacy
+    seed layout above. Each dataset is written as `shards` CSVs of
+    consecutive months, generated one shard at a time so memory stays flat.
+    A share `anomaly_rate` of district-months gets an update spike.
+    Returns the number of rows written per dataset.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout {layout!r}; expected one of {LAYOUTS}")
+    rng = np.random.default_rng(seed)
+    clean_data_dir(base_dir)
+    for name in SHARD_NAMES:
+        os.makedirs(os.path.join(base_dir, name))
+
+    catalogue = synthetic_districts(districts)
+    names = np.array([d["name"] for d in catalogue], dtype=object)
+    states = np.array([d["state"] for d in catalogue], dtype=object)
+
+    # Static district profile
+    population = (rng.lognormal(13.5, 0.8, districts) + 20_000).astype(np.int64)
+    remote = np.isin(names, REMOTE_DISTRICTS) | (rng.random(districts) < 0.08)
+    saturation = np.where(remote, rng.uniform(0.6, 0.8, districts), rng.uniform(0.85, 1.0, districts))
+    update_rate = rng.gamma(2.0, 0.004, districts)  # monthly updates per enrolled resident
+    child_compliance = rng.beta(2.0, 20.0, districts)
+    spikes = np.where(rng.random((districts, months)) < anomaly_rate, 5.0, 1.0)
+    periods = pd.period_range(start_month, periods=months, freq="M")
+
+    written = {name: 0 for name in SHARD_NAMES}
+    for month_idx in np.array_split(np.arange(months), min(shards, months)):
+        # One row per (month, district, pincode) of this shard
+        m = np.repeat(month_idx, districts * pincodes)
+        d = np.tile(np.repeat(np.arange(districts), pincodes), len(month_idx))
+        pin = 110000 + (d * pincodes + np.tile(np.arange(pincodes), len(month_idx) * districts)) % 740000
+        enrolled = population[d] * saturation[d] * (1 + 0.002 * m) / pincodes
+        updates = enrolled * update_rate[d] * spikes[d, m]
+
+        if layout == "uidai":
+            # Random day of the month per row, formatted once per distinct date
+            days = rng.integers(0, periods.days_in_month.to_numpy()[m])
+            labels = np.array([(p.start_time + pd.Timedelta(days=i)).strftime("%d-%m-%Y")
+                               for p in periods[month_idx] for i in range(31)], dtype=object)
+            keys = {"date": labels[(m - month_idx[0]) * 31 + days], "state": states[d],
+                    "district": names[d], "pincode": pin}
+            new_enrolments = population[d] * 0.0015 / pincodes
+            frames = {
+                "enrolment": {
+                    "age_0_5": rng.poisson(new_enrolments * 0.45),
+                    "age_5_17": rng.poisson(new_enrolments * 0.35),
+                    "age_18_greater": rng.poisson(new_enrolments * 0.20),
+                },
+                "demographic_update": {
+                    "demo_age_5_17": rng.poisson(updates * 0.15),
+                    "demo_age_17_": rng.poisson(updates * 0.85),
+                },
+                "biometric_update": {
+                    "bio_age_5_17": rng.poisson(enrolled * 0.25 * child_compliance[d] / 12),
+                    "bio_age_17_": rng.poisson(updates * 0.6),
+                },
+            }
+        else:
+            # Legacy files carry their own key columns
+            keys = {}
+            month_labels = periods.astype(str).to_numpy()[m]
+            total = rng.poisson(enrolled)
+            frames = {
+                "enrolment": {
+                    "Date": month_labels, "State": states[d], "District": names[d], "Pin_Code": pin,
+                    "Age_0_5": (total * 0.1).astype(np.int64),
+                    "Age_5_18": (total * 0.25).astype(np.int64),
+                    "Age_18_Plus": (total * 0.65).astype(np.int64),
+                    "Total_Enrolments": total,
+                    "Population_Estimate": population[d],
+                },
+                "demographic_update": {
+                    "Month": month_labels, "State": states[d], "District": names[d],
+                    **{col: rng.poisson(updates * share) for col, share in [
+                        ("Update_Name", 0.15), ("Update_Address", 0.35), ("Update_DOB", 0.1),
+                        ("Update_Gender", 0.05), ("Update_Mobile", 0.35)]},
+                },
+                "biometric_update": {
+                    "Month": month_labels, "State": states[d], "District": names[d],
+                    "Update_Fingerprint": rng.poisson(updates * 0.36),
+                    "Update_Iris": rng.poisson(updates * 0.18),
+                    "Update_Face": rng.poisson(updates * 0.06),
+                    "Child_Biometric_Updates": rng.poisson(enrolled * 0.25 * child_compliance[d] / 12),
+                },
+            }
+
+        for name, columns in frames.items():
+            df = pd.DataFrame({**keys, **columns})
+            start = written[name]
+            written[name] += len(df)
+            df.to_csv(os.path.join(base_dir, name, f"api_data_aadhar_{SHARD_NAMES[name]}_{start}_{written[name]}.csv"),
+                      index=False)
+
+    print(f"Generated {districts} districts x {months} months x {pincodes} pincodes ({layout}) at {base_dir}")
+    return written
+
 if __name__ == "__main__":
-    generate_chunked_data()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate synthetic source CSVs (default: the small demo dataset).")
+    parser.add_argument("--districts", type=int, help="Generate a scalable synthetic dataset with this many districts.")
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--pincodes", type=int, default=20, help="Rows per district-month and dataset.")
+    parser.add_argument("--shards", type=int, default=12, help="CSV files per dataset.")
+    parser.add_argument("--layout", choices=LAYOUTS, default="uidai")
+    parser.add_argument("--start-month", default="2021-01")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=BASE_DIR)
+    args = parser.parse_args()
+
+    if args.districts is None:
+        generate_chunked_data()
+    else:
+        generate_synthetic_data(args.out, args.districts, args.months, args.pincodes, args.shards,
+                                args.layout, args.start_month, seed=args.seed)
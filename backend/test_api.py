@@ -1,5 +1,9 @@
 from fastapi.testclient import TestClient
+from sqlalchemy import inspect
+from app.core.processing import DataPipeline
+from app.db.database import engine
 from app.main import app
+from test_pipeline import DATA_DIR
 import os
 import sys
 
@@ -8,19 +12,25 @@ sys.path.append(os.path.join(os.getcwd(), 'backend'))
 
 client = TestClient(app)
 
+def setup_module():
+    # The startup hook creates the tables; the pipeline then fills the test database (see conftest.py)
+    with TestClient(app):
+        assert "district_current" in inspect(engine).get_table_names()
+    DataPipeline(base_dir=DATA_DIR).run()
+
 def test_read_main():
     response = client.get("/")
     assert response.status_code == 200
-    assert response.json() == {"message": "AARI Backend is running. Access docs at /docs"}
+    assert response.json() == {"status": "AARI Backend System Operational", "version": "1.0.0"}
     print("Root endpoint: OK")
 
 def test_national_summary():
     response = client.get("/api/national/summary")
     assert response.status_code == 200
     data = response.json()
-    assert "avg_saturation" in data
-    assert "high_risk_count" in data
-    print(f"National Summary: OK (High Risk Count: {data['high_risk_count']})")
+    assert "average_saturation" in data
+    assert "high_risk_districts" in data
+    print(f"National Summary: OK (High Risk Count: {data['high_risk_districts']})")
 
 def test_map():
     response = client.get("/api/map")
@@ -0,0 +1,67 @@
+import sys
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.api import async_routes
+from app.api.cache import response_cache
+from app.core.processing import DataPipeline
+from app.db.database import create_async_db_engine
+from app.main import app, create_app
+from test_pipeline import DATA_DIR, api_client, make_engine
+
+REQUESTS = [
+    ("/api/national/summary", {}),
+    ("/api/national/summary", {"state": "Kerala", "month": "2023-11"}),
+    ("/api/map", {"month": "2023-11"}),
+    ("/api/map", {"format": "columns"}),
+    ("/api/district/Pune", {}),
+    ("/api/district/Nowhere", {}),
+    ("/api/district/Pune/trends", {}),
+    ("/api/risk/top", {"limit": 5}),
+    ("/api/map", {"limit": 10, "fields": "district,month,risk_score"}),
+    ("/api/risk/top", {"limit": 5, "min_risk": 50, "fields": "district,risk_score"}),
+    ("/api/rollup/states", {"month": "2023-11"}),
+    ("/api/rollup/months", {}),
+]
+
+
+def test_async_matches_sync():
+    test_engine = make_engine()
+    DataPipeline(base_dir=DATA_DIR, bind=test_engine).run()
+
+    client = api_client(test_engine)
+    try:
+        expected = []
+        for path, params in REQUESTS:
+            response_cache.invalidate()
+            response = client.get(path, params=params)
+            expected.append((response.status_code, response.content))
+    finally:
+        app.dependency_overrides.clear()
+
+    async_app = create_app("async")
+    Session = async_sessionmaker(create_async_db_engine(str(test_engine.url)), expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with Session() as db:
+            yield db
+
+    async_app.dependency_overrides[async_routes.get_async_db] = override_get_async_db
+    with TestClient(async_app) as async_client:
+        actual = []
+        for path, params in REQUESTS:
+            response_cache.invalidate()
+            response = async_client.get(path, params=params)
+            actual.append((response.status_code, response.content))
+
+    assert actual == expected
+    assert [status for status, _ in actual].count(404) == 1
+    print("Async API: OK")
+
+
+if __name__ == "__main__":
+    try:
+        test_async_matches_sync()
+        print("\nAll Tests Passed Successfully!")
+    except Exception as e:
+        print(f"\n[FAIL] Test Failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,136 @@
+import os
+import shutil
+import sys
+import tempfile
+from app.api.cache import ResponseCache, response_cache
+from app.core.processing import DataPipeline
+from app.main import app
+from test_pipeline import DATA_DIR, api_client, make_engine
+
+
+def test_etag_and_invalidation():
+    data_dir = os.path.join(tempfile.mkdtemp(), "datasets")
+    shutil.copytree(DATA_DIR, data_dir)
+    test_engine = make_engine()
+    pipeline = DataPipeline(base_dir=data_dir, bind=test_engine)
+    pipeline.run()
+    client = api_client(test_engine)
+    response_cache.version_ttl, ttl = 0, response_cache.version_ttl
+    try:
+        first = client.get("/api/map", params={"month": "2023-11"})
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+
+        hits = response_cache.hits
+        again = client.get("/api/map", params={"month": "2023-11"})
+        assert again.content == first.content and response_cache.hits == hits + 1
+
+        not_modified = client.get("/api/map", params={"month": "2023-11"}, headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304 and not_modified.content == b""
+
+        # A pipeline commit bumps data_version, which drops the cached entries;
+        # the ETag is a content hash, so an unchanged body still revalidates
+        misses = response_cache.misses
+        pipeline.run()
+        unchanged = client.get("/api/map", params={"month": "2023-11"}, headers={"If-None-Match": etag})
+        assert unchanged.status_code == 304 and response_cache.misses == misses + 1
+
+        enrol_dir = os.path.join(data_dir, "enrolment")
+        os.remove(os.path.join(enrol_dir, sorted(os.listdir(enrol_dir))[-1]))
+        pipeline.run()
+        fresh = client.get("/api/map", params={"month": "2023-11"}, headers={"If-None-Match": etag})
+        assert fresh.status_code == 200 and fresh.headers["etag"] != etag
+    finally:
+        response_cache.version_ttl = ttl
+        app.dependency_overrides.clear()
+    print("Response Cache ETag: OK")
+
+
+def test_map_formats():
+    test_engine = make_engine()
+    DataPipeline(base_dir=DATA_DIR, bind=test_engine).run()
+    client = api_client(test_engine)
+    try:
+        records = client.get("/api/map", params={"view": "history"}).json()
+        columns = client.get("/api/map", params={"view": "history", "format": "columns"}).json()
+        top = client.get("/api/risk/top", params={"limit": 3}).json()
+        detail = client.get(f"/api/district/{top[0]['district']}").json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert len(records) == 104 and list(columns) == list(records[0])
+    assert [r["uii"] for r in records] == columns["uii"]
+    assert all(r["uii"] == round(r["uii"], 3) and r["tds"] is not None for r in records)
+    assert [r["risk_score"] for r in top] == sorted((r["risk_score"] for r in top), reverse=True)
+    assert "_sa_instance_state" not in detail and detail["district"] == top[0]["district"]
+    print("Map Formats: OK")
+
+
+def test_map_pagination():
+    test_engine = make_engine()
+    DataPipeline(base_dir=DATA_DIR, bind=test_engine).run()
+    client = api_client(test_engine)
+    try:
+        everything = client.get("/api/map", params={"view": "history", "fields": "state,district,month,risk_score"}).json()
+        pages, params = [], {"view": "history", "fields": "state,district,month,risk_score", "limit": 30}
+        while True:
+            response = client.get("/api/map", params=params)
+            pages.append(response.json())
+            if "x-next-cursor" not in response.headers:
+                break
+            assert 'rel="next"' in response.headers["link"]
+            params["cursor"] = response.headers["x-next-cursor"]
+
+        month = client.get("/api/map", params={"month": "2023-11", "fields": "district", "limit": 3})
+        next_month = client.get("/api/map", params={"month": "2023-11", "fields": "district", "limit": 3,
+                                                     "cursor": month.headers["x-next-cursor"]}).json()
+        high = client.get("/api/map", params={"view": "history", "risk_level": "High", "min_risk": 60}).json()
+        top = client.get("/api/risk/top", params={"limit": 4, "fields": "district,risk_score"})
+        top_next = client.get("/api/risk/top", params={"limit": 4, "fields": "district,risk_score",
+                                                       "cursor": top.headers["x-next-cursor"]}).json()
+        unknown = client.get("/api/map", params={"fields": "district,secret"})
+        malformed = client.get("/api/risk/top", params={"cursor": "not-a-cursor"})
+        too_many = client.get("/api/risk/top", params={"limit": 10**6})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert [len(page) for page in pages] == [30, 30, 30, 14]
+    assert sum(pages, []) == everything
+    keys = [(r["state"], r["district"], r["month"]) for r in everything]
+    assert keys == sorted(keys) and list(everything[0]) == ["state", "district", "month", "risk_score"]
+    assert [list(r) for r in month.json()] == [["district"]] * 3
+    assert not {r["district"] for r in month.json()} & {r["district"] for r in next_month}
+    assert all(r["risk_level"] == "High" and r["risk_score"] >= 60 for r in high)
+    scores = [r["risk_score"] for r in top.json() + top_next]
+    assert scores == sorted(scores, reverse=True) and len(scores) == 8
+    assert unknown.status_code == 422 and malformed.status_code == 422 and too_many.status_code == 422
+    print("Map Pagination: OK")
+
+
+def test_lru_bounds():
+    cache = ResponseCache(max_entries=2, max_bytes=10, version_ttl=60)
+    cache.version = 1
+    cache.put(("a",), 1, b"aaaa", '"a"')
+    cache.put(("b",), 1, b"bbbb", '"b"')
+    assert cache.get(("a",), 1) is not None   # a is now most recent
+    cache.put(("c",), 1, b"cccc", '"c"')     # over both limits: evicts b
+    assert cache.get(("b",), 1) is None
+    assert cache.size == 8
+
+    cache.put(("big",), 1, b"x" * 11, '"x"')  # larger than the whole cache
+    assert cache.get(("big",), 1) is None
+    cache.put(("old",), 0, b"o", '"o"')      # built under a stale version
+    assert cache.get(("old",), 0) is None
+    print("Response Cache LRU: OK")
+
+
+if __name__ == "__main__":
+    try:
+        test_etag_and_invalidation()
+        test_map_formats()
+        test_map_pagination()
+        test_lru_bounds()
+        print("\nAll Tests Passed Successfully!")
+    except Exception as e:
+        print(f"\n[FAIL] Test Failed: {e}")
+        sys.exit(1)
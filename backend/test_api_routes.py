@@ -1,9 +1,15 @@
 from fastapi.testclient import TestClient
+from app.core.processing import DataPipeline
 from app.main import app
+from test_pipeline import DATA_DIR
 import sys
 
 client = TestClient(app)
 
+def setup_module():
+    # Fill the test database (see conftest.py) the routes read from
+    DataPipeline(base_dir=DATA_DIR).run()
+
 def test_routes():
     print("Testing API Routes...")
     
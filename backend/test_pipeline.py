@@ -0,0 +1,784 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event, func, inspect, select
+from sqlalchemy.orm import sessionmaker
+from app.api.cache import response_cache
+from app.api.metrics import request_latency
+from app.api.routes import get_db
+from app.core.cache import ShardCache
+from app.core.config import settings
+from app.core.ml import AnomalyDetector, PartitionedAnomalyDetector
+from app.core.processing import DataLoader, DataPipeline, MetricEngine
+from app.core.streaming import StreamingScorer, stream_scorer
+from app.db.database import create_db_engine
+from app.db.migrations import init_db
+from app.db.models import DistrictCurrent, DistrictMetric, IngestedShard, MetricSummary, PipelineRun, SchemaMigration
+from app.main import app
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "datasets")
+DATASETS = [
+    ("enrolment", MetricEngine.ENROL_AGG),
+    ("demographic_update", MetricEngine.DEMO_AGG),
+    ("biometric_update", MetricEngine.BIO_AGG),
+]
+
+
+def make_engine():
+    """Creates an isolated SQLite engine so tests never touch aari.db."""
+    path = os.path.join(tempfile.mkdtemp(), "test.db")
+    test_engine = create_db_engine(f"sqlite:///{path}")
+    init_db(test_engine)
+    return test_engine
+
+
+def test_bulk_load():
+    test_engine = make_engine()
+    pipeline = DataPipeline(base_dir=DATA_DIR, bind=test_engine, batch_size=7)
+    pipeline.run()
+
+    with test_engine.connect() as conn:
+        count = conn.execute(select(func.count()).select_from(DistrictMetric)).scalar()
+        levels = {r[0] for r in conn.execute(select(DistrictMetric.risk_level).distinct())}
+    assert count == 104
+    assert levels <= {"Low", "Medium", "High", "Priority"}
+
+    # A second run replaces, not appends
+    pipeline.run()
+    with test_engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(DistrictMetric)).scalar() == 104
+    print("Bulk Load: OK")
+
+
+def full_load_metrics():
+    frames = [DataLoader.load_dataset(os.path.join(DATA_DIR, name)) for name, _ in DATASETS]
+    return MetricEngine.calculate_metrics(*frames).reset_index(drop=True)
+
+
+def test_streaming_matches_full_load():
+    # Tiny chunks force many partial aggregates per file
+    frames = [
+        DataLoader.load_aggregated(os.path.join(DATA_DIR, name), spec, chunksize=7)
+        for name, spec in DATASETS
+    ]
+    streamed = MetricEngine.calculate_metrics(*frames).reset_index(drop=True)
+    pd.testing.assert_frame_equal(full_load_metrics(), streamed, check_dtype=False)
+    print("Streaming Load: OK")
+
+
+def test_compact_dtypes():
+    shard = DataLoader.list_shards(os.path.join(DATA_DIR, "enrolment"))[0]
+    chunk = next(DataLoader.parse_chunks(shard, chunksize=50))
+    assert all(isinstance(chunk[key].dtype, pd.CategoricalDtype) for key in MetricEngine.KEYS)
+    assert chunk["total_enrolments"].dtype == "int32"
+    assert chunk["population_estimate"].dtype == "float64"
+
+    frames = [DataLoader.load_aggregated(os.path.join(DATA_DIR, name), spec, 50) for name, spec in DATASETS]
+    metrics = MetricEngine.calculate_metrics(*frames)
+    assert isinstance(metrics["district"].dtype, pd.CategoricalDtype)
+    assert list(metrics["district"].cat.categories) == sorted(metrics["district"].unique())
+    print("Compact Dtypes: OK")
+
+
+def test_parallel_matches_serial():
+    datasets = {name: (os.path.join(DATA_DIR, name), spec) for name, spec in DATASETS}
+    serial = DataLoader.load_many(datasets, chunksize=10, workers=1)
+    parallel = DataLoader.load_many(datasets, chunksize=10, workers=3)
+    for name, _ in DATASETS:
+        pd.testing.assert_frame_equal(serial[name], parallel[name])
+    print("Parallel Load: OK")
+
+
+def test_shard_cache():
+    cache_dir = tempfile.mkdtemp()
+    enrol_dir = os.path.join(tempfile.mkdtemp(), "enrolment")
+    shutil.copytree(os.path.join(DATA_DIR, "enrolment"), enrol_dir)
+    datasets = {"enrolment": (enrol_dir, MetricEngine.ENROL_AGG)}
+
+    cold_stats, warm_stats, changed_stats = [], [], []
+    cold = DataLoader.load_many(datasets, chunksize=10, cache_dir=cache_dir, stats=cold_stats)
+    warm = DataLoader.load_many(datasets, chunksize=10, cache_dir=cache_dir, stats=warm_stats)
+    assert {s["source"] for s in cold_stats} == {"csv"}
+    assert {s["source"] for s in warm_stats} == {"cache"}
+    pd.testing.assert_frame_equal(cold["enrolment"], warm["enrolment"])
+
+    # Only the rewritten shard is re-parsed
+    shard = sorted(os.listdir(enrol_dir))[0]
+    with open(os.path.join(enrol_dir, shard), "a") as f:
+        f.write("2023-12,Delhi,South Delhi,110001,1,2,3,6,100\n")
+    changed = DataLoader.load_many(datasets, chunksize=10, cache_dir=cache_dir, stats=changed_stats)
+    assert sorted(s["source"] for s in changed_stats) == ["cache", "csv"]
+    assert len(changed["enrolment"]) == len(cold["enrolment"]) + 1
+    print("Shard Cache: OK")
+
+
+def test_shard_cache_ignores_stale_format():
+    cache_dir = tempfile.mkdtemp()
+    demo_dir = os.path.join(DATA_DIR, "demographic_update")
+    datasets = {"demographic_update": (demo_dir, MetricEngine.DEMO_AGG)}
+    expected = DataLoader.load_many(datasets, chunksize=10)["demographic_update"]
+
+    # Entries as the cache stored them before SchemaAdapter: raw normalized columns under the bare content hash
+    for shard in DataLoader.list_shards(demo_dir):
+        raw = DataLoader.compact_dtypes(DataLoader.normalize_columns(pd.read_csv(shard)))
+        sha256 = ShardCache.file_hash(shard)
+        raw.astype({col: str for col in raw.select_dtypes("category").columns}).to_parquet(
+            os.path.join(cache_dir, f"{sha256}.parquet"), index=False)
+
+    stats = []
+    loaded = DataLoader.load_many(datasets, chunksize=10, cache_dir=cache_dir, stats=stats)
+    assert {s["source"] for s in stats} == {"csv"}
+    pd.testing.assert_frame_equal(loaded["demographic_update"], expected)
+
+    # Other date formats parse differently, so they get their own entries
+    formats, settings.SOURCE_DATE_FORMATS = settings.SOURCE_DATE_FORMATS, ["%Y-%m"]
+    try:
+        stats = []
+        DataLoader.load_many(datasets, chunksize=10, cache_dir=cache_dir, stats=stats)
+        assert {s["source"] for s in stats} == {"csv"}
+    finally:
+        settings.SOURCE_DATE_FORMATS = formats
+    print("Stale Shard Cache: OK")
+
+
+def test_shard_cache_missing_keys():
+    cache_dir = tempfile.mkdtemp()
+    demo_dir = os.path.join(tempfile.mkdtemp(), "demographic_update")
+    os.makedirs(demo_dir)
+    # The second row has no district: it must drop out of the rollup, warm or cold
+    with open(os.path.join(demo_dir, "api_data_aadhar_demographic_0_3.csv"), "w") as f:
+        f.write("date,state,district,pincode,demo_age_5_17,demo_age_17_\n"
+                "05-03-2025,Karnataka,Bidar,585330,0,4\n"
+                "06-03-2025,Karnataka,,585331,2,14\n"
+                "07-03-2025,,Bidar,585332,1,1\n")
+    datasets = {"demographic_update": (demo_dir, MetricEngine.DEMO_AGG)}
+
+    cold_stats, warm_stats = [], []
+    cold = DataLoader.load_many(datasets, chunksize=2, cache_dir=cache_dir, stats=cold_stats)
+    warm = DataLoader.load_many(datasets, chunksize=2, cache_dir=cache_dir, stats=warm_stats)
+    assert {s["source"] for s in warm_stats} == {"cache"}
+    for frame in (cold, warm):
+        demo = frame["demographic_update"]
+        assert list(zip(demo["state"].astype(str), demo["district"].astype(str))) == [("Karnataka", "Bidar")]
+        assert demo["total_demo_updates"].tolist() == [4]
+    print("Shard Cache Missing Keys: OK")
+
+
+def test_rolling_stats_per_state_district():
+    # Two "Bilaspur" districts in different states must not share a window
+    df = pd.DataFrame({
+        "state": ["Chhattisgarh"] * 4 + ["Himachal Pradesh"] * 4,
+        "district": ["Bilaspur"] * 8,
+        "uii": [0.1, np.nan, 0.3, 0.3, 5.0, 5.0, 5.0, 9.0],
+    })
+    group_ids = df.groupby(["state", "district"], sort=False).ngroup().to_numpy()
+    mean, std = MetricEngine.rolling_stats(df["uii"].to_numpy(), group_ids, 3)
+
+    grouped = df.groupby(["state", "district"])["uii"]
+    expected_mean = grouped.transform(lambda x: x.rolling(3, min_periods=1).mean())
+    expected_std = grouped.transform(lambda x: x.rolling(3, min_periods=1).std())
+    assert np.allclose(mean, expected_mean, equal_nan=True)
+    assert np.allclose(std, expected_std, equal_nan=True)
+    assert mean[4] == 5.0 and np.isnan(std[4])
+    print("Rolling Stats: OK")
+
+
+def test_uidai_layout_rollup():
+    # Pincode-level daily rows in the published UIDAI layout
+    data_dir = os.path.join(tempfile.mkdtemp(), "datasets")
+    rows = {
+        "enrolment": "date,state,district,pincode,age_0_5,age_5_17,age_18_greater\n"
+                     "01-03-2025,Karnataka,Bidar,585330,2,3,0\n"
+                     "17-03-2025,Karnataka,Bidar,585402,6,0,1\n"
+                     "02-04-2025,Karnataka,Bidar,585330,1,1,1\n",
+        "demographic_update": "date,state,district,pincode,demo_age_5_17,demo_age_17_\n"
+                              "05-03-2025,Karnataka,Bidar,585330,0,4\n"
+                              "31-03-2025,Karnataka,Bidar,585226,2,14\n",
+        "biometric_update": "date,state,district,pincode,bio_age_5_17,bio_age_17_\n"
+                            "09-03-2025,Karnataka,Bidar,585330,3,7\n",
+    }
+    for name, content in rows.items():
+        os.makedirs(os.path.join(data_dir, name))
+        with open(os.path.join(data_dir, name, "api_data_aadhar_0_3.csv"), "w") as f:
+            f.write(content)
+
+    test_engine = make_engine()
+    DataPipeline(base_dir=data_dir, bind=test_engine).run()
+    metrics = read_metrics(test_engine).set_index("month")
+    assert list(metrics.index) == ["2025-03", "2025-04"]
+    march = metrics.loc["2025-03"]
+    assert march["total_enrolments"] == 12
+    assert abs(march["uii"] - (20 + 10) / 12) < 1e-9
+    assert abs(march["cbcg"] - (1 - 3 / 3)) < 1e-9
+    # No population in the layout: ASR / AEPG stay NULL and the model is fitted without them
+    assert metrics[["population_estimate", "asr", "aepg"]].isna().all().all()
+    detector = AnomalyDetector()
+    detector.fit(metrics)
+    assert list(detector.imputed) == ["uii", "tds", "cbcg"]
+    print("UIDAI Layout: OK")
+
+
+def read_metrics(test_engine):
+    with test_engine.connect() as conn:
+        df = DataPipeline.read_frame(conn, select(DistrictMetric))
+    return df.drop(columns="id").sort_values(["state", "district", "month"]).reset_index(drop=True)
+
+
+def read_current(test_engine):
+    with test_engine.connect() as conn:
+        df = DataPipeline.read_frame(conn, select(DistrictCurrent))
+    return df.drop(columns="id").sort_values(["state", "district"]).reset_index(drop=True)
+
+
+def latest_months(metrics):
+    """What district_current should hold for a read_metrics frame."""
+    return metrics.groupby(["state", "district"]).tail(1).reset_index(drop=True)
+
+
+def test_incremental_matches_full_run():
+    data_dir = os.path.join(tempfile.mkdtemp(), "datasets")
+    shutil.copytree(DATA_DIR, data_dir)
+    test_engine = make_engine()
+    DataPipeline(base_dir=data_dir, bind=test_engine).run()
+
+    # A new month lands for a few districts, one shard is corrected, one is withdrawn
+    add_month(data_dir, "2023-12")
+    demo_dir = os.path.join(data_dir, "demographic_update")
+    corrected = os.path.join(demo_dir, sorted(os.listdir(demo_dir))[0])
+    demo = pd.read_csv(corrected)
+    demo.loc[0, "Update_Mobile"] += 5000
+    demo.to_csv(corrected, index=False)
+    bio_dir = os.path.join(data_dir, "biometric_update")
+    os.remove(os.path.join(bio_dir, sorted(os.listdir(bio_dir))[0]))
+
+    DataPipeline(base_dir=data_dir, bind=test_engine).run(incremental=True)
+    full_engine = make_engine()
+    DataPipeline(base_dir=data_dir, bind=full_engine).run()
+
+    incremental, full = read_metrics(test_engine), read_metrics(full_engine)
+    pd.testing.assert_frame_equal(incremental, full, check_exact=False)
+    pd.testing.assert_frame_equal(read_summaries(test_engine), read_summaries(full_engine), check_exact=False)
+    pd.testing.assert_frame_equal(read_current(test_engine), read_current(full_engine), check_exact=False)
+    with test_engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(IngestedShard)).scalar() == 9
+    print("Incremental Run: OK")
+
+
+def test_incremental_cost_follows_affected_districts():
+    data_dir = os.path.join(tempfile.mkdtemp(), "datasets")
+    shutil.copytree(DATA_DIR, data_dir)
+    model_path = os.path.join(tempfile.mkdtemp(), "detector.joblib")
+    test_engine = make_engine()
+    DataPipeline(base_dir=data_dir, bind=test_engine, model_path=model_path).run()
+    before = read_metrics(test_engine)
+
+    # One new month for three districts, in the default batch scoring mode
+    add_month(data_dir, "2023-12", rows=3)
+    pipeline = DataPipeline(base_dir=data_dir, bind=test_engine, model_path=model_path)
+    pipeline.run(incremental=True)
+    after = read_metrics(test_engine)
+    affected = after[after["month"] == "2023-12"][["state", "district"]].drop_duplicates()
+    affected_rows = len(after.merge(affected, on=["state", "district"]))
+    stages = {stage["stage"]: stage for stage in pipeline.run_stats.stages}
+    assert len(affected) == 3 and affected_rows < len(after)
+    assert stages["score"]["rows_out"] <= affected_rows and stages["save"]["rows_out"] <= affected_rows
+    assert not pipeline.model_stats["refit"]
+
+    # Kept rows are untouched; the cube and snapshot still match the table
+    pd.testing.assert_frame_equal(after[after["month"] < "2023-12"].reset_index(drop=True), before)
+    expected = MetricEngine.summarize(after).sort_values(["state", "month"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(read_summaries(test_engine), expected, check_exact=False, check_dtype=False)
+    pd.testing.assert_frame_equal(read_current(test_engine), latest_months(after))
+    print("Incremental Cost: OK")
+
+
+def read_summaries(test_engine):
+    with test_engine.connect() as conn:
+        df = DataPipeline.read_frame(conn, select(MetricSummary))
+    return df.drop(columns="id").sort_values(["state", "month"]).reset_index(drop=True)
+
+
+def api_client(test_engine):
+    """TestClient whose get_db sessions are bound to `test_engine`."""
+    Session = sessionmaker(bind=test_engine)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    response_cache.invalidate()
+    return TestClient(app)
+
+
+def test_materialized_summary():
+    test_engine = make_engine()
+    DataPipeline(base_dir=DATA_DIR, bind=test_engine).run()
+    summaries, metrics = read_summaries(test_engine), read_metrics(test_engine)
+    cells = metrics.groupby(["state", "month"]).ngroups
+    assert len(summaries) == 1 + metrics["month"].nunique() + metrics["state"].nunique() + cells
+
+    client = api_client(test_engine)
+    try:
+        scopes = [{}, {"month": "2023-11"}, {"state": "Kerala"}, {"state": "Kerala", "month": "2023-11"}]
+        materialized = [client.get("/api/national/summary", params=p).json() for p in scopes]
+        with test_engine.begin() as conn:
+            conn.execute(delete(MetricSummary))
+        response_cache.invalidate()
+        live = [client.get("/api/national/summary", params=p).json() for p in scopes]
+    finally:
+        app.dependency_overrides.clear()
+
+    assert materialized == live
+    assert materialized[0]["total_enrolments"] > materialized[1]["total_enrolments"] > 0
+    print("Materialized Summary: OK")
+
+
+def test_rollup_cube():
+    test_engine = make_engine()
+    DataPipeline(base_dir=DATA_DIR, bind=test_engine).run()
+    metrics, summaries = read_metrics(test_engine), read_summaries(test_engine).set_index(["state", "month"])
+
+    # Every level matches a direct aggregation of the district rows
+    levels = {("", ""): metrics.assign(state="", month=""), ("", "month"): metrics.assign(state=""),
+              ("state", ""): metrics.assign(month=""), ("state", "month"): metrics}
+    for frame in levels.values():
+        direct = frame.groupby(["state", "month"]).agg(
+            total_enrolments=("total_enrolments", "sum"), average_saturation=("asr", "mean"),
+            average_uii=("uii", "mean"), national_risk_index=("risk_score", "mean"),
+            high_risk_districts=("risk_level", lambda levels: levels.isin(["High", "Priority"]).sum()),
+        )
+        pd.testing.assert_frame_equal(summaries.loc[direct.index, direct.columns], direct, check_dtype=False)
+
+    state = metrics["state"].iloc[0]
+    client = api_client(test_engine)
+    try:
+        states = client.get("/api/rollup/states", params={"month": "2023-11"}).json()
+        all_time = client.get("/api/rollup/states").json()
+        national = client.get("/api/rollup/months").json()
+        one_state = client.get("/api/rollup/months", params={"state": state}).json()
+    finally:
+        app.dependency_overrides.clear()
+    november = summaries.xs("2023-11", level="month").drop(index="")
+    assert [r["state"] for r in states] == sorted(november.index)
+    assert [r["total_enrolments"] for r in states] == november.sort_index()["total_enrolments"].tolist()
+    assert len(all_time) == metrics["state"].nunique() and {"month", "state"} & set(national[0]) == {"month"}
+    assert [r["month"] for r in national] == sorted(metrics["month"].unique())
+    assert [r["month"] for r in one_state] == sorted(metrics.loc[metrics["state"] == state, "month"].unique())
+
+    # Databases from before the cube get it rebuilt in SQL by their migration
+    with test_engine.begin() as conn:
+        conn.execute(delete(MetricSummary))
+        conn.execute(delete(SchemaMigration).where(SchemaMigration.version.in_([5, 6])))
+    assert init_db(test_engine) == [5, 6]
+    pd.testing.assert_frame_equal(read_summaries(test_engine), summaries.reset_index(), check_exact=False)
+    print("Rollup Cube: OK")
+
+
+def test_readers_keep_snapshot_during_reload():
+    test_engine = make_engine()
+    DataPipeline(base_dir=DATA_DIR, bind=test_engine).run()
+
+    with test_engine.connect() as reader, test_engine.connect() as writer:
+        assert reader.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        count = select(func.count()).select_from(DistrictMetric)
+        # Reload in progress: the table is emptied but not yet committed
+        transaction = writer.begin()
+        writer.execute(delete(DistrictMetric))
+        start = time.perf_counter()
+        assert reader.execute(count).scalar() == 104
+        reader.commit()
+        assert time.perf_counter() - start < 1.0  # served from the snapshot, not after a busy wait
+        transaction.commit()
+        assert reader.execute(count).scalar() == 0
+    print("WAL Snapshot Reads: OK")
+
+
+def test_shadow_swap_and_rollback():
+    data_dir = os.path.join(tempfile.mkdtemp(), "datasets")
+    shutil.copytree(DATA_DIR, data_dir)
+    test_engine = make_engine()
+    DataPipeline(base_dir=data_dir, bind=test_engine).run()
+    first, first_summaries = read_metrics(test_engine), read_summaries(test_engine)
+
+    enrol_dir = os.path.join(data_dir, "enrolment")
+    os.remove(os.path.join(enrol_dir, sorted(os.listdir(enrol_dir))[0]))
+    pipeline = DataPipeline(base_dir=data_dir, bind=test_engine)
+    pipeline.run()
+    second = read_metrics(test_engine)
+    assert len(second) < len(first)
+
+    # Each generation's indexes came along with its table, and the query plans still use them
+    with test_engine.connect() as conn:
+        inspector = inspect(conn)
+        live_indexes = {ix["name"] for ix in inspector.get_indexes("district_metrics")}
+        assert len(live_indexes) == len(DistrictMetric.__table__.indexes)
+        assert all(name.endswith("_g2") for name in live_indexes)
+        assert inspector.has_table(DataPipeline.PREVIOUS_TABLE)
+        assert not inspector.has_table(DataPipeline.STAGING_TABLE)
+
+    # A run that fails while loading the staging table leaves the live table alone
+    def failing_records(df):
+        raise RuntimeError("disk full")
+    broken = DataPipeline(base_dir=data_dir, bind=test_engine)
+    broken.to_records = failing_records
+    try:
+        broken.run()
+        raise AssertionError("expected the staging load to fail")
+    except RuntimeError:
+        pass
+    pd.testing.assert_frame_equal(read_metrics(test_engine), second)
+
+    assert pipeline.rollback()
+    pd.testing.assert_frame_equal(read_metrics(test_engine), first)
+    pd.testing.assert_frame_equal(read_summaries(test_engine), first_summaries)
+    pd.testing.assert_frame_equal(read_current(test_engine), latest_months(first))
+    assert pipeline.rollback()  # rolling back again restores the newer generation
+    pd.testing.assert_frame_equal(read_metrics(test_engine), second)
+    print("Shadow Swap: OK")
+
+
+def test_current_snapshot():
+    test_engine = make_engine()
+    DataPipeline(base_dir=DATA_DIR, bind=test_engine).run()
+    metrics = read_metrics(test_engine)
+    expected = latest_months(metrics)
+    pd.testing.assert_frame_equal(read_current(test_engine), expected)
+
+    state = expected["state"].value_counts().idxmax()
+    client = api_client(test_engine)
+    try:
+        snapshot = client.get("/api/map", params={"fields": "state,district,month,risk_level"}).json()
+        history = client.get("/api/map", params={"view": "history", "fields": "state,district,month"}).json()
+        one_district = client.get("/api/map", params={"state": state, "limit": 1})
+        detail = client.get("/api/district/Pune").json()
+    finally:
+        app.dependency_overrides.clear()
+    assert [(r["state"], r["district"], r["month"], r["risk_level"]) for r in snapshot] == \
+        list(expected[["state", "district", "month", "risk_level"]].itertuples(index=False, name=None))
+    assert len(history) == len(metrics) > len(snapshot)
+    assert one_district.json()[0]["state"] == state and "x-next-cursor" in one_district.headers
+    pune = metrics[metrics["district"] == "Pune"].iloc[-1]
+    assert detail["month"] == pune["month"] and detail["risk_score"] == pune["risk_score"]
+
+    # Databases from before the snapshot table get it filled by their migration
+    with test_engine.begin() as conn:
+        conn.execute(delete(DistrictCurrent))
+        conn.execute(delete(SchemaMigration).where(SchemaMigration.version == 4))
+    assert init_db(test_engine) == [4]
+    pd.testing.assert_frame_equal(read_current(test_engine), expected)
+    print("Current Snapshot: OK")
+
+
+def add_month(data_dir, month, rows=10):
+    """Writes a new shard per dataset repeating the latest shard's first rows for `month`."""
+    for name, _ in DATASETS:
+        folder = os.path.join(data_dir, name)
+        latest = pd.read_csv(os.path.join(folder, sorted(os.listdir(folder))[-1])).head(rows)
+        month_col = "Date" if "Date" in latest.columns else "Month"
+        latest[month_col] = month
+        latest.to_csv(os.path.join(folder, f"api_data_aadhar_{month.replace('-', '_')}.csv"), index=False)
+
+
+def test_persisted_model():
+    data_dir = os.path.join(tempfile.mkdtemp(), "datasets")
+    shutil.copytree(DATA_DIR, data_dir)
+    model_path = os.path.join(tempfile.mkdtemp(), "models", "detector.joblib")
+    test_engine = make_engine()
+
+    pipeline = DataPipeline(base_dir=data_dir, bind=test_engine, model_path=model_path)
+    pipeline.run()
+    assert os.path.exists(model_path) and pipeline.model_stats["refit"]
+    saved_at = os.path.getmtime(model_path)
+
+    # New district-months are scored with the persisted model; nothing is refit
+    add_month(data_dir, "2023-12")
+    pipeline = DataPipeline(base_dir=data_dir, bind=test_engine, model_path=model_path)
+    pipeline.run(incremental=True)
+    assert not pipeline.model_stats["refit"]
+    assert 0 < pipeline.model_stats["scored_rows"] < 104
+    assert os.path.getmtime(model_path) == saved_at
+    metrics = read_metrics(test_engine)
+    assert metrics["anomaly_score"].notna().all()
+    assert metrics["risk_score"].between(0, 100).all()
+
+    # An expired model is refit on the whole table
+    detector = AnomalyDetector.load(model_path)
+    detector.trained_at -= timedelta(days=settings.MODEL_RETRAIN_DAYS + 1)
+    detector.save(model_path)
+    pipeline = DataPipeline(base_dir=data_dir, bind=test_engine, model_path=model_path)
+    pipeline.run()
+    assert pipeline.model_stats["refit"] and "older" in pipeline.model_stats["reason"]
+    assert pipeline.model_stats["scored_rows"] == len(metrics)
+
+    # Scores far outside the training range count as drift
+    detector = AnomalyDetector.load(model_path)
+    low, high = detector.bounds
+    assert detector.drift(np.array([low, high])) == 0.0
+    assert detector.drift(np.array([low - 1, high, high + 1, low])) == 0.5
+    print("Persisted Model: OK")
+
+
+def test_calibrated_scores_are_stable():
+    data_dir = os.path.join(tempfile.mkdtemp(), "datasets")
+    shutil.copytree(DATA_DIR, data_dir)
+    model_path = os.path.join(tempfile.mkdtemp(), "detector.joblib")
+    test_engine, batch_engine = make_engine(), make_engine()
+    DataPipeline(base_dir=data_dir, bind=test_engine, model_path=model_path, scoring="calibrated").run()
+    DataPipeline(base_dir=data_dir, bind=batch_engine).run()
+    before = read_metrics(test_engine)
+    # On the rows the model was fitted on, calibrated and batch scores agree
+    pd.testing.assert_frame_equal(before, read_metrics(batch_engine))
+
+    add_month(data_dir, "2023-12")
+    updates = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE district_metrics"):
+            updates.append(statement)
+    event.listen(test_engine, "before_cursor_execute", record)
+    try:
+        DataPipeline(base_dir=data_dir, bind=test_engine, model_path=model_path, scoring="calibrated").run(incremental=True)
+    finally:
+        event.remove(test_engine, "before_cursor_execute", record)
+
+    # Untouched district-months keep their scores and are not rewritten
+    after = read_metrics(test_engine)
+    assert not updates
+    assert len(after) > len(before)
+    untouched = before.merge(after, on=["state", "district", "month"], suffixes=("", "_after"))
+    untouched = untouched[untouched["total_enrolments"] == untouched["total_enrolments_after"]]
+    assert len(untouched) > 0
+    assert (untouched["risk_score"] == untouched["risk_score_after"]).all()
+    assert after["risk_score"].between(0, 100).all()
+    print("Calibrated Scores: OK")
+
+
+def test_partitioned_models():
+    data_dir = os.path.join(tempfile.mkdtemp(), "datasets")
+    shutil.copytree(DATA_DIR, data_dir)
+    model_path = os.path.join(tempfile.mkdtemp(), "detector.joblib")
+    serial_engine, parallel_engine = make_engine(), make_engine()
+    DataPipeline(base_dir=data_dir, bind=serial_engine, partition="month").run()
+    DataPipeline(base_dir=data_dir, bind=parallel_engine, partition="month", model_workers=2,
+                 model_path=model_path, scoring="calibrated").run()
+
+    # Pool workers fit the same models; risk is normalized within each month
+    metrics = read_metrics(parallel_engine)
+    pd.testing.assert_frame_equal(metrics, read_metrics(serial_engine))
+    for _, month in metrics.groupby("month"):
+        if len(month) > 1 and month["risk_score"].nunique() > 1:
+            assert month["risk_score"].max() == 100
+            assert month["risk_score"].min() == 0
+
+    # A new month only fits that month's model; the others are reused as saved
+    add_month(data_dir, "2023-12")
+    pipeline = DataPipeline(base_dir=data_dir, bind=parallel_engine, partition="month", model_workers=2,
+                            model_path=model_path, scoring="calibrated")
+    pipeline.run(incremental=True)
+    assert not pipeline.model_stats["refit"]
+    detector = AnomalyDetector.load(model_path)
+    assert "2023-12" in detector.detectors
+    assert set(metrics["month"]) < set(detector.detectors)
+    assert not hasattr(detector, "model")  # no unused whole-table forest is built or pickled
+    assert {d.model.n_jobs for d in detector.detectors.values()} == {1}  # fitted in pool workers
+    serial = PartitionedAnomalyDetector("month")
+    serial.fit(metrics)
+    assert {d.model.n_jobs for d in serial.detectors.values()} == {-1}  # in-process keeps n_jobs=-1
+
+    # Streamed rows of an unseen month are scored by the latest fitted month, never by a forest fitted on them
+    state, district = metrics[["state", "district"]].iloc[0]
+    with parallel_engine.begin() as conn:
+        StreamingScorer(model_path).apply(conn, [{"state": state, "district": district, "month": "2024-02",
+                                                  "total_enrolments": 500, "population_estimate": 1000}])
+    streamed = read_metrics(parallel_engine).set_index(["state", "district", "month"]).loc[(state, district, "2024-02")]
+    assert "2024-02" not in AnomalyDetector.load(model_path).detectors
+    assert detector.detector_for("2024-02") is detector.detectors["2023-12"]
+    december = detector.detectors["2023-12"]
+    expected = december.risk_scores(None, np.array([streamed["anomaly_score"]]), calibrated=True)
+    assert abs(streamed["risk_score"] - expected[0]) < 1e-9
+    try:
+        PartitionedAnomalyDetector("state").detector_for("Atlantis")
+        raise AssertionError("expected an unseen state to be rejected")
+    except ValueError:
+        pass
+    print("Partitioned Models: OK")
+
+
+def test_stream_updates():
+    model_path = os.path.join(tempfile.mkdtemp(), "detector.joblib")
+    test_engine = make_engine()
+    DataPipeline(base_dir=DATA_DIR, bind=test_engine, model_path=model_path, scoring="calibrated").run()
+    before = read_metrics(test_engine)
+    state, district = before.groupby(["state", "district"]).size().idxmax()
+    history = before[(before["state"] == state) & (before["district"] == district)]
+    day = {"state": state, "district": district, "total_enrolments": 500, "population_estimate": 1000,
+           "total_demo_updates": 40, "total_bio_updates": 10, "age_5_18": 100, "child_biometric_updates": 60}
+
+    client = api_client(test_engine)
+    original_path = stream_scorer.model_path
+    try:
+        stream_scorer.model_path = ""
+        stream_scorer.reset()
+        assert client.post("/api/stream/updates", json=[dict(day, month="2024-01")]).status_code == 503
+        assert client.post("/api/stream/updates", json=[day]).status_code == 422
+
+        # Two district-day records land in one new district-month, visible on the next /map
+        stream_scorer.model_path = model_path
+        response = client.post("/api/stream/updates", json=[dict(day, date="2024-01-05"), dict(day, date="2024-01-20")])
+        assert response.status_code == 200 and response.json()["rows"] == 1
+        streamed = client.get("/api/map", params={"month": "2024-01"}).json()
+        assert [(r["state"], r["district"]) for r in streamed] == [(state, district)]
+        assert client.get("/api/national/summary", params={"month": "2024-01"}).json()["total_enrolments"] == 1000
+        assert client.get(f"/api/district/{district}").json()["month"] == "2024-01"
+
+        after = read_metrics(test_engine)
+        row = after[after["month"] == "2024-01"].iloc[0]
+        assert row["total_enrolments"] == 1000 and row["population_estimate"] == 1000
+        assert abs(row["uii"] - 100 / 1000) < 1e-9 and abs(row["cbcg"] - (1 - 120 / 200)) < 1e-9
+        uii = np.r_[history["uii"].to_numpy(), 0.1]
+        mean, std = MetricEngine.rolling_stats(uii, np.zeros(len(uii)), MetricEngine.TDS_WINDOW)
+        assert abs(row["tds"] - (uii[-1] - mean[-1]) / std[-1]) < 1e-9
+        detector = AnomalyDetector.load(model_path)
+        expected = detector.risk_scores(after.iloc[[row.name]], np.array([row["anomaly_score"]]), calibrated=True)
+        assert abs(row["risk_score"] - expected[0]) < 1e-9
+        pd.testing.assert_frame_equal(after[after["month"] != "2024-01"].reset_index(drop=True), before)
+
+        # Updating a stored month rewrites it and the later months whose TDS window includes it
+        first = history.iloc[0]
+        response = client.post("/api/stream/updates", json=[{
+            "state": state, "district": district, "month": first["month"], "total_demo_updates": 5000}])
+        assert response.json()["rows"] == len(history) + 1
+        rewritten = read_metrics(test_engine).set_index(["state", "district", "month"]).loc[
+            (state, district, first["month"])]
+        stored_updates = first["uii"] * first["total_enrolments"]
+        assert abs(rewritten["uii"] - (stored_updates + 5000) / first["total_enrolments"]) < 1e-9
+        assert rewritten["cbcg"] == first["cbcg"]
+        pd.testing.assert_frame_equal(read_current(test_engine), latest_months(read_metrics(test_engine)))
+        expected = MetricEngine.summarize(read_metrics(test_engine)).sort_values(["state", "month"])
+        pd.testing.assert_frame_equal(read_summaries(test_engine), expected.reset_index(drop=True),
+                                      check_exact=False, check_dtype=False)
+
+        # UIDAI day records are DD-MM-YYYY: the 1st of December is not January
+        response = client.post("/api/stream/updates", json=[dict(day, date="01-12-2025")])
+        assert response.status_code == 200
+        assert client.get(f"/api/district/{district}").json()["month"] == "2025-12"
+        assert "2025-01" not in set(read_metrics(test_engine)["month"])
+        assert client.post("/api/stream/updates", json=[dict(day, date="12/31/2025")]).status_code == 422
+    finally:
+        stream_scorer.model_path = original_path
+        stream_scorer.reset()
+        app.dependency_overrides.clear()
+    print("Stream Updates: OK")
+
+
+def test_streamed_updates_survive_pipeline_runs():
+    data_dir = os.path.join(tempfile.mkdtemp(), "datasets")
+    shutil.copytree(DATA_DIR, data_dir)
+    model_path = os.path.join(tempfile.mkdtemp(), "detector.joblib")
+    test_engine = make_engine()
+    DataPipeline(base_dir=data_dir, bind=test_engine, model_path=model_path).run()
+    before = read_metrics(test_engine)
+    state, district = before.groupby(["state", "district"]).size().idxmax()
+    month = before.loc[(before["state"] == state) & (before["district"] == district), "month"].min()
+
+    # An age_5_18 update for a stored month: CBCG comes from the month's full inputs plus the update
+    update = {"state": state, "district": district, "month": month, "age_5_18": 100, "child_biometric_updates": 60}
+    with test_engine.begin() as conn:
+        StreamingScorer(model_path).apply(conn, [update])
+    streamed = read_metrics(test_engine)
+    enrol, _, bio = [DataLoader.load_aggregated(os.path.join(data_dir, name), spec, 10) for name, spec in DATASETS]
+    key = lambda df: df[(df["state"] == state) & (df["district"] == district) & (df["month"] == month)].iloc[0]
+    expected = np.clip(1 - (key(bio)["child_biometric_updates"] + 60) / (key(enrol)["age_5_18"] + 100), 0, 1)
+    assert abs(key(streamed)["cbcg"] - expected) < 1e-9 and key(streamed)["cbcg"] != key(before)["cbcg"]
+
+    # A full run over the same sources keeps the streamed inputs and agrees with the streamed rows
+    DataPipeline(base_dir=data_dir, bind=test_engine, model_path=model_path).run()
+    full = read_metrics(test_engine)
+    pd.testing.assert_frame_equal(full.drop(columns=["anomaly_score", "risk_score", "risk_level"]),
+                                  streamed.drop(columns=["anomaly_score", "risk_score", "risk_level"]), check_exact=False)
+
+    # An incremental run recomputing the district from that month on keeps them too
+    demo_dir = os.path.join(data_dir, "demographic_update")
+    for shard in sorted(os.listdir(demo_dir)):
+        demo = pd.read_csv(os.path.join(demo_dir, shard))
+        rows = (demo["State"] == state) & (demo["District"] == district) & (demo["Month"] == month)
+        if rows.any():
+            demo.loc[rows, "Update_Mobile"] += 5000
+            demo.to_csv(os.path.join(demo_dir, shard), index=False)
+    DataPipeline(base_dir=data_dir, bind=test_engine, model_path=model_path).run(incremental=True)
+    incremental = read_metrics(test_engine)
+    assert abs(key(incremental)["cbcg"] - expected) < 1e-9 and key(incremental)["uii"] > key(full)["uii"]
+    reloaded = make_engine()
+    DataPipeline(base_dir=data_dir, bind=reloaded).run()
+    assert key(read_metrics(reloaded))["cbcg"] == key(before)["cbcg"]  # the sources alone lack the update
+    print("Streamed Updates Kept: OK")
+
+
+def test_run_history_and_metrics():
+    test_engine = make_engine()
+    DataPipeline(base_dir=DATA_DIR, bind=test_engine).run()
+    DataPipeline(base_dir=DATA_DIR, bind=test_engine).run(incremental=True)
+    with test_engine.connect() as conn:
+        runs = conn.execute(select(PipelineRun).order_by(PipelineRun.id)).all()
+    assert [(r.mode, r.status) for r in runs] == [("full", "ok"), ("incremental", "noop")]
+    full = runs[0]
+    stages = json.loads(full.stages)
+    assert [s["stage"] for s in stages] == ["load", "metrics", "score", "save"]
+    assert full.rows == 104 and stages[-1]["rows_out"] == 104 and stages[1]["rows_out"] == 104
+    assert all(s["wall_seconds"] >= 0 and s["cpu_seconds"] >= 0 and s["peak_rss_bytes"] > 0 for s in stages)
+    assert full.wall_seconds >= sum(s["wall_seconds"] for s in stages)
+
+    client = api_client(test_engine)
+    request_latency.reset()
+    try:
+        client.get("/api/map")
+        client.get("/api/district/Nowhere")
+        text = client.get("/metrics").text
+    finally:
+        app.dependency_overrides.clear()
+    assert 'aari_http_request_duration_seconds_count{method="GET",route="/map",status="200"} 1' in text
+    assert 'route="/district/{district_id}",status="404"' in text
+    assert 'aari_pipeline_runs_total{status="ok"} 1' in text
+    assert 'aari_pipeline_stage_rows_out{stage="save"}' not in text  # latest run was the no-op
+    assert 'aari_pipeline_last_run_wall_seconds{mode="incremental",status="noop"}' in text
+    print("Run History + Metrics: OK")
+
+
+if __name__ == "__main__":
+    try:
+        test_bulk_load()
+        test_streaming_matches_full_load()
+        test_compact_dtypes()
+        test_parallel_matches_serial()
+        test_shard_cache()
+        test_shard_cache_ignores_stale_format()
+        test_shard_cache_missing_keys()
+        test_rolling_stats_per_state_district()
+        test_uidai_layout_rollup()
+        test_incremental_matches_full_run()
+        test_incremental_cost_follows_affected_districts()
+        test_materialized_summary()
+        test_rollup_cube()
+        test_readers_keep_snapshot_during_reload()
+        test_shadow_swap_and_rollback()
+        test_current_snapshot()
+        test_persisted_model()
+        test_calibrated_scores_are_stable()
+        test_partitioned_models()
+        test_stream_updates()
+        test_streamed_updates_survive_pipeline_runs()
+        test_run_history_and_metrics()
+        print("\nAll Tests Passed Successfully!")
+    except Exception as e:
+        print(f"\n[FAIL] Test Failed: {e}")
+        sys.exit(1)
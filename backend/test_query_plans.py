@@ -0,0 +1,69 @@
+import sys
+from sqlalchemy import event, text
+from app.api.cache import response_cache
+from app.core.processing import DataPipeline
+from app.main import app
+from test_pipeline import DATA_DIR, api_client, make_engine
+
+# Endpoint calls covering every indexed access pattern. The unscoped live
+# summary reads the whole table by design.
+ENDPOINTS = [
+    ("/api/map", {"month": "2023-11"}),
+    ("/api/district/Pune", {}),
+    ("/api/district/Pune/trends", {}),
+    ("/api/risk/top", {"limit": 10}),
+    ("/api/map", {"month": "2023-11", "limit": 20, "cursor": "WyJLZXJhbGEiLCJQdW5lIl0"}),
+    ("/api/map", {"view": "history", "state": "Kerala", "limit": 20}),
+    ("/api/map", {"limit": 20, "cursor": "WyJLZXJhbGEiLCJQdW5lIl0"}),
+    ("/api/risk/top", {"limit": 10, "min_risk": 50, "cursor": "Wzc1LjAsMTBd"}),
+    ("/api/national/summary", {}),
+    ("/api/rollup/states", {"month": "2023-11"}),
+    ("/api/rollup/months", {"state": "Kerala"}),
+    ("/api/national/summary", {"state": "Kerala", "month": "2023-11"}),
+]
+
+
+def capture_queries(test_engine, calls):
+    """Runs the endpoint calls and returns every (sql, params) they sent to SQLite."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    client = api_client(test_engine)
+    event.listen(test_engine, "before_cursor_execute", record)
+    try:
+        for path, params in calls:
+            response_cache.invalidate()
+            assert client.get(path, params=params).status_code == 200
+    finally:
+        event.remove(test_engine, "before_cursor_execute", record)
+        app.dependency_overrides.clear()
+    return statements
+
+
+def test_endpoints_use_indexes():
+    test_engine = make_engine()
+    DataPipeline(base_dir=DATA_DIR, bind=test_engine).run()
+
+    problems = []
+    with test_engine.connect() as conn:
+        for statement, parameters in capture_queries(test_engine, ENDPOINTS):
+            plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            for step in plan:
+                # "SCAN t" is a full table scan; "SCAN t USING INDEX ..." walks an index in order
+                full_scan = step.startswith("SCAN ") and " USING " not in step
+                if full_scan or "TEMP B-TREE FOR ORDER BY" in step:
+                    problems.append((" ".join(statement.split()), step))
+    assert not problems, problems
+    print("Query Plans: OK")
+
+
+if __name__ == "__main__":
+    try:
+        test_endpoints_use_indexes()
+        print("\nAll Tests Passed Successfully!")
+    except Exception as e:
+        print(f"\n[FAIL] Test Failed: {e}")
+        sys.exit(1)
@@ -34,8 +34,15 @@ export const fetchNationalSummary = async (): Promise<NationalSummary> => {
 };
 
 export const fetchMapData = async (month?: string): Promise<DistrictMetric[]> => {
-    const response = await api.get('/map', { params: { month } });
-    return response.data;
+    // The API pages its rows; follow X-Next-Cursor until the last page
+    const rows: DistrictMetric[] = [];
+    let cursor: string | undefined;
+    do {
+        const response = await api.get('/map', { params: { month, cursor } });
+        rows.push(...response.data);
+        cursor = response.headers['x-next-cursor'];
+    } while (cursor);
+    return rows;
 };
 
 export const fetchTopRiskDistricts = async (limit: number = 10): Promise<DistrictMetric[]> => {
@@ -52,3 +59,23 @@ export const fetchDistrictTrends = async (districtId: string) => {
     const response = await api.get(`/district/${districtId}/trends`);
     return response.data;
 }
+
+export interface Rollup {
+    state?: string;
+    month?: string;
+    total_enrolments: number;
+    average_saturation: number;
+    average_uii: number;
+    national_risk_index: number;
+    high_risk_districts: number;
+}
+
+export const fetchStateRollup = async (month?: string): Promise<Rollup[]> => {
+    const response = await api.get('/rollup/states', { params: { month } });
+    return response.data;
+}
+
+export const fetchMonthlyRollup = async (state?: string): Promise<Rollup[]> => {
+    const response = await api.get('/rollup/months', { params: { state } });
+    return response.data;
+}